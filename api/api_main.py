@@ -1,8 +1,12 @@
 from fastapi import FastAPI, HTTPException
-import sqlite3
+import sys
 import pandas as pd
+from pathlib import Path
 from pydantic import BaseModel
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "ui"))
+import db_pool
+
 app = FastAPI(title = 'ComplyAPI')
 DB_PATH = "/Users/webdev/Documents/Complyable/Complyable Iso/complyable_vault.db"
 
@@ -13,29 +17,24 @@ class ApprovalRequest(BaseModel):
 
 @app.get("/pending")
 def get_pending():
-    connect = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM pending_review WHERE status = 'PENDING'", connect)
-    connect.close()
+    with db_pool.connect(DB_PATH) as connect:
+        df = pd.read_sql_query("SELECT * FROM pending_review WHERE status = 'PENDING'", connect)
     return df.to_dict(orient='records')
 
 @app.post("/commit")
 def commit_file(approval: ApprovalRequest):
-    connect = sqlite3.connect(DB_PATH)
-    cursor = connect.cursor()
     try:
-        cursor.execute("UPDATE pending_review SET status ='APPROVED' WHERE filepath = ?", (approval.filepath,))
-        cursor.execute("""
-                       INSERT INTO final_commit (filepath, final_content, integrity_hash)
-                       VALUES (?, ?, ?)
-                       """, (approval.filepath, approval.final_text, approval.integrity_hash))
-        
-        connect.commit()
+        # Commits on success, rolls back on any error
+        with db_pool.connect(DB_PATH) as connect:
+            cursor = connect.cursor()
+            cursor.execute("UPDATE pending_review SET status ='APPROVED' WHERE filepath = ?", (approval.filepath,))
+            cursor.execute("""
+                           INSERT INTO final_commit (filepath, final_content, integrity_hash)
+                           VALUES (?, ?, ?)
+                           """, (approval.filepath, approval.final_text, approval.integrity_hash))
         return {"status": "success", "message": f"Document {approval.filepath} committed."}
     except Exception as e:
-        connect.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        connect.close()
 
 if __name__ == "__main__":
     import uvicorn
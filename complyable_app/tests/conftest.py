@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The app modules use flat imports, like ui/ itself
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "ui"))
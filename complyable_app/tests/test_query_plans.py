@@ -0,0 +1,23 @@
+"""Every hot query must be served by an index on a freshly created vault."""
+
+import sqlite3
+import database
+import db_pool
+
+def _fresh_vault(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "vault.db"))
+    monkeypatch.setattr(database, "CSV_PATH", str(tmp_path / "no_seed.csv"))
+    database.init_db_schema()
+    return db_pool.connect(database.DB_PATH)
+
+def test_hot_queries_need_no_table_scan(tmp_path, monkeypatch):
+    conn = _fresh_vault(tmp_path, monkeypatch)
+    assert database.find_table_scans(conn) == []
+
+def test_missing_index_is_reported(tmp_path, monkeypatch):
+    _fresh_vault(tmp_path, monkeypatch)
+    # A new connection, so no cached query plan survives the DROP
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.execute("DROP INDEX idx_pending_review_status")
+    query = "SELECT filepath, markdown FROM pending_review WHERE status = 'PENDING'"
+    assert [problem[0] for problem in database.find_table_scans(conn, [query])] == [query]
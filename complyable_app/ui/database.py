@@ -1,20 +1,113 @@
 import sqlite3
+import logging
 import pandas as pd
 from pathlib import Path
 import hashlib
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 import uuid
 import re
+import db_pool
+
+log = logging.getLogger(__name__)
 
 # Path Configuration
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = os.getenv('DB_PATH', str(BASE_DIR / "data" / "vault" / "complyable_vault.db"))
 CSV_PATH = str(BASE_DIR / "data" / "refs" / "dict_seed.csv")
 
+# ─────────────────────────────────────────────
+# INDEXES
+# ─────────────────────────────────────────────
+
+# The vault's complete idx_ index set. init_db_schema creates what is missing
+# and drops idx_ indexes no longer listed here: (name, table, columns[, where]).
+# db_schema_guard.py (KNIME) creates its indexes under these same names.
+INDEXES = [
+    ("idx_pending_review_status",          "pending_review",   "status"),
+    ("idx_pending_review_filename_hash",   "pending_review",   "filename_hash"),
+    ("idx_pending_review_content_hash",    "pending_review",   "content_hash"),
+    # Also serves lookups by filepath alone
+    ("idx_pending_pii_filepath_text",      "pending_pii",      "filepath, pii_text"),
+    # job_dict triggers look up a text across all documents
+    ("idx_pending_pii_text",               "pending_pii",      "pii_text"),
+    ("idx_ui_highlight_filepath_text",     "ui_highlight",     "filepath, pii_text"),
+    ("idx_audit_trail_audit_id",           "audit_trail",      "audit_id"),
+    ("idx_audit_trail_commit_uuid",        "audit_trail",      "commit_uuid"),
+    ("idx_final_commit_filename_hash",     "final_commit",     "filename_hash"),
+    ("idx_final_commit_content_hash",      "final_commit",     "content_hash"),
+    # Serves the archive's ORDER BY approval_timestamp, commit_uuid without a sort
+    ("idx_final_commit_approval_uuid",     "final_commit",     "approval_timestamp, commit_uuid"),
+    # Covers the per-run GROUP BY of get_stage_metrics and the retention in metrics.py
+    ("idx_pipeline_metrics_run_metric",    "pipeline_metrics", "run_id, metric_id"),
+    ("idx_pipeline_jobs_state",            "pipeline_jobs",    "state, job_id"),
+    # At most one open job per file
+    ("idx_pipeline_jobs_open",             "pipeline_jobs",    "filepath", "state IN ('queued', 'running')"),
+]
+UNIQUE_INDEXES = {"idx_pipeline_jobs_open"}
+
+# Queries the UI and the pipeline run on every rerun or upload. None of them
+# may need a full table scan or a temporary sort (see find_table_scans).
+HOT_QUERIES = [
+    "SELECT filepath, markdown FROM pending_review WHERE status = 'PENDING'",
+    "SELECT filepath, markdown FROM pending_review WHERE status = 'READY'",
+    "SELECT filepath, status FROM pending_review WHERE filename_hash = ? OR content_hash = ?",
+    "SELECT audit_id FROM final_commit WHERE filename_hash = ? OR content_hash = ?",
+    "SELECT 1 FROM pending_review WHERE content_hash = ? AND status != 'VERWORFEN' "
+    "UNION ALL SELECT 1 FROM final_commit WHERE content_hash = ? LIMIT 1",
+    "SELECT * FROM ui_highlight WHERE filepath = ?",
+    "SELECT version FROM highlight_versions WHERE filepath = ?",
+    "SELECT COUNT(*) FROM pending_pii WHERE filepath = ? AND pii_text = ?",
+    "SELECT COUNT(DISTINCT pii_id) FROM pending_pii WHERE filepath = ? AND pii_text = ? AND status != ?",
+    "SELECT * FROM audit_trail WHERE commit_uuid = ?",
+    "SELECT MAX(metric_id) FROM pipeline_metrics",
+    "SELECT commit_uuid FROM final_commit ORDER BY approval_timestamp DESC, commit_uuid DESC LIMIT 10 OFFSET 0",
+    "SELECT commit_uuid FROM final_commit WHERE approval_timestamp >= ? "
+    "ORDER BY approval_timestamp ASC, commit_uuid ASC LIMIT 10 OFFSET 0",
+]
+
+def ensure_indexes(cursor):
+    for name, table, columns, *where in INDEXES:
+        unique = "UNIQUE " if name in UNIQUE_INDEXES else ""
+        condition = f" WHERE {where[0]}" if where else ""
+        cursor.execute(f"CREATE {unique}INDEX IF NOT EXISTS {name} ON {table} ({columns}){condition}")
+    managed = {index[0] for index in INDEXES}
+    existing = [row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx\\_%' ESCAPE '\\'"
+    )]
+    for name in existing:
+        if name not in managed:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+            print(f"[DB] Dropped retired index {name}.")
+
+def find_table_scans(conn, queries=None):
+    """
+    Runs EXPLAIN QUERY PLAN over the hot queries. Returns (query, plan step)
+    for every full table scan or temporary sort, so an empty list means all
+    of them are served by indexes.
+    """
+    problems = []
+    for query in HOT_QUERIES if queries is None else queries:
+        params = (None,) * query.count("?")
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params):
+            detail = row[-1]
+            full_scan = detail.startswith("SCAN ") and " USING " not in detail
+            if full_scan or "TEMP B-TREE" in detail:
+                problems.append((query, detail))
+    return problems
+
+def make_filename_hash(filepath):
+    return hashlib.sha256(os.path.basename(filepath).encode()).hexdigest()
+
+def add_missing_column(cursor, table, column, definition):
+    """Adds a column that CREATE TABLE IF NOT EXISTS cannot add to an existing vault."""
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 def init_db_schema():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.cursor()
 
         # ── Core tables ───────────────────────────────────────────────────────
@@ -46,9 +139,20 @@ def init_db_schema():
                 markdown TEXT,
                 output TEXT,
                 status TEXT DEFAULT 'PENDING',
-                integrity_hash TEXT
+                integrity_hash TEXT,
+                page_ranges TEXT,
+                filename_hash TEXT,
+                content_hash TEXT
             )
         """)
+        # JSON [first_page, last_page, start offset] for PDFs parsed in page ranges
+        add_missing_column(cursor, "pending_review", "page_ranges", "TEXT")
+        # SHA-256 of the file name and of the file bytes, for find_duplicate
+        add_missing_column(cursor, "pending_review", "filename_hash", "TEXT")
+        add_missing_column(cursor, "pending_review", "content_hash", "TEXT")
+        missing = cursor.execute("SELECT filepath FROM pending_review WHERE filename_hash IS NULL").fetchall()
+        cursor.executemany("UPDATE pending_review SET filename_hash = ? WHERE filepath = ?",
+                           [(make_filename_hash(filepath), filepath) for (filepath,) in missing])
 
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS pending_pii (
@@ -59,13 +163,15 @@ def init_db_schema():
                 label TEXT,
                 occurrence_index INTEGER,
                 confidence_score REAL,
+                scoring_method TEXT,
                 event_code TEXT,
                 status TEXT DEFAULT 'REDACT',
                 is_manual INTEGER DEFAULT 0,
                 FOREIGN KEY (filepath) REFERENCES pending_review(filepath)
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_pii_filepath ON pending_pii (filepath)")
+        # How confidence_score was produced (e.g. beam:16, greedy:0.85, rule)
+        add_missing_column(cursor, "pending_pii", "scoring_method", "TEXT")
 
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS job_dict (
@@ -84,9 +190,11 @@ def init_db_schema():
                 hash_original TEXT,
                 hash_sanitized TEXT,
                 approval_timestamp DATETIME,
-                user_id TEXT
+                user_id TEXT,
+                content_hash TEXT
             )
         """)
+        add_missing_column(cursor, "final_commit", "content_hash", "TEXT")
 
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS audit_trail (
@@ -99,27 +207,89 @@ def init_db_schema():
                 label TEXT,
                 occurrence_index INT,
                 confidence_score REAL,
+                scoring_method TEXT,
                 integrity_hash TEXT,
                 commit_uuid TEXT,
                 FOREIGN KEY (event_code) REFERENCES event_registry(event_code),
                 FOREIGN KEY (commit_uuid) REFERENCES final_commit(commit_uuid)
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_trail_audit_id ON audit_trail (audit_id)")
+        add_missing_column(cursor, "audit_trail", "scoring_method", "TEXT")
+
+        # ── Pipeline metrics ──────────────────────────────────────────────────
+        # One row per stage per document; batch stages carry doc_count > 1
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_metrics (
+                metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT,
+                recorded_at TEXT,
+                stage TEXT,
+                filepath TEXT,
+                doc_count INTEGER,
+                char_count INTEGER,
+                finding_count INTEGER,
+                wall_ms REAL,
+                cpu_ms REAL
+            )
+        """)
+
+        # ── Pipeline job queue ────────────────────────────────────────────────
+        # One row per staged file: queued → running → done | failed (see job_queue.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filepath TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER DEFAULT 0,
+                worker_id TEXT,
+                enqueued_at REAL,
+                started_at REAL,
+                heartbeat_at REAL,
+                lease_expires REAL,
+                finished_at REAL,
+                error TEXT
+            )
+        """)
 
-        # ── UI View ───────────────────────────────────────────────────────────
+        # ── UI highlight table ────────────────────────────────────────────────
+        # Materialized join of pending_pii, event_registry and job_dict (formerly
+        # a view), kept current by triggers, so every writer of pending_pii or
+        # job_dict (pipeline, UI, KNIME nodes) updates it. Built once on migration.
+        existing = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'ui_highlight'").fetchone()
+        if existing and existing[0] == 'view':
+            cursor.execute("DROP VIEW ui_highlight")
         cursor.execute("""
-            CREATE VIEW IF NOT EXISTS ui_highlight AS
-                SELECT
-                    p.pii_id, p.pii_text, p.filepath, p.pii_hash,
-                    COALESCE(j.neutral, p.label) AS label,
-                    p.occurrence_index, p.status, p.is_manual,
-                    p.label AS category, r.event_code,
-                    r.methodology, p.confidence_score
-                FROM pending_pii p
-                LEFT JOIN event_registry r ON p.event_code = r.event_code
-                LEFT JOIN job_dict j ON p.pii_text = j.original
+            CREATE TABLE IF NOT EXISTS ui_highlight (
+                pii_id INTEGER PRIMARY KEY,
+                pii_text TEXT,
+                filepath TEXT,
+                pii_hash TEXT,
+                label TEXT,
+                occurrence_index INTEGER,
+                status TEXT,
+                is_manual INTEGER,
+                category TEXT,
+                event_code TEXT,
+                methodology TEXT,
+                confidence_score REAL,
+                scoring_method TEXT
+            )
+        """)
+        # Bumped on every change to a document's highlights, so the UI can keep
+        # what it already fetched (see main.get_highlights)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS highlight_versions (
+                filepath TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
         """)
+        for trigger in HIGHLIGHT_TRIGGERS:
+            cursor.execute(trigger)
+
+        # ── Indexes ───────────────────────────────────────────────────────────
+        ensure_indexes(cursor)
+        for query, detail in find_table_scans(conn):
+            log.warning("Hot query without index (%s): %s", detail, query)
 
         # ── Users ─────────────────────────────────────────────────────────────
         init_users_table(cursor)
@@ -134,6 +304,10 @@ def init_db_schema():
             else:
                 print(f"[DB] Warning: CSV not found at {CSV_PATH}")
 
+        if not existing or existing[0] == 'view':
+            rebuild_highlights(conn)
+            print("[DB] ui_highlight built.")
+
         conn.commit()
     print("[DB] Schema initialized.")
 
@@ -149,12 +323,12 @@ def init_users_table(cursor):
     """)
 
 def get_pending_data():
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         return pd.read_sql("SELECT filepath, markdown FROM pending_review WHERE status = 'PENDING'", conn)
 
 # V1.1 with sort by confidence  
 # def get_pending_data():
-#     with sqlite3.connect(DB_PATH) as conn:
+#     with db_pool.connect(DB_PATH) as conn:
 #         return pd.read_sql("""
 #             SELECT 
 #                 r.filepath,
@@ -169,13 +343,136 @@ def get_pending_data():
 #             ORDER BY doc_confidence ASC
 #         """, conn)
 
+def get_metrics_version():
+    """Changes whenever a run recorded stage timings; a single index seek."""
+    with db_pool.connect(DB_PATH) as conn:
+        return conn.execute("SELECT MAX(metric_id) FROM pipeline_metrics").fetchone()[0]
+
+def get_stage_metrics(last_runs=20):
+    """p50/p95 wall and CPU time per document for each pipeline stage over the last runs."""
+    with db_pool.connect(DB_PATH) as conn:
+        df = pd.read_sql("""
+            SELECT stage, doc_count, char_count, finding_count, wall_ms, cpu_ms
+            FROM pipeline_metrics
+            WHERE run_id IN (
+                SELECT run_id FROM pipeline_metrics
+                GROUP BY run_id ORDER BY MAX(metric_id) DESC LIMIT ?
+            )
+        """, conn, params=(last_runs,))
+    if df.empty:
+        return df
+
+    totals = df.groupby('stage', sort=False)[['char_count', 'finding_count']].sum()
+
+    # Batch stages are spread evenly over the documents they covered
+    docs = df['doc_count'].clip(lower=1)
+    df['wall_ms'] = df['wall_ms'] / docs
+    df['cpu_ms'] = df['cpu_ms'] / docs
+    per_doc = df.loc[df.index.repeat(docs)].groupby('stage', sort=False)
+
+    summary = pd.DataFrame({
+        'documents': per_doc.size(),
+        'p50_wall_ms': per_doc['wall_ms'].quantile(0.5),
+        'p95_wall_ms': per_doc['wall_ms'].quantile(0.95),
+        'p50_cpu_ms': per_doc['cpu_ms'].quantile(0.5),
+        'p95_cpu_ms': per_doc['cpu_ms'].quantile(0.95),
+        'chars': totals['char_count'],
+        'findings': totals['finding_count'],
+    })
+    return summary.round(1).reset_index()
+
+# ─────────────────────────────────────────────
+# HIGHLIGHTS
+# ─────────────────────────────────────────────
+
+_HIGHLIGHT_COLUMNS = """
+    pii_id, pii_text, filepath, pii_hash, label, occurrence_index, status,
+    is_manual, category, event_code, methodology, confidence_score, scoring_method
+"""
+
+_HIGHLIGHT_SELECT = """
+    SELECT
+        p.pii_id, p.pii_text, p.filepath, p.pii_hash,
+        COALESCE(j.neutral, p.label) AS label,
+        p.occurrence_index, p.status, p.is_manual,
+        p.label AS category, r.event_code,
+        r.methodology, p.confidence_score, p.scoring_method
+    FROM pending_pii p
+    LEFT JOIN event_registry r ON p.event_code = r.event_code
+    LEFT JOIN job_dict j ON p.pii_text = j.original
+"""
+
+_BUMP_VERSION = "ON CONFLICT (filepath) DO UPDATE SET version = version + 1"
+
+# Keep ui_highlight and highlight_versions in step with every row change.
+# db_schema_guard.py and the root pipeline.py create the same triggers.
+HIGHLIGHT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ui_highlight_pii_insert AFTER INSERT ON pending_pii BEGIN
+        INSERT OR REPLACE INTO ui_highlight ({_HIGHLIGHT_COLUMNS})
+            {_HIGHLIGHT_SELECT} WHERE p.pii_id = NEW.pii_id;
+        INSERT INTO highlight_versions (filepath, version) VALUES (NEW.filepath, 1) {_BUMP_VERSION};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ui_highlight_pii_update AFTER UPDATE ON pending_pii BEGIN
+        DELETE FROM ui_highlight WHERE pii_id = OLD.pii_id;
+        INSERT OR REPLACE INTO ui_highlight ({_HIGHLIGHT_COLUMNS})
+            {_HIGHLIGHT_SELECT} WHERE p.pii_id = NEW.pii_id;
+        INSERT INTO highlight_versions (filepath, version)
+            SELECT filepath, 1 FROM (SELECT OLD.filepath AS filepath UNION SELECT NEW.filepath)
+            WHERE filepath IS NOT NULL {_BUMP_VERSION};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ui_highlight_pii_delete AFTER DELETE ON pending_pii BEGIN
+        DELETE FROM ui_highlight WHERE pii_id = OLD.pii_id;
+        INSERT INTO highlight_versions (filepath, version) VALUES (OLD.filepath, 1) {_BUMP_VERSION};
+    END
+    """,
+]
+
+def _dict_trigger(event, rows):
+    # A job_dict entry relabels its text in every document
+    body = "".join(f"""
+        INSERT OR REPLACE INTO ui_highlight ({_HIGHLIGHT_COLUMNS})
+            {_HIGHLIGHT_SELECT} WHERE p.pii_text = {row}.original;
+        INSERT INTO highlight_versions (filepath, version)
+            SELECT DISTINCT filepath, 1 FROM pending_pii WHERE pii_text = {row}.original {_BUMP_VERSION};
+    """ for row in rows)
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS ui_highlight_dict_{event.lower()} AFTER {event} ON job_dict BEGIN
+        {body}
+    END
+    """
+
+HIGHLIGHT_TRIGGERS += [
+    _dict_trigger("INSERT", ["NEW"]),
+    _dict_trigger("UPDATE", ["OLD", "NEW"]),
+    _dict_trigger("DELETE", ["OLD"]),
+]
+
+def rebuild_highlights(conn):
+    """Fills ui_highlight from scratch, e.g. when it replaces the old view."""
+    conn.execute("DELETE FROM ui_highlight")
+    conn.execute(f"INSERT INTO ui_highlight ({_HIGHLIGHT_COLUMNS}) {_HIGHLIGHT_SELECT}")
+    conn.execute(f"""
+        INSERT INTO highlight_versions (filepath, version)
+        SELECT DISTINCT filepath, 1 FROM pending_pii WHERE filepath IS NOT NULL {_BUMP_VERSION}
+    """)
+
+def get_highlight_version(filepath):
+    with db_pool.connect(DB_PATH) as conn:
+        res = conn.execute("SELECT version FROM highlight_versions WHERE filepath = ?", (filepath,)).fetchone()
+        return res[0] if res else 0
+
 def get_detected_data(filepath):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         return pd.read_sql("SELECT * FROM ui_highlight WHERE filepath = ?", conn, params=(filepath,))
 
 def toggle_pii_status(pii_id):
     #Toggles REDACT/EXCLUDE for a specific detection.
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         conn.execute("""
             UPDATE pending_pii 
             SET status = CASE
@@ -188,7 +485,7 @@ def toggle_pii_status(pii_id):
         conn.commit()
 
 def get_pii_category(pii_id):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         res = conn.execute(
             "SELECT label FROM pending_pii WHERE pii_id = ?",
             (pii_id,)
@@ -197,7 +494,7 @@ def get_pii_category(pii_id):
 
 def toggle_all_pii_status(filepath, text):
     #Toggles status for ALL instances of a specific text in one file."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         # If the first one is REDACT, make them all EXCLUDE, and vice versa.
         conn.execute("""
             UPDATE pending_pii 
@@ -207,7 +504,7 @@ def toggle_all_pii_status(filepath, text):
         conn.commit()
 
 def get_occurrence_count(filepath, text):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.execute(
             "SELECT COUNT(*) FROM pending_pii WHERE filepath = ? AND pii_text = ?", 
             (filepath, text)
@@ -216,12 +513,12 @@ def get_occurrence_count(filepath, text):
         return count
     
 def get_pii_status(pii_id):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         res = conn.execute("SELECT status FROM pending_pii WHERE pii_id = ?", (pii_id,)).fetchone()
         return res[0] if res else "REDACT"
     
 def check_if_pii_exists(filepath, text):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.execute("""
             SELECT 1 FROM pending_pii 
             WHERE filepath = ? AND pii_text = ? 
@@ -230,7 +527,7 @@ def check_if_pii_exists(filepath, text):
         return cursor.fetchone() is not None
 
 def get_pii_details(pii_id):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         res = conn.execute("""
             SELECT 
                 p.status,
@@ -262,7 +559,7 @@ def update_substitution(self, row_id, substitution_text):
     self.execute_query(query, (substitution_text, row_id))
 
 def get_unsynced_count(filepath, text, target_status):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         # Count how many instances ARE NOT currently set to the target_status
         res = conn.execute("""
             SELECT COUNT(DISTINCT pii_id) FROM pending_pii 
@@ -271,14 +568,14 @@ def get_unsynced_count(filepath, text, target_status):
         return res[0]
 
 def sync_all_pii_status(filepath, text, target_status):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         conn.execute("""
             UPDATE pending_pii SET status = ? 
             WHERE filepath = ? AND pii_text = ?
         """, (target_status, filepath, text))
 
 def save_manual_tag(filepath, text, label, index, pii_hash):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         conn.execute("""
             INSERT INTO pending_pii (filepath, pii_text, pii_hash, label, occurrence_index, confidence_score, event_code, status, is_manual)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -286,7 +583,7 @@ def save_manual_tag(filepath, text, label, index, pii_hash):
         conn.commit()
 
 def save_neutralization(filepath, original_text, neutral_text):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.cursor()
 
         # 1. Update Global Dictionary
@@ -333,7 +630,7 @@ def save_neutralization(filepath, original_text, neutral_text):
         conn.commit()
 
 def update_neutralization(filepath, original_text, old_neutral, new_neutral):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE pending_pii 
@@ -352,7 +649,7 @@ def update_neutralization(filepath, original_text, old_neutral, new_neutral):
 
 def upgrade_flag_to_replacement(row_id, substitution_text):
     # Converts an AI Flag (GEN-FL) into a User Replacement (GEN-RE).
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE pending_pii 
@@ -366,7 +663,7 @@ def upgrade_flag_to_replacement(row_id, substitution_text):
 
 def mark_as_ready(filepath, status='READY'):
     # Can toggle between database state 'ready' or 'pending'
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         conn.execute(
             "UPDATE pending_review SET status = ? WHERE filepath = ?",
             (status, filepath)
@@ -375,7 +672,7 @@ def mark_as_ready(filepath, status='READY'):
 
 def get_ready_for_clipboard():
     """Fetches all documents waiting in the Dashboard."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         # We return the filepath and the markdown (to generate the sanitized text)
         cursor = conn.execute(
             "SELECT filepath, markdown FROM pending_review WHERE status = 'READY'"
@@ -387,20 +684,23 @@ def certify_document(filepath, original_text, sanitized_text, user_id):
     audit_id = hashlib.sha256(filepath.encode()).hexdigest()[:8].upper()
     hash_orig = hashlib.sha256(original_text.encode()).hexdigest()
     hash_sani = hashlib.sha256(sanitized_text.encode()).hexdigest()
-    filename_hash = hashlib.sha256(os.path.basename(filepath).encode()).hexdigest()
+    filename_hash = make_filename_hash(filepath)
+
+    with db_pool.connect(DB_PATH) as conn:
+        row = conn.execute("SELECT content_hash FROM pending_review WHERE filepath = ?", (filepath,)).fetchone()
+        content_hash = row[0] if row else None
 
-    with sqlite3.connect(DB_PATH) as conn:
         # 1. Write to audit_trail before clearing pending_pii
         conn.execute("""
             INSERT INTO audit_trail (
                 record_uuid, audit_id, timestamp, user_id,
                 event_code, pii_hash, label,
-                occurrence_index, confidence_score, commit_uuid
+                occurrence_index, confidence_score, scoring_method, commit_uuid
             )
             SELECT 
                 lower(hex(randomblob(16))), ?, ?, ?,
                 event_code, pii_hash, label,
-                occurrence_index, confidence_score, ?
+                occurrence_index, confidence_score, scoring_method, ?
             FROM pending_pii
             WHERE filepath = ?
         """, (audit_id, datetime.now().isoformat(), user_id, c_uuid, filepath))
@@ -410,12 +710,12 @@ def certify_document(filepath, original_text, sanitized_text, user_id):
             INSERT INTO final_commit (
                 commit_uuid, audit_id, filename_hash, sanitized_text,
                 hash_original, hash_sanitized,
-                approval_timestamp, user_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                approval_timestamp, user_id, content_hash
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             c_uuid, audit_id, filename_hash, sanitized_text,
             hash_orig, hash_sani,
-            datetime.now().isoformat(), user_id
+            datetime.now().isoformat(), user_id, content_hash
         ))
 
         # 3. Clear workspace
@@ -424,7 +724,7 @@ def certify_document(filepath, original_text, sanitized_text, user_id):
         conn.commit()
 
 def get_user(username):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         res = conn.execute(
             "SELECT user_id, username, password_hash, role FROM users WHERE username = ?",
             (username,)
@@ -435,7 +735,7 @@ def create_user(username, password, role='reviewer'):
     import hashlib, uuid
     user_id = str(uuid.uuid4())
     password_hash = hashlib.sha256(password.encode()).hexdigest()
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         try:
             conn.execute("""
                 INSERT INTO users (user_id, username, password_hash, role, created_at)
@@ -457,12 +757,12 @@ def verify_user(username, password):
     return None
 
 def user_count():
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         res = conn.execute("SELECT COUNT(*) FROM users").fetchone()
         return res[0]
     
 def discard_document(filepath, user_id):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE pending_review 
@@ -472,7 +772,7 @@ def discard_document(filepath, user_id):
         conn.commit()
 
 def restore_document(filepath, user_id):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE pending_review 
@@ -482,7 +782,7 @@ def restore_document(filepath, user_id):
         conn.commit()
 
 def get_discarded_documents():
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         return pd.read_sql("""
             SELECT filepath
             FROM pending_review 
@@ -491,7 +791,7 @@ def get_discarded_documents():
         """, conn)
     
 def purge_discarded():
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.cursor()
         # Get discarded filepaths first to clean pending_pii
         cursor.execute("SELECT filepath FROM pending_review WHERE status = 'VERWORFEN'")
@@ -502,7 +802,7 @@ def purge_discarded():
         conn.commit()
 
 def revert_neutralization(filepath, original_text):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         cursor = conn.cursor()
         # Revert pending_pii row back to flagged state
         cursor.execute("""
@@ -520,7 +820,7 @@ def revert_neutralization(filepath, original_text):
         conn.commit()
 
 def export_audit_xlsx(output_path):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         df_commits = pd.read_sql("""
             SELECT 
                 commit_uuid, audit_id, sanitized_text,
@@ -533,7 +833,7 @@ def export_audit_xlsx(output_path):
             SELECT
                 a.record_uuid, a.audit_id, a.timestamp,
                 a.user_id, a.event_code, a.label,
-                a.occurrence_index, a.confidence_score,
+                a.occurrence_index, a.confidence_score, a.scoring_method,
                 a.commit_uuid, e.methodology, e.legal_basis
             FROM audit_trail a
             LEFT JOIN event_registry e ON a.event_code = e.event_code
@@ -548,61 +848,104 @@ def export_audit_xlsx(output_path):
 
     return export_path
 
-def get_archived_documents():
-    with sqlite3.connect(DB_PATH) as conn:
-        tables = [row[0] for row in conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table'"
-        ).fetchall()]
-        if 'final_commit' not in tables:
-            return pd.DataFrame()
-        return pd.read_sql("""
-            SELECT 
-                commit_uuid, audit_id, sanitized_text,
-                hash_original, hash_sanitized,
-                approval_timestamp, user_id
-            FROM final_commit
-            ORDER BY approval_timestamp DESC
-        """, conn)
+# ─────────────────────────────────────────────
+# ARCHIVE
+# ─────────────────────────────────────────────
+
+# Sortable archive columns; commit_uuid breaks ties so pages never overlap
+ARCHIVE_SORT_COLUMNS = {'approval_timestamp', 'audit_id'}
+
+def _archive_filter(search_audit=None, date_from=None, date_to=None):
+    """WHERE clause and parameters for the archive filters. Dates are datetime.date."""
+    clauses, params = [], []
+    if search_audit:
+        escaped = search_audit.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        # LIKE ignores ASCII case, like the old str.contains(case=False)
+        clauses.append("audit_id LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    if date_from:
+        clauses.append("approval_timestamp >= ?")
+        params.append(date_from.isoformat())
+    if date_to:
+        # ISO timestamps compare as text; the whole day date_to is included
+        clauses.append("approval_timestamp < ?")
+        params.append((date_to + timedelta(days=1)).isoformat())
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def get_archive_summary():
+    """(number of archived documents, oldest approval_timestamp or None)."""
+    with db_pool.connect(DB_PATH) as conn:
+        return conn.execute("SELECT COUNT(*), MIN(approval_timestamp) FROM final_commit").fetchone()
+
+def get_archive_page(search_audit=None, date_from=None, date_to=None,
+                     sort_by='approval_timestamp', ascending=False, limit=10, offset=0):
+    """
+    One page of the archive, filtered and sorted in SQL. Returns (DataFrame,
+    total matches). sanitized_text is left out, fetch it per row with
+    get_archived_by_commit.
+    """
+    if sort_by not in ARCHIVE_SORT_COLUMNS:
+        raise ValueError(f"Cannot sort the archive by {sort_by!r}")
+    where, params = _archive_filter(search_audit, date_from, date_to)
+    direction = "ASC" if ascending else "DESC"
+    with db_pool.connect(DB_PATH) as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM final_commit{where}", params).fetchone()[0]
+        page = pd.read_sql(f"""
+            SELECT commit_uuid, audit_id, approval_timestamp, user_id
+            FROM final_commit{where}
+            ORDER BY {sort_by} {direction}, commit_uuid {direction}
+            LIMIT ? OFFSET ?
+        """, conn, params=(*params, limit, offset))
+    return page, total
+
+def get_archive_commit_uuids(search_audit=None, date_from=None, date_to=None):
+    """commit_uuids of all filtered archive rows, e.g. to select them all."""
+    where, params = _archive_filter(search_audit, date_from, date_to)
+    with db_pool.connect(DB_PATH) as conn:
+        return [row[0] for row in conn.execute(f"SELECT commit_uuid FROM final_commit{where}", params)]
 
 def find_duplicate(filename, file_hash):
-    filename_hash = hashlib.sha256(filename.encode()).hexdigest()
-    with sqlite3.connect(DB_PATH) as conn:
-        tables = [row[0] for row in conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table'"
-        ).fetchall()]
-
-        if 'pending_review' in tables:
-            result = conn.execute("""
-                SELECT filepath, status FROM pending_review
-                WHERE filepath LIKE ?
-            """, (f"%{filename}",)).fetchone()
-            if result:
-                filepath, status = result
-                audit_id = hashlib.sha256(filepath.encode()).hexdigest()[:8].upper()
-                return {
-                    'found': True,
-                    'location': 'staging',
-                    'status': status,
-                    'audit_id': audit_id
-                }
-
-        if 'final_commit' in tables:
-            result = conn.execute("""
-                SELECT audit_id FROM final_commit
-                WHERE filename_hash = ?
-            """, (filename_hash,)).fetchone()
-            if result:
-                return {
-                    'found': True,
-                    'location': 'archive',
-                    'status': 'ARCHIVIERT',
-                    'audit_id': result[0]
-                }
+    """Same file name or same content, in staging or in the archive. Both are index seeks."""
+    filename_hash = make_filename_hash(filename)
+    with db_pool.connect(DB_PATH) as conn:
+        result = conn.execute("""
+            SELECT filepath, status FROM pending_review
+            WHERE filename_hash = ? OR content_hash = ?
+        """, (filename_hash, file_hash)).fetchone()
+        if result:
+            filepath, status = result
+            audit_id = hashlib.sha256(filepath.encode()).hexdigest()[:8].upper()
+            return {
+                'found': True,
+                'location': 'staging',
+                'status': status,
+                'audit_id': audit_id
+            }
+
+        result = conn.execute("""
+            SELECT audit_id FROM final_commit
+            WHERE filename_hash = ? OR content_hash = ?
+        """, (filename_hash, file_hash)).fetchone()
+        if result:
+            return {
+                'found': True,
+                'location': 'archive',
+                'status': 'ARCHIVIERT',
+                'audit_id': result[0]
+            }
 
         return {'found': False}
 
+def is_content_in_vault(file_hash):
+    """Whether this content is staged for review (not discarded) or archived."""
+    with db_pool.connect(DB_PATH) as conn:
+        return conn.execute("""
+            SELECT 1 FROM pending_review WHERE content_hash = ? AND status != 'VERWORFEN'
+            UNION ALL SELECT 1 FROM final_commit WHERE content_hash = ? LIMIT 1
+        """, (file_hash, file_hash)).fetchone() is not None
+
 def get_audit_highlighter_df(commit_uuid):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         return pd.read_sql("""
             SELECT
                 a.record_uuid as pii_id,
@@ -610,6 +953,7 @@ def get_audit_highlighter_df(commit_uuid):
                 a.label,
                 a.occurrence_index,
                 a.confidence_score,
+                a.scoring_method,
                 a.event_code,
                 e.category,
                 'REDACT' as status,
@@ -620,7 +964,7 @@ def get_audit_highlighter_df(commit_uuid):
         """, conn, params=(commit_uuid,))
     
 def get_archived_by_commit(commit_uuid):
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_pool.connect(DB_PATH) as conn:
         result = conn.execute("""
             SELECT commit_uuid, audit_id, sanitized_text,
                    approval_timestamp, user_id
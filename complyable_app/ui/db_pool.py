@@ -0,0 +1,62 @@
+"""
+db_pool.py — Shared SQLite connections for the vault DB.
+One connection per thread and database file, opened once and reused instead
+of a fresh sqlite3.connect() per query. Every connection runs in WAL mode, so
+the pipeline worker writes while reviewers keep reading, and waits on a busy
+timeout instead of failing with `database is locked`.
+
+    with db_pool.connect(DB_PATH) as conn:   # commits, or rolls back on error
+        conn.execute(...)
+"""
+
+import os
+import sqlite3
+import threading
+
+# Milliseconds a connection waits for another writer before giving up
+BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '30000'))
+# NORMAL is durable in WAL mode except for the last commits before a power loss
+SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+# Page cache per connection, in KiB
+CACHE_KB = int(os.getenv('DB_CACHE_KB', '32768'))
+# Memory-mapped reads, in MiB. 0 turns mmap off.
+MMAP_MB = int(os.getenv('DB_MMAP_MB', '256'))
+# Prepared statements kept per connection
+STATEMENT_CACHE = int(os.getenv('DB_STATEMENT_CACHE', '256'))
+
+_local = threading.local()
+
+def _open(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE,
+    )
+    # journal_mode is stored in the file, the other pragmas are per connection
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_MB * 1024 * 1024}")
+    return conn
+
+def connect(path):
+    """
+    The calling thread's connection to path. Use it as a context manager
+    (`with db_pool.connect(path) as conn:`) and never close it. Parse
+    worker processes get their own connections after a fork.
+    """
+    pid = os.getpid()
+    if getattr(_local, 'pid', None) != pid:
+        _local.pid = pid
+        _local.connections = {}
+    conn = _local.connections.get(path)
+    if conn is None:
+        conn = _local.connections[path] = _open(path)
+    return conn
+
+def close():
+    """Closes the calling thread's connections, e.g. before a worker exits."""
+    for conn in getattr(_local, 'connections', {}).values():
+        conn.close()
+    _local.connections = {}
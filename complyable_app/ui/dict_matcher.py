@@ -0,0 +1,122 @@
+"""
+dict_matcher.py — Aho-Corasick matcher for the Tier 3 job_dict lookup.
+The automaton is built once per dictionary version and finds every job
+title in a single linear pass, case-insensitive, on word boundaries,
+preferring the longest match — the same result the old longest-first
+regex loop produced, without one regex per dictionary row.
+"""
+
+import hashlib
+from collections import deque
+
+# Built automatons keyed by dictionary fingerprint. Only the latest few are kept.
+_AUTOMATON_CACHE = {}
+_CACHE_SIZE = 4
+
+def _fold(text):
+    # Lowercase without changing string length, so offsets stay valid
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+def _is_word(ch):
+    return ch.isalnum() or ch == "_"
+
+def _on_boundary(text, pos):
+    # Equivalent of regex \b at pos
+    before = pos > 0 and _is_word(text[pos - 1])
+    after = pos < len(text) and _is_word(text[pos])
+    return before != after
+
+def build_automaton(entries):
+    """
+    entries: iterable of (original, neutral). The first entry wins when two
+    originals only differ in case.
+    """
+    goto = [{}]
+    fail = [0]
+    out = [()]
+    payloads = []
+    seen = set()
+
+    for original, neutral in entries:
+        key = _fold(str(original))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        node = 0
+        for ch in key:
+            nxt = goto[node].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[node][ch] = nxt
+                goto.append({})
+                fail.append(0)
+                out.append(())
+            node = nxt
+        out[node] = out[node] + ((len(key), len(payloads)),)
+        payloads.append((str(original), neutral))
+
+    # Breadth-first failure links; outputs inherit from their failure node
+    queue = deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        for ch, nxt in goto[node].items():
+            queue.append(nxt)
+            f = fail[node]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[nxt] = goto[f].get(ch, 0)
+            out[nxt] = out[nxt] + out[fail[nxt]]
+
+    return {'goto': goto, 'fail': fail, 'out': out, 'payloads': payloads}
+
+def find_matches(automaton, text):
+    """
+    Returns non-overlapping matches as (start, end, original, neutral),
+    in text order. Leftmost match wins, longest first at the same start.
+    """
+    goto, fail, out = automaton['goto'], automaton['fail'], automaton['out']
+    folded = _fold(text)
+
+    candidates = []
+    node = 0
+    for pos, ch in enumerate(folded):
+        while node and ch not in goto[node]:
+            node = fail[node]
+        node = goto[node].get(ch, 0)
+        for length, pid in out[node]:
+            start = pos + 1 - length
+            if _on_boundary(text, start) and _on_boundary(text, pos + 1):
+                candidates.append((start, -length, pid))
+
+    matches = []
+    last_end = 0
+    for start, neg_length, pid in sorted(candidates):
+        end = start - neg_length
+        if start < last_end:
+            continue
+        original, neutral = automaton['payloads'][pid]
+        matches.append((start, end, original, neutral))
+        last_end = end
+    return matches
+
+def dictionary_fingerprint(entries):
+    sha = hashlib.sha256()
+    for original, neutral in entries:
+        sha.update(f"{original}\t{neutral}\n".encode('utf-8'))
+    return sha.hexdigest()
+
+def get_automaton(job_table):
+    """Returns the automaton for a job_dict DataFrame, rebuilding only when its contents changed."""
+    entries = list(zip(job_table['original'].astype(str), job_table['neutral']))
+    fingerprint = dictionary_fingerprint(entries)
+    automaton = _AUTOMATON_CACHE.get(fingerprint)
+    if automaton is None:
+        automaton = build_automaton(entries)
+        if len(_AUTOMATON_CACHE) >= _CACHE_SIZE:
+            _AUTOMATON_CACHE.pop(next(iter(_AUTOMATON_CACHE)))
+        _AUTOMATON_CACHE[fingerprint] = automaton
+        print(f"[Tier3] Built job_dict automaton ({len(entries)} entries).")
+    return automaton
@@ -0,0 +1,235 @@
+"""
+job_queue.py — Durable per-file job queue in the vault DB (pipeline_jobs).
+Every staged file becomes one job: queued → running → done | failed.
+A worker claims jobs under a lease and renews it with heartbeats while it
+works; when a worker dies, its lease runs out and the job is queued again.
+Replaces the old global .pipeline.lock file.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = os.getenv('DB_PATH', str(BASE_DIR / "data" / "vault" / "complyable_vault.db"))
+
+# Seconds a claim stays valid without a heartbeat
+LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '120'))
+# Attempts before an expired job is given up as failed
+MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+def make_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+def _connect():
+    # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+@contextmanager
+def _transaction():
+    conn = _connect()
+    try:
+        # Takes the write lock up front, so two workers never claim the same job
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+# ─────────────────────────────────────────────
+# PRODUCERS
+# ─────────────────────────────────────────────
+
+def enqueue(filepath):
+    """
+    Queues one file. Returns the job_id, or None when the file is gone, already
+    has an open job, or failed before and has not been replaced since.
+    """
+    filepath = str(filepath)
+    try:
+        mtime = os.path.getmtime(filepath)
+    except FileNotFoundError:
+        return None
+    with _transaction() as conn:
+        last = conn.execute("""
+            SELECT state, enqueued_at FROM pipeline_jobs
+            WHERE filepath = ? ORDER BY job_id DESC LIMIT 1
+        """, (filepath,)).fetchone()
+        if last and (last['state'] in (QUEUED, RUNNING)
+                     or (last['state'] == FAILED and last['enqueued_at'] >= mtime)):
+            return None
+        cur = conn.execute("""
+            INSERT INTO pipeline_jobs (filepath, state, attempts, enqueued_at)
+            VALUES (?, ?, 0, ?)
+        """, (filepath, QUEUED, time.time()))
+        return cur.lastrowid
+
+def enqueue_files(filepaths):
+    """Queues several files. Returns the number of new jobs."""
+    return sum(1 for f in filepaths if enqueue(f) is not None)
+
+# ─────────────────────────────────────────────
+# WORKERS
+# ─────────────────────────────────────────────
+
+def requeue_expired(conn, now=None):
+    """Puts running jobs with a lapsed lease back in the queue, or fails them after MAX_ATTEMPTS."""
+    now = time.time() if now is None else now
+    expired = conn.execute("""
+        SELECT job_id, attempts, worker_id FROM pipeline_jobs
+        WHERE state = ? AND lease_expires < ?
+    """, (RUNNING, now)).fetchall()
+    for job in expired:
+        if job['attempts'] >= MAX_ATTEMPTS:
+            conn.execute("""
+                UPDATE pipeline_jobs SET state = ?, finished_at = ?, worker_id = NULL,
+                       error = 'Lease expired after ' || attempts || ' attempts'
+                WHERE job_id = ?
+            """, (FAILED, now, job['job_id']))
+        else:
+            conn.execute("""
+                UPDATE pipeline_jobs SET state = ?, worker_id = NULL, lease_expires = NULL
+                WHERE job_id = ?
+            """, (QUEUED, job['job_id']))
+        print(f"[Queue] Lease of job {job['job_id']} ({job['worker_id']}) expired.")
+    return len(expired)
+
+def claim(worker_id, limit=1, lease_seconds=None):
+    """Leases up to limit queued jobs, oldest first. Returns them as dicts."""
+    lease_seconds = LEASE_SECONDS if lease_seconds is None else lease_seconds
+    now = time.time()
+    with _transaction() as conn:
+        requeue_expired(conn, now)
+        rows = conn.execute("""
+            SELECT job_id FROM pipeline_jobs WHERE state = ?
+            ORDER BY job_id LIMIT ?
+        """, (QUEUED, limit)).fetchall()
+        job_ids = [row['job_id'] for row in rows]
+        if not job_ids:
+            return []
+        placeholders = ",".join("?" * len(job_ids))
+        conn.execute(f"""
+            UPDATE pipeline_jobs
+            SET state = ?, worker_id = ?, attempts = attempts + 1,
+                started_at = ?, heartbeat_at = ?, lease_expires = ?, error = NULL
+            WHERE job_id IN ({placeholders})
+        """, (RUNNING, worker_id, now, now, now + lease_seconds, *job_ids))
+        jobs = conn.execute(f"""
+            SELECT * FROM pipeline_jobs WHERE job_id IN ({placeholders}) ORDER BY job_id
+        """, job_ids).fetchall()
+    return [dict(job) for job in jobs]
+
+def heartbeat(job_ids, worker_id, lease_seconds=None):
+    """Extends the lease of jobs this worker still owns. Returns how many were renewed."""
+    if not job_ids:
+        return 0
+    lease_seconds = LEASE_SECONDS if lease_seconds is None else lease_seconds
+    now = time.time()
+    placeholders = ",".join("?" * len(job_ids))
+    with _transaction() as conn:
+        cur = conn.execute(f"""
+            UPDATE pipeline_jobs SET heartbeat_at = ?, lease_expires = ?
+            WHERE worker_id = ? AND state = ? AND job_id IN ({placeholders})
+        """, (now, now + lease_seconds, worker_id, RUNNING, *job_ids))
+        return cur.rowcount
+
+@contextmanager
+def keep_alive(job_ids, worker_id, lease_seconds=None):
+    """Renews the leases from a background thread while the block runs."""
+    lease_seconds = LEASE_SECONDS if lease_seconds is None else lease_seconds
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(lease_seconds / 3):
+            try:
+                heartbeat(job_ids, worker_id, lease_seconds)
+            except sqlite3.Error as e:
+                print(f"[Queue] Heartbeat failed: {e}")
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+def complete(job_id, worker_id):
+    """Marks a job done. Returns False when this worker no longer owns it (lease lost)."""
+    with _transaction() as conn:
+        cur = conn.execute("""
+            UPDATE pipeline_jobs SET state = ?, finished_at = ?, lease_expires = NULL
+            WHERE job_id = ? AND worker_id = ? AND state = ?
+        """, (DONE, time.time(), job_id, worker_id, RUNNING))
+        return cur.rowcount > 0
+
+def fail(job_id, worker_id, error):
+    with _transaction() as conn:
+        conn.execute("""
+            UPDATE pipeline_jobs SET state = ?, finished_at = ?, lease_expires = NULL, error = ?
+            WHERE job_id = ? AND worker_id = ?
+        """, (FAILED, time.time(), str(error)[:2000], job_id, worker_id))
+
+# ─────────────────────────────────────────────
+# STATUS
+# ─────────────────────────────────────────────
+
+def get_counts():
+    """Number of jobs per state, e.g. {'queued': 2, 'running': 1, ...}."""
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT state, COUNT(*) AS n FROM pipeline_jobs GROUP BY state").fetchall()
+    finally:
+        conn.close()
+    counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+    counts.update({row['state']: row['n'] for row in rows})
+    return counts
+
+def get_states(job_ids):
+    """{job_id: state} for the given jobs."""
+    if not job_ids:
+        return {}
+    placeholders = ",".join("?" * len(job_ids))
+    conn = _connect()
+    try:
+        rows = conn.execute(f"""
+            SELECT job_id, state FROM pipeline_jobs WHERE job_id IN ({placeholders})
+        """, list(job_ids)).fetchall()
+    finally:
+        conn.close()
+    return {row['job_id']: row['state'] for row in rows}
+
+def has_open_job(filepath):
+    """Whether the file is queued or being processed right now."""
+    conn = _connect()
+    try:
+        row = conn.execute("""
+            SELECT 1 FROM pipeline_jobs WHERE filepath = ? AND state IN (?, ?)
+        """, (str(filepath), QUEUED, RUNNING)).fetchone()
+    finally:
+        conn.close()
+    return row is not None
+
+def get_recent_failures(limit=10):
+    conn = _connect()
+    try:
+        rows = conn.execute("""
+            SELECT job_id, filepath, attempts, error, finished_at FROM pipeline_jobs
+            WHERE state = ? ORDER BY job_id DESC LIMIT ?
+        """, (FAILED, limit)).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
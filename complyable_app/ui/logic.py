@@ -7,7 +7,7 @@ from fpdf import FPDF
 from pathlib import Path
 import subprocess
 import platform
-from pipeline import run_pipeline
+import job_queue
 import unicodedata
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -184,6 +184,7 @@ def generate_compliance_document(filepath, sanitized_text, user_id, audit_id, hi
     if highlighter_df.empty:
         total = auto_redacted = manual = excluded = gen_auto = gen_user = gen_flagged = 0
         avg_conf = 1.0
+        scoring = "n/a"
     else:
         total = len(highlighter_df)
         auto_redacted = len(highlighter_df[
@@ -194,7 +195,13 @@ def generate_compliance_document(filepath, sanitized_text, user_id, audit_id, hi
         gen_auto = len(highlighter_df[highlighter_df['event_code'] == 'T3-GIP'])
         gen_user = len(highlighter_df[highlighter_df['event_code'] == 'USR-GIP'])
         gen_flagged = len(highlighter_df[highlighter_df['event_code'] == 'T3-FLG'])
-        avg_conf = round(highlighter_df['confidence_score'].mean(), 4)
+        # Findings scored with NLP_CONFIDENCE_MODE=off have no confidence
+        scores = highlighter_df['confidence_score'].dropna()
+        avg_conf = round(scores.mean(), 4) if not scores.empty else "n/a"
+        methods = set()
+        if 'scoring_method' in highlighter_df:
+            methods = set(highlighter_df.loc[highlighter_df['event_code'] == 'T2-NER', 'scoring_method'].dropna())
+        scoring = ", ".join(sorted(methods)) or "n/a"
 
     summary_rows = [
         ("Total items detected", str(total)),
@@ -205,6 +212,7 @@ def generate_compliance_document(filepath, sanitized_text, user_id, audit_id, hi
         ("Gender neutralizations (user-defined)", str(gen_user)),
         ("Gender flags unresolved", str(gen_flagged)),
         ("Average detection confidence", str(avg_conf)),
+        ("NER confidence scoring", scoring),
     ]
 
     for label, value in summary_rows:
@@ -221,8 +229,8 @@ def generate_compliance_document(filepath, sanitized_text, user_id, audit_id, hi
 
     try:
         from database import DB_PATH
-        import sqlite3
-        with sqlite3.connect(DB_PATH) as conn:
+        import db_pool
+        with db_pool.connect(DB_PATH) as conn:
             methods = conn.execute("""
                 SELECT event_code, methodology, legal_basis, source_tier
                 FROM event_registry
@@ -321,6 +329,8 @@ def stage_uploaded_file(uploaded_file):
     target_path = INPUT_DIR / uploaded_file.name
     with open(target_path, "wb") as f:
         f.write(file_bytes)
+    # Queued right away — a running pipeline picks it up in its next round
+    job_queue.enqueue(target_path)
 
     return {
         'staged': True,
@@ -352,6 +362,3 @@ def stage_uploaded_file(uploaded_file):
 #         return False, e.stderr
 #     except subprocess.TimeoutExpired:
 #         return False, f"Knime time out"
-
-def trigger_pipeline(dir):
-   return run_pipeline(dir)
\ No newline at end of file
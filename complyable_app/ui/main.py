@@ -10,7 +10,6 @@ import os
 import shutil
 from datetime import datetime
 import time
-import pandas as pd
 
 
 # 1. SETUP
@@ -50,8 +49,8 @@ if "batch_complete" not in st.session_state:
     st.session_state.batch_complete = False
 if "last_ready_file" not in st.session_state:
     st.session_state.last_ready_file = None
-if "workflow_running" not in st.session_state:
-    st.session_state.workflow_running = False
+if "jobs_finished" not in st.session_state:
+    st.session_state.jobs_finished = None
 if "uploader_key" not in st.session_state:
     st.session_state.uploader_key = 0
 if "authenticated" not in st.session_state:
@@ -72,6 +71,9 @@ if "archive_page" not in st.session_state:
     st.session_state.archive_page = 0
 if "archive_checked" not in st.session_state:
     st.session_state.archive_checked = set()
+if "archive_checked_filters" not in st.session_state:
+    # Filters under which "select all" was last used
+    st.session_state.archive_checked_filters = None
 
 # ----------------------------------------------------------------------------------------
 # AUTH GATE
@@ -164,16 +166,67 @@ with st.sidebar:
         st.rerun()
 
 # ----------------------------------------------------------------------------------------
-# DASHBOARD VIEW
+# HIGHLIGHTS
 # ----------------------------------------------------------------------------------------
-if st.session_state.app_mode == "Dashboard":
-    is_busy = st.session_state.workflow_running
+def get_stage_metrics():
+    """Pipeline timings, recomputed only after a run recorded new ones."""
+    version = db.get_metrics_version()
+    cached = st.session_state.get('stage_metrics_cache')
+    if cached is None or cached[0] != version:
+        cached = st.session_state.stage_metrics_cache = (version, db.get_stage_metrics())
+    return cached[1]
+
+def get_highlights(filepath):
+    """ui_highlight rows of a document, re-read only when its version changed."""
+    cache = st.session_state.setdefault('highlight_cache', {})
+    version = db.get_highlight_version(filepath)
+    cached = cache.get(filepath)
+    if cached is None or cached[0] != version:
+        cached = cache[filepath] = (version, db.get_detected_data(filepath))
+    return cached[1]
+
+# ----------------------------------------------------------------------------------------
+# QUEUE STATUS
+# ----------------------------------------------------------------------------------------
+QUEUE_POLL_SECONDS = float(os.getenv('QUEUE_POLL_SECONDS', '3'))
+
+# Runs as a fragment: only this block reruns on every poll, the reviewer keeps working.
+# When the worker finishes jobs the whole page reruns so new documents show up.
+@st.fragment(run_every=QUEUE_POLL_SECONDS)
+def queue_status():
+    counts = workflow.get_queue_status()
+    if counts['queued'] or counts['running']:
+        st.info(
+            f"⏳ {counts['running']} Dokument(e) in Bearbeitung, "
+            f"{counts['queued']} in der Warteschlange. Sie können weiterarbeiten."
+        )
+
+    finished = (counts['done'], counts['failed'])
+    if st.session_state.jobs_finished is None:
+        st.session_state.jobs_finished = finished
+    elif finished != st.session_state.jobs_finished:
+        new_failures = counts['failed'] - st.session_state.jobs_finished[1]
+        st.session_state.jobs_finished = finished
+        if new_failures > 0:
+            st.toast(f"{new_failures} Dokument(e) konnten nicht verarbeitet werden.", icon="‼️")
+        else:
+            st.toast("Verarbeitung abgeschlossen!")
+        st.rerun()
 
-    if is_busy:
-        st.warning("Workflow läuft. Bitte warten.")
+    if counts['failed']:
+        with st.expander(f"‼️ Fehlgeschlagene Dokumente ({counts['failed']})"):
+            for job in workflow.get_recent_failures():
+                st.markdown(f"**{Path(job['filepath']).name}** · {job['attempts']} Versuch(e) · {job['finished_at']}")
+                st.caption(job['error'] or "Kein Fehlertext")
 
+# ----------------------------------------------------------------------------------------
+# DASHBOARD VIEW
+# ----------------------------------------------------------------------------------------
+if st.session_state.app_mode == "Dashboard":
     st.header("Dashboard")
 
+    queue_status()
+
     pending_count = len(db.get_pending_data())
     ready_count = len(workflow.get_clipboard_stack())
 
@@ -194,20 +247,6 @@ if st.session_state.app_mode == "Dashboard":
                 else:
                     st.error(message)
 
-    if st.session_state.workflow_running:
-        with st.spinner("Pipeline läuft... Bitte warten"):
-            success, message = logic.trigger_pipeline(str(logic.INPUT_DIR))
-            st.session_state.workflow_running = False
-            if success:
-                st.session_state.uploader_key += 1
-                st.session_state.app_mode = "Review"
-                st.session_state.doc_index = 0
-                st.toast("Verarbeitung abgeschlossen!")
-            else:
-                st.error(f"Fehler {message}")
-                st.code(message)
-            st.rerun()
-
     # ── Ready documents list ──
     ready_docs = workflow.get_clipboard_stack()
 
@@ -223,7 +262,7 @@ if st.session_state.app_mode == "Dashboard":
 
         for filepath, md_content in ready_docs:
             filename = Path(filepath).name
-            highlighter_df = db.get_detected_data(filepath)
+            highlighter_df = get_highlights(filepath)
             audit_id = logic.create_pii_hash(filename)[:8]
             sanitized_text = logic.generate_final_sanitized_text(md_content, highlighter_df)
             final_clip = f"{sanitized_text}\n\n--- Complyable Audit ID: {audit_id} ---"
@@ -265,294 +304,282 @@ if st.session_state.app_mode == "Dashboard":
                         st.session_state.app_mode = "Review"
                         st.rerun()
 
+    # ── Pipeline timings ──
+    stage_metrics = get_stage_metrics()
+    if not stage_metrics.empty:
+        st.divider()
+        with st.expander("⏱️ Pipeline-Laufzeiten (p50/p95 pro Dokument, letzte 20 Läufe)"):
+            st.dataframe(stage_metrics, use_container_width=True, hide_index=True)
+
 # ----------------------------------------------------------------------------------------
 # REVIEW VIEW
 # ----------------------------------------------------------------------------------------
 elif st.session_state.app_mode == "Review":
-    is_busy = st.session_state.workflow_running
-
     st.header("Revision & Freigabe")
 
-    if is_busy:
-        st.warning("Workflow läuft. Bitte warten.")
+    queue_status()
+
+    # ── Uploader always visible — uploads are queued, the worker processes them ──
+    uploaded_files = st.file_uploader(
+        "Neue Dokumente ablegen",
+        accept_multiple_files=True,
+        key=f"uploader_main_{st.session_state.uploader_key}"
+    )
+    
+    if uploaded_files:
+        if st.button("Prozess starten"):
+            duplicates = []
+            staged = []
+            for file in uploaded_files:
+                result = logic.stage_uploaded_file(file)
+                if result['duplicate']:
+                    duplicates.append(result)
+                else:
+                    staged.append(result)
+
+            if duplicates:
+                st.session_state.upload_warnings = duplicates
 
-    if st.session_state.workflow_running:
-        with st.spinner("Dokumente werden verarbeitet... Bitte warten"):
-            success, message = logic.trigger_pipeline(str(logic.INPUT_DIR))
-            st.session_state.workflow_running = False
-            if success:
+            if staged:
                 st.session_state.uploader_key += 1
-                st.session_state.doc_index = 0
-                st.toast("Verarbeitung abgeschlossen!")
-                time.sleep(1.5)
-            else:
-                st.error(f"Fehler {message}")
-                st.code(message)
+                st.toast(f"{len(staged)} Dokument(e) in die Warteschlange gestellt.")
+
             st.rerun()
-    else:
-        # ── Uploader always visible ──
-        uploaded_files = st.file_uploader(
-            "Neue Dokumente ablegen",
-            accept_multiple_files=True,
-            disabled=is_busy,
-            key=f"uploader_main_{st.session_state.uploader_key}"
-        )
-        
-        if uploaded_files and not is_busy:
-            if st.button("Prozess starten", disabled=is_busy):
-                duplicates = []
-                staged = []
-                for file in uploaded_files:
-                    result = logic.stage_uploaded_file(file)
-                    if result['duplicate']:
-                        duplicates.append(result)
-                    else:
-                        staged.append(result)
 
-                if duplicates:
-                    st.session_state.upload_warnings = duplicates
+    # Show persistent duplicate warnings above uploader
+    if st.session_state.upload_warnings:
+        for d in st.session_state.upload_warnings:
+            location_label = "Archiv" if d['location'] == 'archive' else "Warteschlange"
+            st.warning(
+                f"**{d['filename']}** wurde bereits verarbeitet "
+                f"({location_label} — Audit ID: `{d['audit_id']}`). "
+                f"Datei wird übersprungen."
+            )
+        if st.button("✖️ Meldungen schließen", key="clear_warnings"):
+            st.session_state.upload_warnings = []
+            st.rerun()
+    
+    st.divider()
 
-                if staged:
-                    st.session_state.workflow_running = True
-                    
+    # ── Review editor — only if documents are pending ──
+    if file_list:
+        # Quick select at top of review area
+        selected_path = st.selectbox(
+            "",
+            options=file_list,
+            index=st.session_state.doc_index,
+            format_func=lambda x: Path(x).name,
+            key=f"jump_select_{len(file_list)}",
+            label_visibility="collapsed"
+        )
+        new_index = file_list.index(selected_path)
+        if new_index != st.session_state.doc_index:
+            st.session_state.doc_index = new_index
+            st.rerun()
+    if not file_list:
+        st.info("Keine Dokumente zur Prüfung. Bitte Dateien ablegen.")
+    else:
+        current_rows = df_pending[df_pending['filepath'] == selected_file]
+        if current_rows.empty:
+            st.session_state.doc_index = 0
+            st.rerun()
+            st.stop()
+
+        doc_row = current_rows.iloc[0]
+        highlighter_df = get_highlights(selected_file)
+        # ... rest of review editor unchanged
+
+        # ── Navigation bar ──
+        # ── Review edit area ──
+        col_main, col_toolbox = st.columns([3, 1])
+
+        with col_toolbox:
+            # ── Document info ─────────────────────────────────────────
+            st.caption(f"{Path(selected_file).name}")
+            st.caption(f"Dokument {st.session_state.doc_index + 1} / {st.session_state.total_files}")
+            
+            # ── Document controls ─────────────────────────────────────
+            ctrl1, ctrl2 = st.columns(2)
+            with ctrl1:
+                if st.button("Bereinigt", type="primary", use_container_width=True):
+                    st.session_state.last_ready_file = selected_file
+                    workflow.mark_document_ready(selected_file, 'READY')
+                    st.session_state.doc_index = 0
+                    if len(file_list) <= 1:
+                        st.session_state.app_mode = "Dashboard"
+                    st.toast("Dokument ist bereinigt!")
                     st.rerun()
-                else:
+            with ctrl2:
+                if st.button("Zurück", use_container_width=True,
+                            disabled=(not st.session_state.last_ready_file)):
+                    if st.session_state.last_ready_file:
+                        workflow.mark_document_ready(
+                            st.session_state.last_ready_file, 'PENDING'
+                        )
+                        st.session_state.last_ready_file = None
                     st.rerun()
 
-        # Show persistent duplicate warnings above uploader
-        if st.session_state.upload_warnings:
-            for d in st.session_state.upload_warnings:
-                location_label = "Archiv" if d['location'] == 'archive' else "Warteschlange"
-                st.warning(
-                    f"**{d['filename']}** wurde bereits verarbeitet "
-                    f"({location_label} — Audit ID: `{d['audit_id']}`). "
-                    f"Datei wird übersprungen."
-                )
-            if st.button("✖️ Meldungen schließen", key="clear_warnings"):
-                st.session_state.upload_warnings = []
-                st.rerun()
-        
-        st.divider()
-
-        # ── Review editor — only if documents are pending ──
-        if file_list:
-            # Quick select at top of review area
-            selected_path = st.selectbox(
-                "",
-                options=file_list,
-                index=st.session_state.doc_index,
-                format_func=lambda x: Path(x).name,
-                key=f"jump_select_{len(file_list)}",
-                label_visibility="collapsed"
-            )
-            new_index = file_list.index(selected_path)
-            if new_index != st.session_state.doc_index:
-                st.session_state.doc_index = new_index
-                st.rerun()
-        if not file_list:
-            st.info("Keine Dokumente zur Prüfung. Bitte Dateien ablegen.")
-        else:
-            current_rows = df_pending[df_pending['filepath'] == selected_file]
-            if current_rows.empty:
-                st.session_state.doc_index = 0
-                st.rerun()
-                st.stop()
-
-            doc_row = current_rows.iloc[0]
-            highlighter_df = db.get_detected_data(selected_file)
-            # ... rest of review editor unchanged
-
-            # ── Navigation bar ──
-            # ── Review edit area ──
-            col_main, col_toolbox = st.columns([3, 1])
-
-            with col_toolbox:
-                # ── Document info ─────────────────────────────────────────
-                st.caption(f"{Path(selected_file).name}")
-                st.caption(f"Dokument {st.session_state.doc_index + 1} / {st.session_state.total_files}")
-                
-                # ── Document controls ─────────────────────────────────────
-                ctrl1, ctrl2 = st.columns(2)
-                with ctrl1:
-                    if st.button("Bereinigt", type="primary", use_container_width=True):
-                        st.session_state.last_ready_file = selected_file
-                        workflow.mark_document_ready(selected_file, 'READY')
+            # ── Discard ───────────────────────────────────────────────
+            if not st.session_state.confirm_discard:
+                if styles.orange_button("Verwerfen", use_container_width=True, key="discard_btn"):
+                    st.session_state.confirm_discard = True
+                    st.rerun()
+            else:
+                st.warning("Wirklich verwerfen?")
+                col_yes, col_no = st.columns(2)
+                with col_yes:
+                    if st.button("Ja", use_container_width=True, key="confirm_yes"):
+                        db.discard_document(
+                            selected_file,
+                            st.session_state.current_user['username']
+                        )
+                        st.session_state.confirm_discard = False
+                        st.session_state.selected_word = None
                         st.session_state.doc_index = 0
-                        if len(file_list) <= 1:
-                            st.session_state.app_mode = "Dashboard"
-                        st.toast("Dokument ist bereinigt!")
                         st.rerun()
-                with ctrl2:
-                    if st.button("Zurück", use_container_width=True,
-                                disabled=(not st.session_state.last_ready_file)):
-                        if st.session_state.last_ready_file:
-                            workflow.mark_document_ready(
-                                st.session_state.last_ready_file, 'PENDING'
-                            )
-                            st.session_state.last_ready_file = None
+                with col_no:
+                    if st.button("Nein", use_container_width=True, key="confirm_no"):
+                        st.session_state.confirm_discard = False
                         st.rerun()
 
-                # ── Discard ───────────────────────────────────────────────
-                if not st.session_state.confirm_discard:
-                    if styles.orange_button("Verwerfen", use_container_width=True, key="discard_btn"):
-                        st.session_state.confirm_discard = True
-                        st.rerun()
-                else:
-                    st.warning("Wirklich verwerfen?")
-                    col_yes, col_no = st.columns(2)
-                    with col_yes:
-                        if st.button("Ja", use_container_width=True, key="confirm_yes"):
-                            db.discard_document(
-                                selected_file,
-                                st.session_state.current_user['username']
-                            )
-                            st.session_state.confirm_discard = False
-                            st.session_state.selected_word = None
-                            st.session_state.doc_index = 0
-                            st.rerun()
-                    with col_no:
-                        if st.button("Nein", use_container_width=True, key="confirm_no"):
-                            st.session_state.confirm_discard = False
-                            st.rerun()
+            st.divider()
 
-                st.divider()
+            # ── Item toolbox ──────────────────────────────────────────
+            grab_state = st.session_state.get("selected_word")
+            word = logic.strip_ui_labels(grab_state)
+            target_id = st.session_state.get("selected_id")
 
-                # ── Item toolbox ──────────────────────────────────────────
-                grab_state = st.session_state.get("selected_word")
-                word = logic.strip_ui_labels(grab_state)
-                target_id = st.session_state.get("selected_id")
+            if word:
+                if target_id is not None:
+                    details = db.get_pii_details(target_id)
 
-                if word:
-                    if target_id is not None:
-                        details = db.get_pii_details(target_id)
+                    if details is None:
+                        st.session_state.selected_word = None
+                        st.session_state.selected_id = None
 
-                        if details is None:
+                    elif details['event_code'] in ('USR-GIP', 'T3-GIP'):
+                        st.info(f"Bearbeiten: **{word}**")
+                        updated = st.text_input(
+                            "Formulierung:",
+                            value=details['neutral_phrase'],
+                            key=f"edit_neutral_{word}"
+                        )
+                        if st.button("Speichern", use_container_width=True, key="save_edit"):
+                            if updated:
+                                db.update_neutralization(
+                                    selected_file, word,
+                                    details['neutral_phrase'], updated
+                                )
+                                st.session_state.selected_word = None
+                                st.rerun()
+                        if st.button("Eingabe entfernen", use_container_width=True, key="revert_neutral"):
+                            db.revert_neutralization(selected_file, details['pii_text'])
                             st.session_state.selected_word = None
                             st.session_state.selected_id = None
+                            st.rerun()
+                        if st.button("Abbrechen", key="cancel_edit", use_container_width=True):
+                            st.session_state.selected_word = None
+                            st.rerun()
 
-                        elif details['event_code'] in ('USR-GIP', 'T3-GIP'):
-                            st.info(f"Bearbeiten: **{word}**")
-                            updated = st.text_input(
-                                "Formulierung:",
-                                value=details['neutral_phrase'],
-                                key=f"edit_neutral_{word}"
-                            )
-                            if st.button("Speichern", use_container_width=True, key="save_edit"):
-                                if updated:
-                                    db.update_neutralization(
-                                        selected_file, word,
-                                        details['neutral_phrase'], updated
-                                    )
-                                    st.session_state.selected_word = None
-                                    st.rerun()
-                            if st.button("Eingabe entfernen", use_container_width=True, key="revert_neutral"):
-                                db.revert_neutralization(selected_file, details['pii_text'])
-                                st.session_state.selected_word = None
-                                st.session_state.selected_id = None
-                                st.rerun()
-                            if st.button("Abbrechen", key="cancel_edit", use_container_width=True):
+                    elif details['category'] == 'GEN-FL':
+                        st.info(f"Markiert: **{word}**")
+                        neutral = st.text_input(
+                            "Neutrale Formulierung:",
+                            placeholder="z.B. Fachkraft",
+                            key=f"neutral_input_{word}"
+                        )
+                        if st.button("Speichern", use_container_width=True, key="save_genfl"):
+                            if neutral:
+                                db.save_neutralization(selected_file, word, neutral)
                                 st.session_state.selected_word = None
                                 st.rerun()
+                        if st.button("Abbrechen", key="cancel_genfl", use_container_width=True):
+                            st.session_state.selected_word = None
+                            st.rerun()
 
-                        elif details['category'] == 'GEN-FL':
-                            st.info(f"Markiert: **{word}**")
-                            neutral = st.text_input(
-                                "Neutrale Formulierung:",
-                                placeholder="z.B. Fachkraft",
-                                key=f"neutral_input_{word}"
-                            )
-                            if st.button("Speichern", use_container_width=True, key="save_genfl"):
-                                if neutral:
-                                    db.save_neutralization(selected_file, word, neutral)
-                                    st.session_state.selected_word = None
-                                    st.rerun()
-                            if st.button("Abbrechen", key="cancel_genfl", use_container_width=True):
+                    else:
+                        others_count = db.get_unsynced_count(
+                            selected_file, word, details['status']
+                        )
+                        if others_count > 0:
+                            st.info(f"Markierung: **{word}**")
+                            btn_label = "Alle ausschliessen" if details['status'] == "EXCLUDE" \
+                                        else "Alle schwärzen"
+                            if st.button(f"{btn_label} ({others_count + 1})",
+                                        use_container_width=True, key="sync_btn"):
+                                db.sync_all_pii_status(selected_file, word, details['status'])
+                                st.rerun()
+                            st.divider()
+                            if st.button("Abbrechen", key="cancel_sync", use_container_width=True):
                                 st.session_state.selected_word = None
                                 st.rerun()
-
                         else:
-                            others_count = db.get_unsynced_count(
-                                selected_file, word, details['status']
-                            )
-                            if others_count > 0:
-                                st.info(f"Markierung: **{word}**")
-                                btn_label = "Alle ausschliessen" if details['status'] == "EXCLUDE" \
-                                            else "Alle schwärzen"
-                                if st.button(f"{btn_label} ({others_count + 1})",
-                                            use_container_width=True, key="sync_btn"):
-                                    db.sync_all_pii_status(selected_file, word, details['status'])
-                                    st.rerun()
-                                st.divider()
-                                if st.button("Abbrechen", key="cancel_sync", use_container_width=True):
-                                    st.session_state.selected_word = None
-                                    st.rerun()
-                            else:
-                                st.session_state.selected_word = None
-                                st.session_state.selected_id = None
+                            st.session_state.selected_word = None
+                            st.session_state.selected_id = None
+                else:
+                    # Manual selection
+                    st.info(f"Auswahl: **{word}**")
+                    label_choice = st.radio(
+                        "Aktion:",
+                        ["Schwärzen", "Neutralisieren"],
+                        key="manual_label_radio"
+                    )
+                    if label_choice == "Schwärzen":
+                        label = st.selectbox(
+                            "Kategorie:",
+                            ["PERSON", "ADRESSE", "E-MAIL", "TELEFON", "PLZ", "ORT", "WEB"],
+                            key="manual_label_select"
+                        )
+                        if st.button("Speichern", use_container_width=True, key="manual_save"):
+                            pii_hash = logic.create_pii_hash(word)
+                            idx = doc_row['markdown'].count(word)
+                            db.save_manual_tag(selected_file, word, label, idx, pii_hash)
+                            st.session_state.selected_word = None
+                            st.session_state.selected_id = None
+                            st.rerun()
                     else:
-                        # Manual selection
-                        st.info(f"Auswahl: **{word}**")
-                        label_choice = st.radio(
-                            "Aktion:",
-                            ["Schwärzen", "Neutralisieren"],
-                            key="manual_label_radio"
+                        neutral_input = st.text_input(
+                            "Neutrale Formulierung:",
+                            key="manual_neutral_input"
                         )
-                        if label_choice == "Schwärzen":
-                            label = st.selectbox(
-                                "Kategorie:",
-                                ["PERSON", "ADRESSE", "E-MAIL", "TELEFON", "PLZ", "ORT", "WEB"],
-                                key="manual_label_select"
-                            )
-                            if st.button("Speichern", use_container_width=True, key="manual_save"):
+                        if st.button("Speichern", use_container_width=True, key="manual_save_neutral"):
+                            if neutral_input:
                                 pii_hash = logic.create_pii_hash(word)
                                 idx = doc_row['markdown'].count(word)
-                                db.save_manual_tag(selected_file, word, label, idx, pii_hash)
-                                st.session_state.selected_word = None
-                                st.session_state.selected_id = None
-                                st.rerun()
-                        else:
-                            neutral_input = st.text_input(
-                                "Neutrale Formulierung:",
-                                key="manual_neutral_input"
-                            )
-                            if st.button("Speichern", use_container_width=True, key="manual_save_neutral"):
-                                if neutral_input:
-                                    pii_hash = logic.create_pii_hash(word)
-                                    idx = doc_row['markdown'].count(word)
-                                    db.save_manual_tag(selected_file, word, "PERSON", idx, pii_hash)
-                                    db.save_neutralization(selected_file, word, neutral_input)
-                                st.session_state.selected_word = None
-                                st.session_state.selected_id = None
-                                st.rerun()
-                        if st.button("Abbrechen", key="cancel_manual", use_container_width=True):
+                                db.save_manual_tag(selected_file, word, "PERSON", idx, pii_hash)
+                                db.save_neutralization(selected_file, word, neutral_input)
                             st.session_state.selected_word = None
+                            st.session_state.selected_id = None
                             st.rerun()
-                else:
-                    st.caption("Highlight oder Text anklicken um Optionen zu sehen.")
-
-            with col_main:
-                rendered_html = logic.apply_overlay(doc_row['markdown'], highlighter_df)
-                js_response = overlayer(
-                    markdown=rendered_html,
-                    key=f"ov_{selected_file}",
-                    height=700
-                )
+                    if st.button("Abbrechen", key="cancel_manual", use_container_width=True):
+                        st.session_state.selected_word = None
+                        st.rerun()
+            else:
+                st.caption("Highlight oder Text anklicken um Optionen zu sehen.")
+
+        with col_main:
+            rendered_html = logic.apply_overlay(doc_row['markdown'], highlighter_df)
+            js_response = overlayer(
+                markdown=rendered_html,
+                key=f"ov_{selected_file}",
+                height=700
+            )
 
-                if js_response:
-                    action = js_response.get("action")
-                    current_click_id = js_response.get("click_id")
+            if js_response:
+                action = js_response.get("action")
+                current_click_id = js_response.get("click_id")
 
-                    if current_click_id != st.session_state.last_click_id:
-                        st.session_state.last_click_id = current_click_id
-                        st.session_state.selected_word = js_response.get("word")
-                        st.session_state.selected_id = js_response.get("pii_id")
-                        st.session_state.confirm_discard = False
+                if current_click_id != st.session_state.last_click_id:
+                    st.session_state.last_click_id = current_click_id
+                    st.session_state.selected_word = js_response.get("word")
+                    st.session_state.selected_id = js_response.get("pii_id")
+                    st.session_state.confirm_discard = False
 
-                        if action == "toggle":
-                            db.toggle_pii_status(st.session_state.selected_id)
-                            st.rerun()
-                        else:
-                            st.rerun()
+                    if action == "toggle":
+                        db.toggle_pii_status(st.session_state.selected_id)
+                        st.rerun()
+                    else:
+                        st.rerun()
 
 # ----------------------------------------------------------------------------------------
 # ARCHIVE VIEW
@@ -561,17 +588,16 @@ elif st.session_state.app_mode == "Review":
 elif st.session_state.app_mode == "Archive":
     st.header("Audit Archiv")
 
-    archived = db.get_archived_documents()
+    archived_count, oldest_timestamp = db.get_archive_summary()
 
-    if archived.empty:
+    if archived_count == 0:
         st.info("Noch keine archivierten Dokumente.")
     else:
         # ── Metrics ───────────────────────────────────────────────────────
         col_a1, col_a2, col_a3 = st.columns(3)
-        col_a1.metric("Archivierte Dokumente", len(archived))
-        #col_a2.metric("Bearbeitet von", archived['user_id'].nunique())
+        col_a1.metric("Archivierte Dokumente", archived_count)
         col_a2.metric("", "")
-        col_a3.metric("Ältester Eintrag", archived['approval_timestamp'].min()[:10])
+        col_a3.metric("Ältester Eintrag", oldest_timestamp[:10])
         st.divider()
 
         # ── Filters ───────────────────────────────────────────────────────
@@ -627,46 +653,39 @@ elif st.session_state.app_mode == "Archive":
 
         st.divider()
 
-        # ── Apply filter and sort ─────────────────────────────────────────
-        filtered = archived.copy()
-        if search_audit:
-            filtered = filtered[
-                filtered['audit_id'].str.contains(search_audit, case=False, na=False)
-            ]
-        if date_from:
-            filtered = filtered[
-                pd.to_datetime(filtered['approval_timestamp']) >= pd.Timestamp(date_from)
-            ]
-        if date_to:
-            filtered = filtered[
-                pd.to_datetime(filtered['approval_timestamp']) <=
-                pd.Timestamp(date_to) + pd.Timedelta(days=1)
-            ]
-        filtered = filtered.sort_values(
-            by='approval_timestamp',
-            ascending=st.session_state.archive_sort_asc
+        # ── Filter, sort and page in SQL ──────────────────────────────────
+        filters = dict(search_audit=search_audit, date_from=date_from, date_to=date_to)
+        PAGE_SIZE = 10
+        page = max(0, st.session_state.archive_page)
+        page_df, total = db.get_archive_page(
+            **filters,
+            ascending=st.session_state.archive_sort_asc,
+            limit=PAGE_SIZE, offset=page * PAGE_SIZE
         )
+        total_pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+        if page > total_pages - 1:
+            # Filters shrank the result below the current page
+            st.session_state.archive_page = total_pages - 1
+            st.rerun()
 
         if search_audit or date_from or date_to:
-            st.caption(f"{len(filtered)} Einträge gefunden")
-
-        # ── Pagination setup ──────────────────────────────────────────────
-        PAGE_SIZE = 10
-        total_pages = max(1, (len(filtered) + PAGE_SIZE - 1) // PAGE_SIZE)
-        page = max(0, min(st.session_state.archive_page, total_pages - 1))
-        page_df = filtered.iloc[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+            st.caption(f"{total} Einträge gefunden")
 
         # ── Header row ────────────────────────────────────────────────────
-        all_ids = set(filtered['commit_uuid'].tolist())
-        all_checked = all_ids.issubset(st.session_state.archive_checked) and len(all_ids) > 0
+        # All matches are only fetched when "select all" is clicked
+        all_checked = (total > 0
+                       and st.session_state.archive_checked_filters == filters
+                       and len(st.session_state.archive_checked) == total)
 
         hdr = st.columns([0.3, 3, 2, 1])
         with hdr[0]:
             check_all = st.checkbox("", value=all_checked, key="check_all_archive")
             if check_all and not all_checked:
-                st.session_state.archive_checked = all_ids
+                st.session_state.archive_checked = set(db.get_archive_commit_uuids(**filters))
+                st.session_state.archive_checked_filters = filters
             elif not check_all and all_checked:
                 st.session_state.archive_checked = set()
+                st.session_state.archive_checked_filters = None
         hdr[1].write("**Audit ID**")
         hdr[2].write("**Datum**")
         hdr[3].write("**Kopieren**")
@@ -678,8 +697,6 @@ elif st.session_state.app_mode == "Archive":
             timestamp = datetime.strptime(
                 str(row['approval_timestamp'])[:16], "%Y-%m-%dT%H:%M"
             ).strftime("%d.%m.%Y %H:%M")
-            sanitized = row['sanitized_text'] or ""
-            final_clip = f"{sanitized}\n\n--- Complyable Audit ID: {audit_id} ---"
 
             row_cols = st.columns([0.3, 3, 2, 1])
             with row_cols[0]:
@@ -691,7 +708,12 @@ elif st.session_state.app_mode == "Archive":
                     else:
                         st.session_state.archive_checked.discard(commit_uuid)
             with row_cols[1]:
-                with st.expander(f"Audit ID: {audit_id}"):
+                # The text is only loaded for opened rows
+                is_open = st.toggle(f"Audit ID: {audit_id}", key=f"archive_open_{commit_uuid}")
+                sanitized = None
+                if is_open:
+                    archived_doc = db.get_archived_by_commit(commit_uuid)
+                    sanitized = (archived_doc or {}).get('sanitized_text') or ""
                     st.text_area(
                         "",
                         sanitized,
@@ -702,12 +724,15 @@ elif st.session_state.app_mode == "Archive":
             with row_cols[2]:
                 st.caption(timestamp)
             with row_cols[3]:
-                copy_button(
-                    final_clip,
-                    icon='st',
-                    copied_label="Kopiert!",
-                    key=f"archive_copy_{commit_uuid}"
-                )
+                if sanitized is not None:
+                    copy_button(
+                        f"{sanitized}\n\n--- Complyable Audit ID: {audit_id} ---",
+                        icon='st',
+                        copied_label="Kopiert!",
+                        key=f"archive_copy_{commit_uuid}"
+                    )
+                else:
+                    st.caption("Öffnen zum Kopieren")
         
         # ── Actions below rows — evaluated after all checkboxes ───────────
         col_a1, col_a2 = st.columns([3, 1])
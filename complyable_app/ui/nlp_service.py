@@ -0,0 +1,399 @@
+"""
+nlp_service.py — Resident spaCy model shared by the pipeline and the KNIME nodes.
+Run `python nlp_service.py` to keep de_core_news_lg, the address ruler and
+the beam scorer warm behind a localhost HTTP endpoint. Clients set
+NLP_SERVICE_URL (e.g. http://127.0.0.1:8765) and send batches of text;
+without it the model is loaded lazily in-process on first use.
+
+Tier 2 confidence scoring (NLP_CONFIDENCE_MODE):
+    off       no scores, confidence_score stays empty
+    greedy    no beam search; every NER entity gets NLP_GREEDY_CONFIDENCE
+    beam      beam search at NLP_BEAM_WIDTH over whole batches
+    adaptive  narrow beam first, then full width only for the sentences
+              holding entities it is not sure about
+`python nlp_service.py --calibrate cv1.txt cv2.txt ...` derives the greedy
+constant from real documents. In beam and adaptive mode, documents whose
+entities all have stable scores in confidence_cache.py skip the beam search;
+the rest are scored whole. NLP_CACHE_SENTENCES=1 instead beam-parses only the
+sentences holding uncached entities; those scores are marked "+sentence".
+"""
+
+import os
+import json
+import base64
+import sys
+import threading
+from pathlib import Path
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib import request as urlrequest
+import spacy
+from spacy.tokens import DocBin
+import metrics
+import confidence_cache
+
+MODEL_NAME = os.getenv('NLP_MODEL', 'de_core_news_lg')
+SERVICE_URL = os.getenv('NLP_SERVICE_URL')
+SERVICE_HOST = os.getenv('NLP_SERVICE_HOST', '127.0.0.1')
+SERVICE_PORT = int(os.getenv('NLP_SERVICE_PORT', '8765'))
+SERVICE_TIMEOUT = float(os.getenv('NLP_SERVICE_TIMEOUT', '300'))
+# nlp.pipe worker processes used by the service itself
+SERVICE_PROCESSES = int(os.getenv('NLP_PROCESSES', '1'))
+
+CONFIDENCE_MODES = ("off", "greedy", "beam", "adaptive")
+CONFIDENCE_MODE = os.getenv('NLP_CONFIDENCE_MODE', 'beam').lower()
+BEAM_WIDTH = int(os.getenv('NLP_BEAM_WIDTH', '16'))
+BEAM_DENSITY = 0.0001
+# Adaptive mode: first-pass width, and the score below which an entity is re-scored
+ADAPTIVE_BEAM_WIDTH = int(os.getenv('NLP_ADAPTIVE_BEAM_WIDTH', '4'))
+ADAPTIVE_THRESHOLD = float(os.getenv('NLP_ADAPTIVE_THRESHOLD', '0.9'))
+# Greedy mode: mean full-beam score of greedy entities, see calibrate_greedy_confidence()
+GREEDY_CONFIDENCE = float(os.getenv('NLP_GREEDY_CONFIDENCE', '0.85'))
+# Beam/adaptive with the confidence cache: score only the sentences of uncached entities
+CACHE_SENTENCES = os.getenv('NLP_CACHE_SENTENCES', '0') == '1'
+
+ADDRESS_PATTERNS = [
+    {"label": "ADRESSE_1", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz|allee|gasse|damm)$"}}]},
+    {"label": "ADRESSE_2", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz)$"}}, {"IS_DIGIT": True}]}
+]
+
+# Token attributes the tiers read back from a serialized parse
+DOCBIN_ATTRS = ["ORTH", "TAG", "HEAD", "DEP", "ENT_IOB", "ENT_TYPE", "ENT_ID",
+                "ENT_KB_ID", "LEMMA", "MORPH", "POS", "SPACY", "SENT_START"]
+
+_nlp = None
+_client_vocab = None
+_remote_cache_stats = {}
+_load_lock = threading.Lock()
+# spaCy pipelines are not safe to call from several threads at once
+_model_lock = threading.Lock()
+
+# ─────────────────────────────────────────────
+# MODEL
+# ─────────────────────────────────────────────
+
+def get_nlp():
+    """Loads the model and entity ruler once per process."""
+    global _nlp
+    if _nlp is None:
+        with _load_lock:
+            if _nlp is None:
+                print(f"[NLP] Loading spaCy model {MODEL_NAME}...")
+                nlp = spacy.load(MODEL_NAME)
+                if "entity_ruler" not in nlp.pipe_names:
+                    ruler = nlp.add_pipe("entity_ruler", before="ner")
+                    ruler.add_patterns(ADDRESS_PATTERNS)
+                _nlp = nlp
+                print("[NLP] spaCy model loaded.")
+    return _nlp
+
+# ─────────────────────────────────────────────
+# CONFIDENCE SCORING
+# ─────────────────────────────────────────────
+
+def resolve_mode(mode=None):
+    mode = (mode or CONFIDENCE_MODE).lower()
+    if mode not in CONFIDENCE_MODES:
+        raise ValueError(f"Unknown confidence mode '{mode}' — use one of {', '.join(CONFIDENCE_MODES)}")
+    return mode
+
+def describe_mode(mode):
+    """Scoring method as recorded in the audit trail, with the settings that produced the scores."""
+    if mode == "greedy":
+        return f"greedy:{GREEDY_CONFIDENCE}"
+    if mode == "beam":
+        return f"beam:{BEAM_WIDTH}"
+    if mode == "adaptive":
+        return f"adaptive:{ADAPTIVE_BEAM_WIDTH}/{BEAM_WIDTH}@{ADAPTIVE_THRESHOLD}"
+    return mode
+
+def get_beam_confidence(docs, beam_width=BEAM_WIDTH, batch_size=16):
+    """[{(start, end, label): probability}] per doc, beam-parsed batch_size docs at a time."""
+    ner = get_nlp().get_pipe("ner")
+    scores = []
+    for i in range(0, len(docs), batch_size):
+        beams = ner.beam_parse(docs[i:i + batch_size], beam_width=beam_width, beam_density=BEAM_DENSITY)
+        for beam in beams:
+            entity_scores = defaultdict(float)
+            for score, ents in ner.moves.get_beam_parses(beam):
+                for start, end, label in ents:
+                    entity_scores[(start, end, label)] += score
+            scores.append(dict(entity_scores))
+    return scores
+
+def _sentence(ent):
+    try:
+        return ent.sent
+    except ValueError:
+        # No sentence boundaries — fall back to the whole document
+        return ent.doc[:]
+
+def get_adaptive_confidence(docs, batch_size=16):
+    """Narrow beam over every doc; only close calls are re-scored at full width,
+    on their own sentence instead of the whole document."""
+    ner = get_nlp().get_pipe("ner")
+    scores = get_beam_confidence(docs, ADAPTIVE_BEAM_WIDTH, batch_size)
+
+    # (doc index, sentence start, sentence end) -> entity keys to re-score
+    close_calls = defaultdict(list)
+    for idx, (doc, doc_scores) in enumerate(zip(docs, scores)):
+        for ent in doc.ents:
+            key = (ent.start, ent.end, ent.label_)
+            # Entity ruler labels are not scored by the NER
+            if ent.label_ in ner.labels and doc_scores.get(key, 0.0) < ADAPTIVE_THRESHOLD:
+                sent = _sentence(ent)
+                close_calls[(idx, sent.start, sent.end)].append(key)
+    if not close_calls:
+        return scores
+
+    windows = [docs[idx][start:end].as_doc() for idx, start, end in close_calls]
+    rescored = get_beam_confidence(windows, BEAM_WIDTH, batch_size)
+    for ((idx, offset, _), keys), window_scores in zip(close_calls.items(), rescored):
+        for start, end, label in keys:
+            scores[idx][(start, end, label)] = window_scores.get((start - offset, end - offset, label), 0.0)
+    return scores
+
+def model_version(mode):
+    """Confidence cache key part: scores only carry over for the same model and settings."""
+    return f"{MODEL_NAME}-{get_nlp().meta.get('version', '?')}|{describe_mode(mode)}"
+
+def _score_docs(docs, mode, batch_size):
+    if mode == "beam":
+        return get_beam_confidence(docs, BEAM_WIDTH, batch_size)
+    return get_adaptive_confidence(docs, batch_size)
+
+def _score_sentences(docs, unstable, mode, batch_size):
+    """
+    Beam-parses only the sentences in unstable ({(doc index, start, end): ents}).
+    Returns {doc index: {entity key: score}} for the documents where the
+    sentence parse reproduced every entity; the others need a whole parse.
+    """
+    windows = [docs[idx][start:end].as_doc() for idx, start, end in unstable]
+    found, missed = defaultdict(dict), set()
+    for ((idx, offset, _), ents), window_scores in zip(unstable.items(),
+                                                       _score_docs(windows, mode, batch_size)):
+        for ent in ents:
+            score = window_scores.get((ent.start - offset, ent.end - offset, ent.label_))
+            if score is None:
+                missed.add(idx)
+            else:
+                found[idx][(ent.start, ent.end, ent.label_)] = score
+    return {idx: ent_scores for idx, ent_scores in found.items() if idx not in missed}
+
+def score_with_cache(docs, mode, batch_size=16):
+    """Beam or adaptive scores per doc. Documents whose NER entities are all
+    stable in the confidence cache skip the beam search; the rest are scored
+    whole and update it. With CACHE_SENTENCES only the sentences holding
+    uncached entities are scored, unless that misses an entity; those scores
+    are cached apart from whole-document ones.
+    Returns (scores, source) per doc: "" when scored whole, otherwise "+cache",
+    "+sentence" or "+sentence+cache"."""
+    labels = get_nlp().get_pipe("ner").labels
+    version = model_version(mode) + ("|sentence" if CACHE_SENTENCES else "")
+    cached_source = "+sentence+cache" if CACHE_SENTENCES else "+cache"
+    scores, sources, sentence_counts = [], [], []
+    # (doc index, sentence start, sentence end) -> uncached entities
+    unstable = defaultdict(list)
+    for idx, doc in enumerate(docs):
+        doc_scores, sentences = {}, set()
+        for ent in doc.ents:
+            if ent.label_ not in labels:
+                continue
+            sent = _sentence(ent)
+            sentences.add((sent.start, sent.end))
+            key = (ent.start, ent.end, ent.label_)
+            doc_scores[key] = confidence_cache.lookup(ent.text, ent.label_, version)
+            if doc_scores[key] is None:
+                unstable[(idx, sent.start, sent.end)].append(ent)
+        scores.append(doc_scores)
+        # Documents without NER entities have nothing to score
+        sources.append(cached_source if doc_scores else "")
+        sentence_counts.append(len(sentences))
+
+    uncached = sorted({idx for idx, _, _ in unstable})
+    todo = uncached
+    sentences_skipped = sum(count for idx, count in enumerate(sentence_counts) if idx not in uncached)
+    if todo and CACHE_SENTENCES:
+        windowed = _score_sentences(docs, unstable, mode, batch_size)
+        for idx, ent_scores in windowed.items():
+            # Scores of stable entities still come from the cache
+            sources[idx] = "+sentence+cache" if len(ent_scores) < len(scores[idx]) else "+sentence"
+            scores[idx].update(ent_scores)
+            for ent in (ent for key, ents in unstable.items() if key[0] == idx for ent in ents):
+                confidence_cache.update(ent.text, ent.label_, version, ent_scores[(ent.start, ent.end, ent.label_)])
+            sentences_skipped += sentence_counts[idx] - sum(1 for key in unstable if key[0] == idx)
+        todo = [idx for idx in todo if idx not in windowed]
+
+    if todo:
+        fresh = _score_docs([docs[idx] for idx in todo], mode, batch_size)
+        for idx, doc_scores in zip(todo, fresh):
+            scores[idx] = doc_scores
+            sources[idx] = ""
+            for ent in docs[idx].ents:
+                if ent.label_ in labels:
+                    confidence_cache.update(ent.text, ent.label_, version,
+                                            doc_scores.get((ent.start, ent.end, ent.label_), 0.0))
+    if uncached:
+        confidence_cache.save()
+
+    confidence_cache.count_skipped(len(docs), len(docs) - len(uncached),
+                                   sum(sentence_counts), sentences_skipped)
+    return scores, sources
+
+def cache_stats():
+    """Confidence cache hits, misses and hit rate — of the model service when one is configured."""
+    return dict(_remote_cache_stats) if SERVICE_URL else confidence_cache.stats()
+
+def calibrate_greedy_confidence(texts, batch_size=16):
+    """Mean full-width beam score of the greedy NER entities in texts.
+    Run it on a representative sample to set NLP_GREEDY_CONFIDENCE."""
+    nlp = get_nlp()
+    ner = nlp.get_pipe("ner")
+    docs = list(nlp.pipe(texts, batch_size=batch_size))
+    probs = [
+        doc_scores.get((ent.start, ent.end, ent.label_), 0.0)
+        for doc, doc_scores in zip(docs, get_beam_confidence(docs, BEAM_WIDTH, batch_size))
+        for ent in doc.ents if ent.label_ in ner.labels
+    ]
+    return round(sum(probs) / len(probs), 4) if probs else GREEDY_CONFIDENCE
+
+def _parse_local(texts, batch_size, n_process, confidence=None):
+    # Timings are only kept when a pipeline run is active in this process
+    nlp = get_nlp()
+    mode = resolve_mode(confidence)
+    n_process = max(1, min(n_process, len(texts)))
+    with metrics.measure("spacy_pipe", doc_count=len(texts), char_count=sum(map(len, texts))):
+        docs = list(nlp.pipe(texts, batch_size=batch_size, n_process=n_process))
+
+    method = describe_mode(mode)
+    methods = [method] * len(docs)
+    if mode == "off":
+        scores = [{} for _ in docs]
+    elif mode == "greedy":
+        scores = [{(ent.start, ent.end, ent.label_): GREEDY_CONFIDENCE for ent in doc.ents}
+                  for doc in docs]
+    else:
+        with metrics.measure("beam_scoring", doc_count=len(docs), char_count=sum(map(len, texts))):
+            scores, sources = score_with_cache(docs, mode, batch_size)
+        # Reused and sentence-level scores are marked as such in the audit trail
+        methods = [method + source for source in sources]
+    return list(zip(docs, scores, methods))
+
+# ─────────────────────────────────────────────
+# WIRE FORMAT
+# ─────────────────────────────────────────────
+
+def _encode(results):
+    doc_bin = DocBin(attrs=DOCBIN_ATTRS, store_user_data=False)
+    for doc, _, _ in results:
+        doc_bin.add(doc)
+    return {
+        "model": MODEL_NAME,
+        "scoring_methods": [method for _, _, method in results],
+        "confidence_cache": confidence_cache.stats(),
+        "docbin": base64.b64encode(doc_bin.to_bytes()).decode('ascii'),
+        "beam_scores": [
+            [[start, end, label, score] for (start, end, label), score in scores.items()]
+            for _, scores, _ in results
+        ],
+    }
+
+def _decode(payload):
+    global _client_vocab, _remote_cache_stats
+    # Clients don't need the model weights, only a vocab to rebuild the Docs
+    if _client_vocab is None:
+        _client_vocab = spacy.blank("de").vocab
+    doc_bin = DocBin().from_bytes(base64.b64decode(payload['docbin']))
+    docs = list(doc_bin.get_docs(_client_vocab))
+    scores = [
+        {(start, end, label): score for start, end, label, score in doc_scores}
+        for doc_scores in payload['beam_scores']
+    ]
+    methods = payload.get('scoring_methods') or ["off"] * len(docs)
+    _remote_cache_stats = payload.get('confidence_cache', {})
+    return list(zip(docs, scores, methods))
+
+def _parse_remote(texts, batch_size, confidence):
+    body = json.dumps({"texts": texts, "batch_size": batch_size, "confidence": confidence}).encode('utf-8')
+    req = urlrequest.Request(
+        f"{SERVICE_URL.rstrip('/')}/parse",
+        data=body,
+        headers={"Content-Type": "application/json"}
+    )
+    with urlrequest.urlopen(req, timeout=SERVICE_TIMEOUT) as resp:
+        return _decode(json.loads(resp.read()))
+
+# ─────────────────────────────────────────────
+# CLIENT ENTRY POINT
+# ─────────────────────────────────────────────
+
+def parse_texts(texts, batch_size=16, n_process=1, confidence=None):
+    """Returns [(Doc, scores, scoring_method)] in input order — from the service if configured.
+    confidence is one of CONFIDENCE_MODES; None uses NLP_CONFIDENCE_MODE."""
+    texts = list(texts)
+    if not texts:
+        return []
+    confidence = resolve_mode(confidence)
+    if SERVICE_URL:
+        return _parse_remote(texts, batch_size, confidence)
+    return _parse_local(texts, batch_size, n_process, confidence)
+
+# ─────────────────────────────────────────────
+# SERVER
+# ─────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json({"status": "ok", "model": MODEL_NAME,
+                             "confidence": describe_mode(resolve_mode()),
+                             "confidence_cache": confidence_cache.stats()})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path != "/parse":
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            # Older clients only send "beam": true/false
+            confidence = payload.get("confidence") or (None if payload.get("beam", True) else "off")
+            with _model_lock:
+                results = _parse_local(
+                    list(payload["texts"]),
+                    int(payload.get("batch_size", 16)),
+                    SERVICE_PROCESSES,
+                    confidence
+                )
+            self._send_json(_encode(results))
+        except Exception as e:
+            self._send_json({"error": str(e)}, status=500)
+
+    def log_message(self, format, *args):
+        print(f"[NLP] {self.address_string()} {format % args}")
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT):
+    get_nlp()  # warm up before accepting requests
+    server = ThreadingHTTPServer((host, port), _Handler)
+    print(f"[NLP] Model service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--calibrate"]:
+        texts = [Path(p).read_text(encoding='utf-8', errors='replace') for p in sys.argv[2:]]
+        print(f"[NLP] NLP_GREEDY_CONFIDENCE={calibrate_greedy_confidence(texts)}")
+    else:
+        serve()
@@ -0,0 +1,46 @@
+"""
+span_builder.py — Offset-based redaction shared by all tiers.
+Tiers emit (start, end, replacement[, priority]) spans against the original
+text instead of rewriting the whole string per finding. Overlaps are
+resolved once and the output is assembled in a single pass.
+"""
+
+import bisect
+
+def _key(span):
+    # Lower priority value wins; then leftmost, then longest
+    priority = span[3] if len(span) > 3 else 0
+    return (priority, span[0], span[0] - span[1])
+
+def resolve(spans):
+    """
+    Returns the non-overlapping subset of spans in text order. A span is
+    dropped when it overlaps one that was accepted before it. Empty spans
+    are ignored.
+    """
+    starts = []
+    accepted = []
+    for span in sorted(spans, key=_key):
+        start, end = span[0], span[1]
+        if end <= start:
+            continue
+        idx = bisect.bisect_right(starts, start)
+        if idx and accepted[idx - 1][1] > start:
+            continue
+        if idx < len(accepted) and accepted[idx][0] < end:
+            continue
+        starts.insert(idx, start)
+        accepted.insert(idx, span)
+    return accepted
+
+def apply(text, spans):
+    """Builds the redacted text in one pass over the resolved spans."""
+    pieces = []
+    last_end = 0
+    for span in resolve(spans):
+        start, end, replacement = span[0], span[1], span[2]
+        pieces.append(text[last_end:start])
+        pieces.append(str(replacement))
+        last_end = end
+    pieces.append(text[last_end:])
+    return "".join(pieces)
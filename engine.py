@@ -1,29 +1,63 @@
 import re
+import os
 import spacy
 import json
+import base64
+import urllib.request
+from spacy.tokens import DocBin
 import pandas as pd
 import sqlite3
 from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 import unicodedata
+import sys
+
+# Shared with the Streamlit pipeline
+sys.path.insert(0, str(Path(__file__).resolve().parent / "ui"))
+import tier1_engine
+import dict_matcher
+import span_builder
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "data" / "vault" / "complyable_vault.db"
 
 # CONFIG & MODEL LOADING
-# spaCy
-try:
-    nlp = spacy.load("de_core_news_lg")
-    if "entity_ruler" not in nlp.pipe_names:
-        ruler = nlp.add_pipe("entity_ruler", before="ner")
-        patterns = [
-            {"label": "LOC_STR1", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz|allee|gasse|damm)$"}}]},
-            {"label": "LOC_STR2", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz)$"}}, {"IS_DIGIT": True}]}
-        ]
-        ruler.add_patterns(patterns)
-except Exception as e:
-    print(f"Error loading spaCy: {e}")
+# spaCy — loaded on first use, or not at all when the resident
+# model service (ui/nlp_service.py) is configured via NLP_SERVICE_URL
+NLP_SERVICE_URL = os.getenv('NLP_SERVICE_URL')
+nlp = None
+
+def get_nlp():
+    global nlp
+    if nlp is None:
+        try:
+            nlp = spacy.load("de_core_news_lg")
+            if "entity_ruler" not in nlp.pipe_names:
+                ruler = nlp.add_pipe("entity_ruler", before="ner")
+                patterns = [
+                    {"label": "LOC_STR1", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz|allee|gasse|damm)$"}}]},
+                    {"label": "LOC_STR2", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz)$"}}, {"IS_DIGIT": True}]}
+                ]
+                ruler.add_patterns(patterns)
+        except Exception as e:
+            print(f"Error loading spaCy: {e}")
+            raise
+    return nlp
+
+def parse(text, beam=True):
+    """Returns (doc, beam_scores) from the model service or the local model."""
+    if NLP_SERVICE_URL:
+        body = json.dumps({"texts": [text], "beam": beam}).encode('utf-8')
+        req = urllib.request.Request(f"{NLP_SERVICE_URL.rstrip('/')}/parse", data=body,
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=300) as resp:
+            payload = json.loads(resp.read())
+        doc = list(DocBin().from_bytes(base64.b64decode(payload['docbin'])).get_docs(spacy.blank("de").vocab))[0]
+        scores = {(s, e, l): sc for s, e, l, sc in payload['beam_scores'][0]}
+        return doc, scores
+    doc = get_nlp()(text)
+    return doc, (get_beam_confidence(doc) if beam else {})
 
 # titlecasing utility fn
 def to_titlecase(text):
@@ -33,23 +67,24 @@ def to_titlecase(text):
     text = re.sub(r'(?<=[A-Z])\s(?=[A-Z])', '', text) 
     return re.sub(r'\b[A-ZÜÖÄß]{3,}\b', replace_match, text)
 
-# Custom Regex
+# Custom Regex — 'requires' lets the engine skip rules that cannot match
 TIER1_PATTERNS = [
-    {"label": "EMAIL", "pattern": r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"},
-    {"label": "PHONE_DE", "pattern": r"(?:(?:\+?49[ \-\.\(\)]?)?(?:(?:\(?0\d{1,5}\)?)|(?:\d{1,5}))[ \-\.\(\)]?(?:\d[ \-\.\(\)]?){5,10}\d)"},
-    {"label": "WEB", "pattern": r"\b(?<!mailto:)(?<!@)(?:https?:\/\/)?(?:www\.)?(?!\d)([a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}(?::\d+)?(?:\/[^\s<>\"'@]*|(?!\S))?\b(?![\w@./])"},
-    {"label": "SOCI", "pattern": r"@[A-Za-z0-9](?:[A-Za-z0-9._-]{1,28}[A-Za-z0-9])?"},
-    {"label": "LOC", "pattern": r"\b\d{5}\b"},
-    {"label": "DATE", "pattern": r"\b\d{1,2}\.\d{1,2}\.(\d{4}|\d{2})\b"},
-    {"label": "DATE", "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"},
-    {"label": "DATE", "pattern": r"(?i)\b\d{2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"},
-    {"label": "DATE", "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s'\d{2}\b"}
+    {"label": "EMAIL", "requires": "@", "pattern": r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"},
+    {"label": "PHONE_DE", "requires": tier1_engine.DIGIT, "pattern": r"(?:(?:\+?49[ \-\.\(\)]?)?(?:(?:\(?0\d{1,5}\)?)|(?:\d{1,5}))[ \-\.\(\)]?(?:\d[ \-\.\(\)]?){5,10}\d)"},
+    {"label": "WEB", "requires": ".", "pattern": r"\b(?<!mailto:)(?<!@)(?:https?:\/\/)?(?:www\.)?(?!\d)([a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}(?::\d+)?(?:\/[^\s<>\"'@]*|(?!\S))?\b(?![\w@./])"},
+    {"label": "SOCI", "requires": "@", "pattern": r"@[A-Za-z0-9](?:[A-Za-z0-9._-]{1,28}[A-Za-z0-9])?"},
+    {"label": "LOC", "requires": tier1_engine.DIGIT, "pattern": r"\b\d{5}\b"},
+    {"label": "DATE", "requires": tier1_engine.DIGIT, "pattern": r"\b\d{1,2}\.\d{1,2}\.(\d{4}|\d{2})\b"},
+    {"label": "DATE", "requires": tier1_engine.DIGIT, "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"},
+    {"label": "DATE", "requires": tier1_engine.DIGIT, "pattern": r"(?i)\b\d{2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"},
+    {"label": "DATE", "requires": tier1_engine.DIGIT, "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s'\d{2}\b"}
 ]
+TIER1_RULESET = tier1_engine.compile_rules(TIER1_PATTERNS)
 
 # CORE FUNCTIONS
 
 def get_beam_confidence(doc, beam_width=16, beam_density=0.0001):
-    ner = nlp.get_pipe("ner")
+    ner = get_nlp().get_pipe("ner")
     beams = ner.beam_parse([doc], beam_width=beam_width, beam_density=beam_density)
     entity_scores = defaultdict(float)
     for beam in beams:
@@ -63,14 +98,13 @@ def run_pii_detection(text, manual_overrides=None):
     text = unicodedata.normalize('NFC', text)
     all_hits = []
     
-    # Tier 1: Regex
-    for rule in TIER1_PATTERNS:
-        for match in re.finditer(rule["pattern"], text):
-            all_hits.append({
-                "start": match.start(), "end": match.end(),
-                "label": rule["label"], "source": "Tier 1",
-                "length": match.end() - match.start()
-            })
+    # Tier 1: Regex — on overlap the earlier rule wins
+    for hit in tier1_engine.scan(TIER1_RULESET, text):
+        all_hits.append({
+            "start": hit["start"], "end": hit["end"],
+            "label": hit["label"], "source": "Tier 1",
+            "length": hit["end"] - hit["start"]
+        })
             
     # Manual Search & Tag Overrides
     if manual_overrides:
@@ -83,14 +117,15 @@ def run_pii_detection(text, manual_overrides=None):
                 })
 
     # Tier 2: spaCy
-    doc = nlp(text)
-    beam_scores = get_beam_confidence(doc)
+    doc, beam_scores = parse(text)
     ent_labels = ["PER", "LOC", 'PHONE', 'EMAIL']
     
     for ent in doc.ents:
-        if ent.label_ in ent_labels or ent.label_.startswith("LOC_STR"):
+        # The model service's ruler labels streets ADRESSE_1/2 instead of LOC_STR1/2
+        is_street = ent.label_.startswith(("LOC_STR", "ADRESSE_"))
+        if ent.label_ in ent_labels or is_street:
             score_key = (ent.start, ent.end, ent.label_)
-            conf = 1.0 if (ent.ent_id or "STR" in ent.label_) else beam_scores.get(score_key, 0.0)
+            conf = 1.0 if (ent.ent_id or is_street) else beam_scores.get(score_key, 0.0)
             all_hits.append({
                 "start": ent.start_char, "end": ent.end_char,
                 "label": ent.label_, "source": "Tier 2",
@@ -163,43 +198,50 @@ def apply_neutralizer(text, filepath, job_dict_df=None):
         (r"\b(Kaufmann|Kauffrau)\s\b", "Fachkraft ", "Title Neutralization")
     ]
 
+    # Every replacement becomes a span on the incoming text; the patterns
+    # win where a dictionary title overlaps them, and the text is rebuilt once
+    candidates = []
     for pattern, replacement, label in kauf_patterns:
-        matches = re.finditer(pattern, current, flags=re.IGNORECASE)
-        for m in matches:
+        for m in re.finditer(pattern, current, flags=re.IGNORECASE):
+            candidates.append((m.start(), m.end(), m.expand(replacement), 0, label))
+
+    # 2. THE ACTUATOR: Dictionary Lookup (User Approved)
+    if job_dict_df is not None:
+        # Aho-Corasick automaton: longest match wins, one pass over the text
+        automaton = dict_matcher.get_automaton(job_dict_df)
+        for start, end, original, neutral in dict_matcher.find_matches(automaton, current):
+            candidates.append((start, end, str(neutral), 1, original))
+
+    logged = set()
+    spans = span_builder.resolve(candidates)
+    for start, end, replacement, priority, detail in spans:
+        if priority == 0:
             events.append({
                 'Timestamp': datetime.now().strftime(ts_format),
                 'Filepath': filepath,
                 'Event_type': 'Neutralization',
-                'Description': f"Pattern: '{m.group(0)}' -> '{replacement}'",
-                'Start': m.start(),
-                'End': m.end(),
+                'Description': f"Pattern: '{current[start:end]}' -> '{replacement}'",
+                'Start': start,
+                'End': end,
                 'Confidence_Score': 1.0,
-                'Details': f"Regex-Rule: {label}"
+                'Details': f"Regex-Rule: {detail}"
             })
-        current = re.sub(pattern, replacement, current, flags=re.IGNORECASE)
-
-    # 2. THE ACTUATOR: Dictionary Lookup (User Approved)
-    if job_dict_df is not None:
-        # Sort dict by length descending to prevent substring issues
-        sorted_dict = job_dict_df.iloc[job_dict_df['original'].str.len().argsort()[::-1]]
-        for _, row in sorted_dict.iterrows():
-            target = rf'\b{re.escape(str(row["original"]))}\b'
-            if re.search(target, current, flags=re.IGNORECASE):
-                # For simplicity in the log, we mark start/end as context-based
-                events.append({
-                    'Timestamp': datetime.now().strftime(ts_format),
-                    'Filepath': filepath,
-                    'Event_type': 'Neutralization',
-                    'Description': f"Dict: '{row['original']}' -> '{row['neutral']}'",
-                    'Start': 0, 'End': 0, # Global replace
-                    'Confidence_Score': 0.95,
-                    'Details': 'Manual Dictionary Match' 
-                })
-                current = re.sub(target, row["neutral"], current, flags=re.IGNORECASE)
+        elif detail not in logged:
+            logged.add(detail)
+            events.append({
+                'Timestamp': datetime.now().strftime(ts_format),
+                'Filepath': filepath,
+                'Event_type': 'Neutralization',
+                'Description': f"Dict: '{detail}' -> '{replacement}'",
+                'Start': 0, 'End': 0, # Global replace
+                'Confidence_Score': 0.95,
+                'Details': 'Manual Dictionary Match' 
+            })
+    current = span_builder.apply(current, spans)
 
     # 3. THE SENSOR: Linguistic Detection (spaCy Morphology)
     # We run this AFTER replacements to catch only what remains
-    doc = nlp(current)
+    doc, _ = parse(current, beam=False)
     for token in doc:
         if (token.pos_ in ["NOUN", "PROPN", "PRON"]) and (is_person_related(token) or token.pos_ == "PRON"):
             morph = token.morph.to_dict()
@@ -226,13 +268,12 @@ def process_complyable(raw_text, db_path="complyable_vault.db", manual_rules=Non
     clean_text = to_titlecase(raw_text)
     
     # 2. Detect PII
-    hits = run_pii_detection(clean_text, manual_rules)
+    hits, clean_text = run_pii_detection(clean_text, manual_rules)
     
-    # 3. Apply Redaction (Back-to-front)
-    hits_sorted = sorted(hits, key=lambda x: x['start'], reverse=True)
-    redacted_text = clean_text
-    for h in hits_sorted:
-        redacted_text = redacted_text[:h['start']] + f"[{h['label']}]" + redacted_text[h['end']:]
+    # 3. Apply Redaction (single pass over the merged hits)
+    redacted_text = span_builder.apply(
+        clean_text, [(h['start'], h['end'], f"[{h['label']}]") for h in hits]
+    )
         
     # 4. Neutralize
     # Get dict from DB (In a real app, you might cache this for speed)
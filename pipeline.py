@@ -52,6 +52,73 @@ def to_titlecase(text):
     return re.sub(r'\b[A-ZÜÖÄß]{3,}\b', replace_match, text)
 
 
+_HIGHLIGHT_COLUMNS = """
+    pii_id, pii_text, filepath, pii_hash, label, occurrence_index, status,
+    is_manual, category, event_code, methodology, confidence_score, scoring_method
+"""
+
+_HIGHLIGHT_SELECT = """
+    SELECT
+        p.pii_id, p.pii_text, p.filepath, p.pii_hash,
+        COALESCE(j.neutral, p.label) AS label,
+        p.occurrence_index, p.status, p.is_manual,
+        p.label AS category, r.event_code,
+        r.methodology, p.confidence_score, p.scoring_method
+    FROM pending_pii p
+    LEFT JOIN event_registry r ON p.event_code = r.event_code
+    LEFT JOIN job_dict j ON p.pii_text = j.original
+"""
+
+_BUMP_VERSION = "ON CONFLICT (filepath) DO UPDATE SET version = version + 1"
+
+# Keep ui_highlight and highlight_versions in step with every row change.
+# Same definitions as complyable_app/ui/database.py, inlined like the rest of the schema.
+HIGHLIGHT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ui_highlight_pii_insert AFTER INSERT ON pending_pii BEGIN
+        INSERT OR REPLACE INTO ui_highlight ({_HIGHLIGHT_COLUMNS})
+            {_HIGHLIGHT_SELECT} WHERE p.pii_id = NEW.pii_id;
+        INSERT INTO highlight_versions (filepath, version) VALUES (NEW.filepath, 1) {_BUMP_VERSION};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ui_highlight_pii_update AFTER UPDATE ON pending_pii BEGIN
+        DELETE FROM ui_highlight WHERE pii_id = OLD.pii_id;
+        INSERT OR REPLACE INTO ui_highlight ({_HIGHLIGHT_COLUMNS})
+            {_HIGHLIGHT_SELECT} WHERE p.pii_id = NEW.pii_id;
+        INSERT INTO highlight_versions (filepath, version)
+            SELECT filepath, 1 FROM (SELECT OLD.filepath AS filepath UNION SELECT NEW.filepath)
+            WHERE filepath IS NOT NULL {_BUMP_VERSION};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ui_highlight_pii_delete AFTER DELETE ON pending_pii BEGIN
+        DELETE FROM ui_highlight WHERE pii_id = OLD.pii_id;
+        INSERT INTO highlight_versions (filepath, version) VALUES (OLD.filepath, 1) {_BUMP_VERSION};
+    END
+    """,
+]
+
+def _dict_trigger(event, rows):
+    # A job_dict entry relabels its text in every document
+    body = "".join(f"""
+        INSERT OR REPLACE INTO ui_highlight ({_HIGHLIGHT_COLUMNS})
+            {_HIGHLIGHT_SELECT} WHERE p.pii_text = {row}.original;
+        INSERT INTO highlight_versions (filepath, version)
+            SELECT DISTINCT filepath, 1 FROM pending_pii WHERE pii_text = {row}.original {_BUMP_VERSION};
+    """ for row in rows)
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS ui_highlight_dict_{event.lower()} AFTER {event} ON job_dict BEGIN
+        {body}
+    END
+    """
+
+HIGHLIGHT_TRIGGERS += [
+    _dict_trigger("INSERT", ["NEW"]),
+    _dict_trigger("UPDATE", ["OLD", "NEW"]),
+    _dict_trigger("DELETE", ["OLD"]),
+]
+
 # ─────────────────────────────────────────────
 # STEP 0: SCHEMA GUARD (was: schema guard node)
 # ─────────────────────────────────────────────
@@ -100,13 +167,20 @@ def initialize_vault():
                 label TEXT,
                 occurrence_index INTEGER,
                 confidence_score REAL,
+                scoring_method TEXT,
                 event_code TEXT,
                 status TEXT DEFAULT 'REDACT',
                 is_manual INTEGER DEFAULT 0,
                 FOREIGN KEY (filepath) REFERENCES pending_review(filepath)
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_pii_filepath ON pending_pii (filepath)")
+        # Index names match database.INDEXES in the app, which drops any others
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_pii_filepath_text ON pending_pii (filepath, pii_text)")
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(pending_pii)")}
+        if "scoring_method" not in columns:
+            cursor.execute("ALTER TABLE pending_pii ADD COLUMN scoring_method TEXT")
+        # The job_dict triggers look up a text across all documents
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_pii_text ON pending_pii (pii_text)")
 
         cursor.execute("DROP TABLE IF EXISTS job_dict")
         cursor.execute("""
@@ -127,19 +201,36 @@ def initialize_vault():
                 processed_at TEXT
             )
         """)
-        cursor.execute("DROP VIEW IF EXISTS ui_highlight")
+        # UI highlight table (formerly a view), kept current by the triggers above
+        existing = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'ui_highlight'").fetchone()
+        if existing and existing[0] == 'view':
+            cursor.execute("DROP VIEW ui_highlight")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ui_highlight (
+                pii_id INTEGER PRIMARY KEY,
+                pii_text TEXT,
+                filepath TEXT,
+                pii_hash TEXT,
+                label TEXT,
+                occurrence_index INTEGER,
+                status TEXT,
+                is_manual INTEGER,
+                category TEXT,
+                event_code TEXT,
+                methodology TEXT,
+                confidence_score REAL,
+                scoring_method TEXT
+            )
+        """)
         cursor.execute("""
-            CREATE VIEW ui_highlight AS
-                SELECT
-                    p.pii_id, p.pii_text, p.filepath, p.pii_hash,
-                    COALESCE(j.neutral, p.label) AS label,
-                    p.occurrence_index, p.status, p.is_manual,
-                    p.label AS category, r.event_code,
-                    r.methodology, p.confidence_score
-                FROM pending_pii p
-                LEFT JOIN event_registry r ON p.event_code = r.event_code
-                LEFT JOIN job_dict j ON p.pii_text = j.original
+            CREATE TABLE IF NOT EXISTS highlight_versions (
+                filepath TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
         """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ui_highlight_filepath_text ON ui_highlight (filepath, pii_text)")
+        for trigger in HIGHLIGHT_TRIGGERS:
+            cursor.execute(trigger)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS final_commit (
                 commit_uuid TEXT PRIMARY KEY,
@@ -170,7 +261,6 @@ def initialize_vault():
                 FOREIGN KEY (commit_uuid) REFERENCES final_commit(commit_uuid)
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_filepath ON audit_trail (filepath)")
 
         # Seed job_dict if empty
         cursor.execute("SELECT COUNT(*) FROM job_dict")
@@ -182,6 +272,14 @@ def initialize_vault():
             else:
                 print(f"[Pipeline] Warning: CSV not found at {CSV_PATH}")
 
+        # job_dict was recreated above without firing its triggers, so rebuild once
+        cursor.execute("DELETE FROM ui_highlight")
+        cursor.execute(f"INSERT INTO ui_highlight ({_HIGHLIGHT_COLUMNS}) {_HIGHLIGHT_SELECT}")
+        cursor.execute(f"""
+            INSERT INTO highlight_versions (filepath, version)
+            SELECT DISTINCT filepath, 1 FROM pending_pii WHERE filepath IS NOT NULL {_BUMP_VERSION}
+        """)
+
         conn.commit()
     print("[Pipeline] Vault initialized.")
 
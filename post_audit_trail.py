@@ -1,5 +1,6 @@
-import sqlite3
 import pandas as pd
+import sqlite3
+from contextlib import contextmanager
 import knime.scripting.io as knio
 import uuid
 import hashlib
@@ -9,53 +10,99 @@ from dotenv import load_dotenv
 load_dotenv('./')
 db_path = os.getenv('DB_PATH', "../complyable_app/data/vault/complyable_vault.db")
 
+# --- START --- bulk writes --- START ---
+# Set-based writes shared by the post_* nodes, inlined like the rest of the
+# node logic: columns are converted once, every table gets one executemany,
+# and the node's writes share one transaction.
+def text_column(df, name, default=''):
+    """Column as str, default for missing columns and empty cells."""
+    if name not in df:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[name].fillna(default).astype(str)
+
+def int_column(df, name, default=0):
+    if name not in df:
+        return pd.Series(default, index=df.index, dtype='int64')
+    return pd.to_numeric(df[name], errors='coerce').fillna(default).astype('int64')
+
+def float_column(df, name, default=0.0):
+    if name not in df:
+        return pd.Series(default, index=df.index, dtype='float64')
+    return pd.to_numeric(df[name], errors='coerce').fillna(default).astype('float64')
+
+def to_rows(*columns):
+    """Parameter tuples for executemany; tolist() yields plain Python values."""
+    return list(zip(*(column.tolist() for column in columns)))
+
+@contextmanager
+def transaction(db_path):
+    """One write transaction for the whole node; rolled back on any error."""
+    connect = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    connect.execute("PRAGMA journal_mode=WAL")
+    cursor = connect.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        yield cursor
+        cursor.execute("COMMIT")
+    except Exception:
+        if connect.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        connect.close()
+
+def insert_rows(cursor, table, columns, rows, verb="INSERT"):
+    """executemany over rows. Returns the number of rows written."""
+    if not rows:
+        return 0
+    placeholders = ", ".join("?" * len(columns))
+    cursor.executemany(
+        f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+    )
+    return len(rows)
+# --- END --- bulk writes --- END ---
+
 # cumulative_log dataframe
 log_df = knio.input_tables[0].to_pandas()
 
 def archive_audit_trail(df):
-    connect = sqlite3.connect(db_path)
-    cursor = connect.cursor()
+    filepath = text_column(df, 'filepath')
+    timestamp = text_column(df, 'timestamp')
+    pii_hash = text_column(df, 'pii_hash')
+    occ_idx = int_column(df, 'occurrence_index', 1)
+
+    # Integrity has based on SHA-256 fingerprint of event
+    # Proof that record wasn't modified
+    hash_strings = timestamp + filepath + pii_hash + occ_idx.astype(str)
+    integrity_hash = pd.Series(
+        [hashlib.sha256(s.encode()).hexdigest() for s in hash_strings], index=df.index
+    )
+    rec_uuid = pd.Series([str(uuid.uuid4()) for _ in range(len(df))], index=df.index)
 
-    records_added = 0
-    for _, row in df.iterrows():
-        rec_uuid = str(uuid.uuid4())
-        occ_idx = row.get('occurrence_index', 1)
-
-        # Integrity has based on SHA-256 fingerprint of event
-        # Proof that record wasn't modified
-        hash_string = f'{row["timestamp"]}{row["filepath"]}{row.get("pii_hash", "")}{occ_idx}'
-        integrity_hash = hashlib.sha256(hash_string.encode()).hexdigest()
-
-        cursor.execute('''
-            INSERT INTO audit_trail (
-                       record_uuid,
-                       filepath,
-                       timestamp,
-                       event_code,
-                       pii_hash,
-                       label,
-                       occurrence_index,
-                       confidence_score,
-                       integrity_hash
-                       )
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                       ''', (
-                           str(rec_uuid),
-                           str(row['filepath']),
-                           str(row['timestamp']),
-                           str(row['event_code']),
-                           str(row.get('pii_hash', '')),
-                           str(row.get['label']),
-                           int(occ_idx),
-                           float(row.get('confidence_score', 0.0)),
-                           integrity_hash
-                       ))
-        records_added += 1
-
-    connect.commit()
-    connect.close()
-    return records_added
+    rows = to_rows(
+        rec_uuid,
+        filepath,
+        timestamp,
+        text_column(df, 'event_code'),
+        pii_hash,
+        text_column(df, 'label'),
+        occ_idx,
+        float_column(df, 'confidence_score', 0.0),
+        integrity_hash,
+    )
+    with transaction(db_path) as cursor:
+        return insert_rows(cursor, "audit_trail", [
+            "record_uuid",
+            "filepath",
+            "timestamp",
+            "event_code",
+            "pii_hash",
+            "label",
+            "occurrence_index",
+            "confidence_score",
+            "integrity_hash",
+        ], rows)
 
 total_saved = archive_audit_trail(log_df)
 
-knio.output_tables[0] = knio.Table.from_pandas(pd.DataFrame([{"Records_Archived": total_saved}])) 
\ No newline at end of file
+knio.output_tables[0] = knio.Table.from_pandas(pd.DataFrame([{"Records_Archived": total_saved}]))
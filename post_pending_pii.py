@@ -1,5 +1,6 @@
-import sqlite3
 import pandas as pd
+import sqlite3
+from contextlib import contextmanager
 import knime.scripting.io as knio
 import os
 from dotenv import load_dotenv
@@ -7,49 +8,98 @@ from dotenv import load_dotenv
 load_dotenv('./')
 db_path = os.getenv('DB_PATH', "../complyable_app/data/vault/complyable_vault.db")
 
+# --- START --- bulk writes --- START ---
+# Set-based writes shared by the post_* nodes, inlined like the rest of the
+# node logic: columns are converted once, every table gets one executemany,
+# and the node's writes share one transaction.
+def text_column(df, name, default=''):
+    """Column as str, default for missing columns and empty cells."""
+    if name not in df:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[name].fillna(default).astype(str)
+
+def int_column(df, name, default=0):
+    if name not in df:
+        return pd.Series(default, index=df.index, dtype='int64')
+    return pd.to_numeric(df[name], errors='coerce').fillna(default).astype('int64')
+
+def float_column(df, name, default=0.0):
+    if name not in df:
+        return pd.Series(default, index=df.index, dtype='float64')
+    return pd.to_numeric(df[name], errors='coerce').fillna(default).astype('float64')
+
+def to_rows(*columns):
+    """Parameter tuples for executemany; tolist() yields plain Python values."""
+    return list(zip(*(column.tolist() for column in columns)))
+
+@contextmanager
+def transaction(db_path):
+    """One write transaction for the whole node; rolled back on any error."""
+    connect = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    connect.execute("PRAGMA journal_mode=WAL")
+    cursor = connect.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        yield cursor
+        cursor.execute("COMMIT")
+    except Exception:
+        if connect.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        connect.close()
+
+def insert_rows(cursor, table, columns, rows, verb="INSERT"):
+    """executemany over rows. Returns the number of rows written."""
+    if not rows:
+        return 0
+    placeholders = ", ".join("?" * len(columns))
+    cursor.executemany(
+        f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+    )
+    return len(rows)
+
+def delete_matching(cursor, table, column, values):
+    """Deletes all rows whose column is one of values, via a temp key table."""
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_keys (key TEXT PRIMARY KEY)")
+    cursor.execute("DELETE FROM bulk_keys")
+    cursor.executemany("INSERT OR IGNORE INTO bulk_keys (key) VALUES (?)", ((v,) for v in values))
+    cursor.execute(f"DELETE FROM {table} WHERE {column} IN (SELECT key FROM bulk_keys)")
+    return cursor.rowcount
+# --- END --- bulk writes --- END ---
+
 # This is the cumulative_log from your Tiers
 log_df = knio.input_tables[0].to_pandas()
 
 def stage_pending_pii(df):
-    connect = sqlite3.connect(db_path)
-    cursor = connect.cursor()
+    filepath = text_column(df, 'filepath')
 
-    target_files = tuple(df['filepath'].unique())
-    if len(target_files) == 1:
-        cursor.execute("DELETE FROM pending_pii WHERE filepath = ?", (target_files[0],))
-    else:
-        cursor.execute(f"DELETE FROM pending_pii WHERE filepath IN {target_files}")
-
-    records_added = 0
-    for _, row in df.iterrows():
-        # Clean landing into the staging table
-        cursor.execute('''
-            INSERT INTO pending_pii (
-                       filepath,
-                       pii_text,
-                       pii_hash,
-                       label,
-                       occurrence_index,
-                       confidence_score,
-                       event_code,
-                       status,
-                       is_manual
-                       )
-                       VALUES (?, ?, ?, ?, ?, ?, ?, 'REDACT', 0)
-                       ''', (
-                           str(row['filepath']),
-                           str(row['pii_text']),
-                           str(row.get('pii_hash', '')),
-                           str(row.get('label', 'UNKNOWN')),
-                           row.get('occurrence_index', 1),
-                           float(row.get('confidence_score', 0.0)),
-                           str(row.get('event_code', 'T1-RGX'))
-                       ))
-        records_added += 1
-
-    connect.commit()
-    connect.close()
-    return records_added
+    # Clean landing into the staging table
+    rows = to_rows(
+        filepath,
+        text_column(df, 'pii_text'),
+        text_column(df, 'pii_hash'),
+        text_column(df, 'label', 'UNKNOWN'),
+        int_column(df, 'occurrence_index', 1),
+        float_column(df, 'confidence_score', 0.0),
+        text_column(df, 'event_code', 'T1-RGX'),
+        pd.Series('REDACT', index=df.index),
+        pd.Series(0, index=df.index),
+    )
+    with transaction(db_path) as cursor:
+        # Re-staged files replace their previous findings
+        delete_matching(cursor, "pending_pii", "filepath", filepath.unique().tolist())
+        return insert_rows(cursor, "pending_pii", [
+            "filepath",
+            "pii_text",
+            "pii_hash",
+            "label",
+            "occurrence_index",
+            "confidence_score",
+            "event_code",
+            "status",
+            "is_manual",
+        ], rows)
 
 # Check if log_df is empty to avoid errors
 if not log_df.empty:
@@ -57,4 +107,4 @@ if not log_df.empty:
 else:
     total_staged = 0
 
-knio.output_tables[0] = knio.Table.from_pandas(pd.DataFrame([{"Records_Staged": total_staged}]))
\ No newline at end of file
+knio.output_tables[0] = knio.Table.from_pandas(pd.DataFrame([{"Records_Staged": total_staged}]))
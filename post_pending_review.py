@@ -1,5 +1,7 @@
 import hashlib
+import pandas as pd
 import sqlite3
+from contextlib import contextmanager
 import knime.scripting.io as knio
 import os
 from dotenv import load_dotenv
@@ -7,23 +9,60 @@ from dotenv import load_dotenv
 load_dotenv('./')
 db_path = os.getenv('DB_PATH', "../complyable_app/data/vault/complyable_vault.db")
 
+# --- START --- bulk writes --- START ---
+# Set-based writes shared by the post_* nodes, inlined like the rest of the
+# node logic: columns are converted once, every table gets one executemany,
+# and the node's writes share one transaction.
+def to_rows(*columns):
+    """Parameter tuples for executemany; tolist() yields plain Python values."""
+    return list(zip(*(column.tolist() for column in columns)))
+
+@contextmanager
+def transaction(db_path):
+    """One write transaction for the whole node; rolled back on any error."""
+    connect = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    connect.execute("PRAGMA journal_mode=WAL")
+    cursor = connect.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        yield cursor
+        cursor.execute("COMMIT")
+    except Exception:
+        if connect.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        connect.close()
+
+def insert_rows(cursor, table, columns, rows, verb="INSERT"):
+    """executemany over rows. Returns the number of rows written."""
+    if not rows:
+        return 0
+    placeholders = ", ".join("?" * len(columns))
+    cursor.executemany(
+        f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+    )
+    return len(rows)
+# --- END --- bulk writes --- END ---
+
 def generate_integrity_hash(text):
     return hashlib.sha256(text.encode('utf-8')).hexdigest() 
 
 data = knio.input_tables[0].to_pandas()
-connect = sqlite3.connect(db_path)
-cursor = connect.cursor()
-
-for _, row in data.iterrows():
-    i_hash = generate_integrity_hash(str(row['Output']))
-
-    cursor.execute("""
-        INSERT OR REPLACE INTO pending_review 
-        (filepath, original, markdown, output, status, integrity_hash)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (row['Filepath'], row['Original'], row['Markdown'], row['Output'], 'PENDING', i_hash))
-    
-connect.commit()
-connect.close()
-
-knio.output_tables[0] = knio.Table.from_pandas(data)
\ No newline at end of file
+
+output = data['Output'].astype(str)
+rows = to_rows(
+    data['Filepath'],
+    data['Original'],
+    data['Markdown'],
+    data['Output'],
+    pd.Series('PENDING', index=data.index),
+    output.map(generate_integrity_hash),
+)
+
+with transaction(db_path) as cursor:
+    insert_rows(cursor, "pending_review",
+                   ["filepath", "original", "markdown", "output", "status", "integrity_hash"],
+                   rows, verb="INSERT OR REPLACE")
+
+knio.output_tables[0] = knio.Table.from_pandas(data)
@@ -1,5 +1,6 @@
-import sqlite3
 import pandas as pd
+import sqlite3
+from contextlib import contextmanager
 import knime.scripting.io as knio
 from datetime import datetime
 import uuid
@@ -9,42 +10,69 @@ from dotenv import load_dotenv
 load_dotenv('./')
 db_path = os.getenv('DB_PATH', "../complyable_app/data/vault/complyable_vault.db")
 
+# --- START --- bulk writes --- START ---
+# Set-based writes shared by the post_* nodes, inlined like the rest of the
+# node logic: columns are converted once, every table gets one executemany,
+# and the node's writes share one transaction.
+def to_rows(*columns):
+    """Parameter tuples for executemany; tolist() yields plain Python values."""
+    return list(zip(*(column.tolist() for column in columns)))
+
+@contextmanager
+def transaction(db_path):
+    """One write transaction for the whole node; rolled back on any error."""
+    connect = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    connect.execute("PRAGMA journal_mode=WAL")
+    cursor = connect.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        yield cursor
+        cursor.execute("COMMIT")
+    except Exception:
+        if connect.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        connect.close()
+
+def insert_rows(cursor, table, columns, rows, verb="INSERT"):
+    """executemany over rows. Returns the number of rows written."""
+    if not rows:
+        return 0
+    placeholders = ", ".join("?" * len(columns))
+    cursor.executemany(
+        f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+    )
+    return len(rows)
+# --- END --- bulk writes --- END ---
+
 # Commit session summary
 summary_results = knio.input_tables[0].to_pandas()
 
 def db_commit(df):
     try: 
-        connect = sqlite3.connect(db_path)
-        cursor = connect.cursor()
-
         current_session_id = str(uuid.uuid4())
         processed_at = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
 
-        for _, row in df.iterrows():
-            cursor.execute('''
-                INSERT INTO session_summary (
-                           session_uuid,
-                           file,
-                           pii_redacted,
-                           gip,
-                           trust_score,
-                           compliance_grade,
-                           processed_at
-                           
-                        )
-                        Values (?, ?, ?, ?, ?, ?, ?)   
-                        ''', (
-                            current_session_id,
-                            row["file"],
-                            int(row["pii_redacted"]),
-                            int(row["gip"]),
-                            float(row["trust_score"]),
-                            row["compliance_grade"],
-                            processed_at
-                        ))
-            
-        connect.commit()
-        connect.close()
+        rows = to_rows(
+            pd.Series(current_session_id, index=df.index),
+            df["file"],
+            df["pii_redacted"].astype('int64'),
+            df["gip"].astype('int64'),
+            df["trust_score"].astype('float64'),
+            df["compliance_grade"],
+            pd.Series(processed_at, index=df.index),
+        )
+        with transaction(db_path) as cursor:
+            insert_rows(cursor, "session_summary", [
+                "session_uuid",
+                "file",
+                "pii_redacted",
+                "gip",
+                "trust_score",
+                "compliance_grade",
+                "processed_at",
+            ], rows)
         return 'Success', current_session_id
     except Exception as e:
         return 'Error', str(e)
@@ -58,4 +86,4 @@ output_df = pd.DataFrame([{
     'Timestamp': datetime.now().strftime("%d-%m-%Y %H:%M:%S")
 }])
 
-knio.output_tables[0] = knio.Table.from_pandas(output_df)
\ No newline at end of file
+knio.output_tables[0] = knio.Table.from_pandas(output_df)
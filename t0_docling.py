@@ -3,6 +3,7 @@ import pandas as pd
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.base_models import InputFormat
 from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
+import pypdfium2 as pdfium
 import re
 
 pipeline_options = {
@@ -21,8 +22,32 @@ def play_docling(path):
     except Exception as e:
         return f"ERROR: {str(e)}"
 
+# Fast path for PDFs the layout analyzer routed to 'text-layer' (simple, single column)
+def play_text_layer(path):
+    try:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            pages = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                pages.append(textpage.get_text_range().strip())
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+        return "\n\n".join(pages).replace("\r\n", "\n").replace("\r", "\n")
+    except Exception:
+        # Fall back to the full conversion
+        return play_docling(path)
+
 input_table = knio.input_tables[0].to_pandas()
-input_table['Markdown'] = input_table['Filepath'].apply(play_docling)
+if 'route' in input_table.columns:
+    input_table['Markdown'] = [
+        play_text_layer(path) if route == 'text-layer' else play_docling(path)
+        for path, route in zip(input_table['Filepath'], input_table['route'])
+    ]
+else:
+    input_table['Markdown'] = input_table['Filepath'].apply(play_docling)
 
 
 
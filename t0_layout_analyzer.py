@@ -1,20 +1,75 @@
 import knime.scripting.io as knio
 import pdfplumber
 import pandas as pd
+import numpy as np
 import re
+import os
 import datetime
 
-# --- temporary silent analyzer
-# -- recent failing version in codebase
+# Layout-complexity router — a standalone column count, because KNIME nodes
+# can't import the app modules. ui/layout_router.py scores pages by the
+# confidence of the reading-order reconstruction (ui/reading_order.py) instead.
+# Below FAST_THRESHOLD a PDF is routed to the text-layer fast path, otherwise to Docling.
+FAST_THRESHOLD = float(os.getenv('LAYOUT_FAST_THRESHOLD', '0.3'))
+MIN_TEXT_CHARS = 20
+BINS = 200
+GUTTER_WIDTH = 0.02
+MIN_COLUMN_SHARE = 0.1
+COLUMN_WEIGHT = 0.5
+IMAGE_WEIGHT = 0.5
+
+def count_columns(boxes, page_width):
+    """Text columns on a page, from empty vertical bands in the character coverage."""
+    if len(boxes) == 0 or page_width <= 0:
+        return 0
+    edges = np.linspace(0, page_width, BINS + 1)
+    first = np.clip(np.searchsorted(edges, boxes[:, 0], side='right') - 1, 0, BINS - 1)
+    last = np.clip(np.searchsorted(edges, boxes[:, 1], side='left'), first + 1, BINS)
+    heights = np.abs(boxes[:, 3] - boxes[:, 2])
+    delta = np.zeros(BINS + 1)
+    np.add.at(delta, first, heights)
+    np.add.at(delta, last, -heights)
+    coverage = np.cumsum(delta)[:BINS]
+    if coverage.max() <= 0:
+        return 0
+
+    occupied = np.flatnonzero(coverage > 0.05 * coverage.max())
+    inside = coverage[occupied[0]:occupied[-1] + 1]
+    empty = (inside <= 0.05 * coverage.max()).astype(np.int8)
+    steps = np.diff(np.concatenate(([0], empty, [0])))
+    starts, ends = np.flatnonzero(steps == 1), np.flatnonzero(steps == -1)
+
+    mass = np.cumsum(inside)
+    min_bins = max(1, int(GUTTER_WIDTH * BINS))
+    columns = 1
+    for start, end in zip(starts, ends):
+        left_share = mass[start - 1] / mass[-1]
+        if end - start >= min_bins and MIN_COLUMN_SHARE <= left_share <= 1 - MIN_COLUMN_SHARE:
+            columns += 1
+    return columns
+
 def play_analyzer(page):
     """
-    Smoke tests for layout complexity.
-    Returns a score between 0.0 (Simple) and 1.0 (Chaotic).
+    Layout complexity from pdfplumber's character and image boxes.
+    Returns (score, char_count, columns, image_coverage),
+    score between 0.0 (Simple) and 1.0 (Chaotic).
     """
-    words = page.extract_words()
-    if not words: return 0.0, 0
-       
-    return 0.05, len(words)
+    width, height = float(page.width), float(page.height)
+    image_area = sum(
+        max(0.0, min(img['x1'], width) - max(img['x0'], 0.0)) * max(0.0, min(img['bottom'], height) - max(img['top'], 0.0))
+        for img in page.images
+    )
+    image_coverage = min(1.0, image_area / (width * height)) if width and height else 0.0
+
+    chars = page.chars
+    if len(chars) < MIN_TEXT_CHARS:
+        # Blank pages are simple, image-only pages are scans
+        return (1.0 if image_coverage > 0.01 else 0.0), len(chars), 0, image_coverage
+
+    boxes = np.array([(c['x0'], c['x1'], c['top'], c['bottom']) for c in chars], dtype=float)
+    columns = count_columns(boxes, width)
+    score = min(1.0, COLUMN_WEIGHT * max(columns - 1, 0) + IMAGE_WEIGHT * image_coverage)
+    return score, len(chars), columns, image_coverage
 
 
 input_df = knio.input_tables[0].to_pandas()
@@ -29,24 +84,30 @@ for _, row in input_df.iterrows():
         output.append({
             'filepath': path,
             'layout_score': 0.0,
-            'status': 'skipped'
+            'status': 'skipped',
+            'route': 'docling'
             })
         continue 
     
     work_start = datetime.datetime.now()
     risk_score = 0.5
-    word_count = 0
+    char_count = 0
+    max_columns = 0
     status = 'success'
     
     try:
         with pdfplumber.open(path) as pdf:
             page_scores = []
             for page in pdf.pages:
-                page_score, page_words = play_analyzer(page)
+                page_score, page_chars, columns, _ = play_analyzer(page)
                 page_scores.append(page_score)
-                word_count += page_words
+                char_count += page_chars
+                max_columns = max(max_columns, columns)
+                # Release the parsed page objects, long portfolios add up
+                page.flush_cache()
 
-            risk_score = sum(page_scores) / len(page_scores) if page_scores else 0
+            # One complex page is enough to need full layout analysis
+            risk_score = max(page_scores) if page_scores else 0
             
     except Exception as e:
         status = f'failed: {str(e)[:50]}'
@@ -55,8 +116,10 @@ for _, row in input_df.iterrows():
     # Output for pipeline and DB writer
     output.append({
         'filepath': path, 
-        'layout_score': risk_score, 
-        'status': status
+        'layout_score': round(risk_score, 3), 
+        'status': status,
+        'columns': max_columns,
+        'route': 'text-layer' if status == 'success' and risk_score < FAST_THRESHOLD else 'docling'
     })
 
     # Processing Log
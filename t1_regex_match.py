@@ -5,43 +5,57 @@ import json
 import unicodedata
 import hashlib
 from collections import defaultdict
+from bisect import bisect_left
+
+# Sentinel for rules that can only match when the text contains a digit
+DIGIT = r"\d"
 
 # Describe REGEX patterns
+# 'requires' is a cheap prefilter: the rule is skipped when the text lacks it
 tier1_regex = [
     {
         "label": "E-MAIL",
+        "requires": "@",
         "pattern": r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"
     },
     {
         "label": "TELEFON",
+        "requires": DIGIT,
         "pattern": r"(?:(?:\+?49[ \-\.\(\)]?)?(?:(?:\(?0\d{1,5}\)?)|(?:\d{1,5}))[ \-\.\(\)]?(?:\d[ \-\.\(\)]?){5,10}\d)"
     },
     {
         "label": "WEB_LINK",
+        "requires": ".",
         "pattern": r"\b(?<!mailto:)(?<!@)(?:https?:\/\/)?(?:www\.)?(?!\d)([a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}(?::\d+)?(?:\/[^\s<>\"'@]*|(?!\S))?\b(?![\w@./])"
     },
     {
         "label": "SOCIAL_MEDIA",
+        "requires": "@",
         "pattern": r"@[A-Za-z0-9](?:[A-Za-z0-9._-]{1,28}[A-Za-z0-9])?"
     },
     {
         "label": "PLZ",
+        "requires": DIGIT,
         "pattern": r"\b\d{5}\b"
     },
     {
         "label": "DATUM",
+        "requires": DIGIT,
         "pattern": r"\b\d{1,2}\.\d{1,2}\.(\d{4}|\d{2})\b"
     },
     {
         "label": "DATUM",
+        "requires": DIGIT,
         "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"
     },
     {
         "label": "DATUM",
+        "requires": DIGIT,
         "pattern": r"(?i)\b\d{2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"
     },
     {
         "label": "DATUM",
+        "requires": DIGIT,
         "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s'\d{2}\b"
     }
 ]
@@ -60,40 +74,61 @@ def to_titlecase(text):
         return word.lower().title() if len(word) >= 3 else word
     return re.sub(r'\b[A-ZÜÖÄß]{3,}\b', replace_match, text)
 
+# --- START --- compiled scanner --- START ---
+# Same approach as ui/tier1_engine.py: every rule scans the original text,
+# then overlaps are resolved by rule order — the rule listed first wins
+digit_re = re.compile(r"\d")
+compiled_regex = [re.compile(rule['pattern'].removeprefix('(?i)'), flags=re.IGNORECASE)
+                  for rule in tier1_regex]
+
+def scan(text):
+    has_digit = digit_re.search(text) is not None
+    accepted = []
+    hits = {}
+    for rule, regex in zip(tier1_regex, compiled_regex):
+        if rule['requires'] == DIGIT and not has_digit \
+                or rule['requires'] != DIGIT and rule['requires'] not in text:
+            continue
+        for m in regex.finditer(text):
+            idx = bisect_left(accepted, m.span())
+            if idx > 0 and accepted[idx - 1][1] > m.start() \
+                    or idx < len(accepted) and accepted[idx][0] < m.end():
+                continue
+            accepted.insert(idx, m.span())
+            hits[m.start()] = (m.start(), m.end(), rule['label'], m.group())
+    return [hits[start] for start, _ in accepted]
+# --- END --- compiled scanner --- END ---
+
 # --- TIER 1 REGEX matching & redacting logic ---
 def get_tier1(text, filename):
     text = to_titlecase(unicodedata.normalize('NFC', text))
     markdown = text
     new_logs = []
     occ_counter = defaultdict(int)
+    redacted = []
+    last_end = 0
+
+    for start, end, label, match_text in scan(text):
+        text_hash = make_pii_hash(match_text)
+        occ_counter[match_text] += 1
+        current_idx = occ_counter[match_text]
+
+        # write log entries
+        new_logs.append({
+            'file': filename,
+            'pii_hash': text_hash,
+            'pii_text': match_text,
+            'label': label,
+            'occurrence_index': current_idx
+        })
+
+        # perform redaction — matches arrive in text order and never overlap
+        redacted.append(text[last_end:start])
+        redacted.append(f"[{label}]")
+        last_end = end
 
-    # for each rule in list
-    for rule in tier1_regex:
-#        matches = set(re.findall(rule['pattern'], text, flags=re.IGNORECASE)) # using set to avoid dupes
-        label = rule['label']
-        pattern = rule['pattern']
-
-        for match in re.finditer(pattern, text, flags=re.IGNORECASE):
-            match_text = match.group()
-            text_hash = make_pii_hash(match_text)
-            occ_counter[match_text] += 1
-            current_idx = occ_counter[match_text]
-
-            # write log entries
-            new_logs.append({
-                'file': filename,
-                'pii_hash': text_hash,
-                'pii_text': match_text,
-                'label': label,
-                'occurrence_index': current_idx
-            })
-
-            # perform redaction
-            redaction_label = f"[{label}]"
-            #text = re.sub(rf'\b{re.escape(match)}\b', redaction_label, text)
-            text = text.replace(match_text, redaction_label)
-
-    return new_logs, text, markdown
+    redacted.append(text[last_end:])
+    return new_logs, "".join(redacted), markdown
 
 # KNIME instructions
 input_df = knio.input_tables[0].to_pandas()
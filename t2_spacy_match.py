@@ -1,22 +1,36 @@
 import knime.scripting.io as knio
 import pandas as pd
 import spacy
+from spacy.tokens import DocBin
 import hashlib
 import unicodedata
 import json
 import re
+import os
+import base64
+import urllib.request
 from collections import defaultdict
 
-nlp = spacy.load("de_core_news_lg")
+# Batched NER — documents per batch and worker processes for nlp.pipe
+batch_size = int(os.getenv('NLP_BATCH_SIZE', '16'))
+n_process = int(os.getenv('NLP_PROCESSES', '1'))
 
-ruler = nlp.add_pipe("entity_ruler", before="ner")
-patterns = [
-    # Catches Dorfstraße, Dorfstr., Dorf str, etc.
-    {"label": "ADRESSE_1", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz|allee|gasse|damm)$"}}]},
-    # Catches house numbers following the street
-    {"label": "ADRESSE_2", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz)$"}}, {"IS_DIGIT": True}]}
-]
-ruler.add_patterns(patterns)
+# Resident model service (ui/nlp_service.py). When set, this node never loads the model.
+nlp_service_url = os.getenv('NLP_SERVICE_URL')
+
+if nlp_service_url:
+    nlp = spacy.blank("de")
+else:
+    nlp = spacy.load("de_core_news_lg")
+
+    ruler = nlp.add_pipe("entity_ruler", before="ner")
+    patterns = [
+        # Catches Dorfstraße, Dorfstr., Dorf str, etc.
+        {"label": "ADRESSE_1", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz|allee|gasse|damm)$"}}]},
+        # Catches house numbers following the street
+        {"label": "ADRESSE_2", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz)$"}}, {"IS_DIGIT": True}]}
+    ]
+    ruler.add_patterns(patterns)
 
 ent_labels = {
     "PER": "PERSON",
@@ -34,10 +48,14 @@ def make_pii_hash(text):
 
 
 # --- START --- TIER 2 --- START ---
-def get_tier2(doc, nlp, filename, text):
+def get_tier2(doc, nlp, filename, text, beam_scores=None):
     new_logs = []
-    beam_scores = get_beam_confidence(nlp, doc)
+    if beam_scores is None:
+        beam_scores = get_beam_confidence(nlp, doc)
     occ_counter = defaultdict(int)
+    # Entity spans never overlap, so the text is rebuilt once in entity order
+    redacted = []
+    last_end = 0
 
     # for each rule in list
     for ent in doc.ents:
@@ -68,9 +86,12 @@ def get_tier2(doc, nlp, filename, text):
                 })
         
             redaction_label = f"[{label}]"
-            text = re.sub(rf'\b{re.escape(found_text)}\b', redaction_label, text)
-    
-    return new_logs, text
+            redacted.append(text[last_end:ent.start_char])
+            redacted.append(redaction_label)
+            last_end = ent.end_char
+
+    redacted.append(text[last_end:])
+    return new_logs, "".join(redacted)
 # --- END --- Tier2 --- END ----
 
 # --- START - BEAM SEARCH CONF - START ---
@@ -90,26 +111,50 @@ def get_beam_confidence(nlp, doc, beam_width=16, beam_density=0.0001):
                 
     return entity_scores
 
+# --- START - MODEL SERVICE CLIENT - START ---
+def fetch_parses(texts):
+    body = json.dumps({"texts": texts, "batch_size": batch_size, "beam": True}).encode('utf-8')
+    req = urllib.request.Request(f"{nlp_service_url.rstrip('/')}/parse", data=body,
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        payload = json.loads(resp.read())
+
+    docs = list(DocBin().from_bytes(base64.b64decode(payload['docbin'])).get_docs(nlp.vocab))
+    scores = [{(s, e, l): sc for s, e, l, sc in doc_scores} for doc_scores in payload['beam_scores']]
+    return docs, scores
+# --- END - MODEL SERVICE CLIENT - END ---
+
 # KNIME instructions
 input_df = knio.input_tables[0].to_pandas()
 
 tier2_out = []
 all_logs = []
+doc_bins = []
 
 try: 
     cumulative_log = knio.input_tables[1].to_pandas().to_dict('records')
 except:
     cumulative_log = []
 
-# Loop over all provided filepaths in dir
-for content, filepath in zip(input_df['Markdown'], input_df['Filepath']):
+# Parse all documents in batches, then loop over the results in input order
+contents = input_df['Markdown'].tolist()
+if nlp_service_url:
+    docs, all_beam_scores = fetch_parses(contents) if contents else ([], [])
+else:
+    docs = nlp.pipe(contents, batch_size=batch_size, n_process=max(1, min(n_process, len(contents))))
+    all_beam_scores = [None] * len(contents)
 
-    doc = nlp(content)
+for doc, beam_scores, content, filepath in zip(docs, all_beam_scores, contents, input_df['Filepath']):
 
-    new_logs, text = get_tier2(doc, nlp, filepath, content)
+    new_logs, text = get_tier2(doc, nlp, filepath, content, beam_scores)
 
     tier2_out.append(text)
 
+    # Serialized parse for Tier 3, so it doesn't run the pipeline again
+    doc_bin = DocBin(store_user_data=False)
+    doc_bin.add(doc)
+    doc_bins.append(doc_bin.to_bytes())
+
     for log in new_logs:
         cumulative_log.append({
             'filepath': filepath,
@@ -125,6 +170,7 @@ for content, filepath in zip(input_df['Markdown'], input_df['Filepath']):
 
 output_df = input_df.copy()
 output_df['Output'] = tier2_out
+output_df['SpacyDoc'] = doc_bins
 
 cumulative_log = pd.DataFrame(cumulative_log)
 
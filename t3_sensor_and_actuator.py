@@ -1,12 +1,17 @@
 import knime.scripting.io as knio
 import pandas as pd
 import spacy
+from spacy.tokens import DocBin
 import re
 import sqlite3
 import unicodedata
+import bisect
 import hashlib
 from datetime import datetime
 import os
+import json
+import base64
+import urllib.request
 from dotenv import load_dotenv
 from collections import defaultdict
 
@@ -14,12 +19,46 @@ load_dotenv('./')
 db_path = os.getenv('DB_PATH', "../complyable_app/data/vault/complyable_vault.db")
 
 # --- CONFIG ---
-nlp = spacy.load("de_core_news_lg")
+# Resident model service (ui/nlp_service.py). When set, this node never loads the model.
+nlp_service_url = os.getenv('NLP_SERVICE_URL')
+nlp = spacy.blank("de") if nlp_service_url else spacy.load("de_core_news_lg")
 
 def make_pii_hash(text):
     clean_text = unicodedata.normalize('NFC', str(text)).strip()
     return hashlib.sha256(clean_text.encode('utf-8')).hexdigest()
 
+def load_shared_doc(row, text):
+    # Reuse the Tier 2 parse when it was passed along for this exact text
+    doc_bytes = row.get('SpacyDoc')
+    if isinstance(doc_bytes, (bytes, bytearray)):
+        docs = list(DocBin().from_bytes(doc_bytes).get_docs(nlp.vocab))
+        if docs and docs[0].text == text:
+            return docs[0]
+    if nlp_service_url:
+        return fetch_parse(text)
+    return nlp(text)
+
+def fetch_parse(text):
+    body = json.dumps({"texts": [text], "beam": False}).encode('utf-8')
+    req = urllib.request.Request(f"{nlp_service_url.rstrip('/')}/parse", data=body,
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        payload = json.loads(resp.read())
+    return list(DocBin().from_bytes(base64.b64decode(payload['docbin'])).get_docs(nlp.vocab))[0]
+
+def resolve_spans(spans):
+    # Lower priority wins, then leftmost, then longest; overlapping spans are dropped
+    starts, taken = [], []
+    for span in sorted(spans, key=lambda s: (s[3], s[0], s[0] - s[1])):
+        idx = bisect.bisect_right(starts, span[0])
+        if idx and taken[idx - 1][1] > span[0]:
+            continue
+        if idx < len(taken) and taken[idx][0] < span[1]:
+            continue
+        starts.insert(idx, span[0])
+        taken.insert(idx, span)
+    return taken
+
 def is_person_related(token):
     text = token.text.lower()
     blacklist = {"september", "oktober", "november", "dezember"}
@@ -52,61 +91,53 @@ for index, row in input_df.iterrows():
 
     handle_indices = set()
     
-    # 1. Patterns (v1 logic)
+    # 1. Patterns (v1 logic) and 2. Dictionary — collected as spans on the
+    # original text, resolved once, and the text is rebuilt in a single pass
     kauf_patterns = [
         (r"\b(\w+)(kaufmann|kauffrau)\b", r"\1fachkraft", "GEN-RE"),
         (r"\b(Kaufmann|Kauffrau)\s+für\b", "Fachkraft für", "GEN-RE"),
         (r"\b(Kaufmann|Kauffrau)\s\b", "Fachkraft ", "GEN-RE")
     ]
+    candidates = []
     for pattern, replacement, label in kauf_patterns:
         for match in re.finditer(pattern, current, flags=re.IGNORECASE):
-            match_text = match.group()
-            text_hash = make_pii_hash(match_text)
-
-            occ_counter[match_text] += 1
-
-            cumulative_log.append({
-                'filepath': filepath,
-                'pii_text': match_text,
-                'pii_hash': text_hash,
-                'label': label,
-                'occurrence_index': occ_counter[match_text],
-                'confidence_score': 1.0,
-                'event_code': 'T3-GIP', # Gender-Identifying-Phrase Neutralized Regex
-                'status': 'REDACT',
-                'is_manual': 0
-            })
-        current = re.sub(pattern, replacement, current, flags=re.IGNORECASE)
-
-    # 2. Dictionary (Your v1 logic)
-    for _, d_row in job_table.iterrows():
-        original = str(d_row['original'])
-        target = rf'\b{re.escape(str(original))}\b'
+            candidates.append((match.start(), match.end(), match.expand(replacement), 0))
 
+    for _, d_row in job_table.iterrows():
+        target = rf'\b{re.escape(str(d_row["original"]))}\b'
         for match in re.finditer(target, current, flags=re.IGNORECASE):
-            actual_text = match.group()
-            text_hash = make_pii_hash(actual_text)
-            occ_counter[actual_text] += 1
-            
-            cumulative_log.append({
-                'filepath': filepath,
-                'pii_text': actual_text,
-                'pii_hash': text_hash,
-                'label': "GEN-RE",
-                'occurrence_index': occ_counter[actual_text],
-                'confidence_score': 0.9,
-                'event_code': 'T3-GIP', # Gender-Identifying-Phrase Neutralized Dictionary
-                'status': 'REDACT',
-                'is_manual': 0
-            })
-
-            for i in range(match.start(), match.end()):
-                handle_indices.add(i)
-            current = re.sub(target, d_row["neutral"], current, flags=re.IGNORECASE)
+            candidates.append((match.start(), match.end(), str(d_row['neutral']), 1))
+
+    redacted = []
+    last_end = 0
+    for start, end, replacement, priority in resolve_spans(candidates):
+        match_text = current[start:end]
+        text_hash = make_pii_hash(match_text)
+        occ_counter[match_text] += 1
+
+        cumulative_log.append({
+            'filepath': filepath,
+            'pii_text': match_text,
+            'pii_hash': text_hash,
+            'label': "GEN-RE",
+            'occurrence_index': occ_counter[match_text],
+            'confidence_score': 1.0 if priority == 0 else 0.9,
+            'event_code': 'T3-GIP', # Gender-Identifying-Phrase Neutralized (Regex / Dictionary)
+            'status': 'REDACT',
+            'is_manual': 0
+        })
+
+        if priority == 1:
+            handle_indices.update(range(start, end))
+        redacted.append(current[last_end:start])
+        redacted.append(replacement)
+        last_end = end
+    redacted.append(current[last_end:])
+    current = "".join(redacted)
 
     # 3. Sensor (Linguistic Flagging for what wasn't caught above)
     original_markdown = str(row['Markdown'])
-    doc = nlp(original_markdown)
+    doc = load_shared_doc(row, original_markdown)
     for token in doc:
 
         if token.idx in handle_indices:
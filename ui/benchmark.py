@@ -0,0 +1,223 @@
+"""
+benchmark.py — Throughput benchmark for the pipeline stages.
+Generates a synthetic CV corpus (see cv_generator.py), runs it through
+parse_documents, run_tier1, run_tier2, run_tier3 and write_to_db against a
+throwaway vault, and reports docs/sec and peak RSS per stage. Results are
+saved to data/benchmarks/ and compared with the last run of the same
+configuration, so regressions show up across versions.
+
+    python benchmark.py --docs 50 --size medium --formats txt,pdf
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import psutil
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BASE_DIR / "data" / "benchmarks"
+
+# ─────────────────────────────────────────────
+# MEASUREMENT
+# ─────────────────────────────────────────────
+
+def _rss_bytes(proc):
+    # Includes Docling pool workers and nlp.pipe processes
+    total = proc.memory_info().rss
+    for child in proc.children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+@contextmanager
+def track_peak_rss(interval=0.02):
+    """Samples RSS in a background thread; the yielded dict gets 'peak_mb' on exit."""
+    proc = psutil.Process()
+    result = {}
+    stop = threading.Event()
+
+    def sample():
+        peak = _rss_bytes(proc)
+        while not stop.wait(interval):
+            peak = max(peak, _rss_bytes(proc))
+        result['peak_mb'] = round(max(peak, _rss_bytes(proc)) / 2**20, 1)
+
+    thread = threading.Thread(target=sample, daemon=True)
+    thread.start()
+    try:
+        yield result
+    finally:
+        stop.set()
+        thread.join()
+
+def run_stage(results, stage, doc_count, fn, *args):
+    with track_peak_rss() as rss:
+        start = time.perf_counter()
+        out = fn(*args)
+        wall = time.perf_counter() - start
+    results.append({
+        'stage': stage,
+        'docs': doc_count,
+        'wall_s': round(wall, 3),
+        'docs_per_sec': round(doc_count / wall, 2) if wall > 0 else None,
+        'peak_rss_mb': rss['peak_mb'],
+    })
+    print(f"[Bench] {stage:<12} {results[-1]['docs_per_sec'] or 0:>9.2f} docs/s "
+          f"{wall:>8.2f}s  peak RSS {rss['peak_mb']} MB")
+    return out
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+# ─────────────────────────────────────────────
+# RESULTS
+# ─────────────────────────────────────────────
+
+def save_results(results):
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    path.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"[Bench] Results saved to {path}")
+    return path
+
+def find_previous(config, exclude=None):
+    """Latest saved run with the same configuration, or None."""
+    if not RESULTS_DIR.exists():
+        return None
+    for path in sorted(RESULTS_DIR.glob("bench_*.json"), reverse=True):
+        if path == exclude:
+            continue
+        try:
+            previous = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            continue
+        if previous.get('config') == config:
+            return previous
+    return None
+
+def print_comparison(current, previous):
+    before = {s['stage']: s for s in previous['stages']}
+    print(f"[Bench] Compared with {previous['git_commit']} ({previous['timestamp']}):")
+    for stage in current['stages']:
+        old = before.get(stage['stage'])
+        if not old or not old['docs_per_sec'] or not stage['docs_per_sec']:
+            continue
+        change = (stage['docs_per_sec'] / old['docs_per_sec'] - 1) * 100
+        print(f"[Bench]   {stage['stage']:<12} {old['docs_per_sec']:>9.2f} -> "
+              f"{stage['docs_per_sec']:>9.2f} docs/s ({change:+.1f}%)")
+
+# ─────────────────────────────────────────────
+# ENTRY POINT
+# ─────────────────────────────────────────────
+
+def run_benchmark(docs=20, size="medium", formats=("txt",), seed=42, workers=None,
+                  use_cache=False, keep=False):
+    workspace = Path(tempfile.mkdtemp(prefix="complyable_bench_"))
+    input_dir = workspace / "input"
+
+    # The pipeline modules read these at import time — set them first,
+    # so the benchmark never touches the real vault or parse cache
+    os.environ['DB_PATH'] = str(workspace / "bench_vault.db")
+    os.environ['PARSE_CACHE_PATH'] = str(workspace / "parse_cache.db")
+    if not use_cache:
+        os.environ['PARSE_CACHE_MAX_MB'] = '0'
+    import cv_generator
+    import database
+    import metrics
+    import pipeline
+
+    pipeline.DB_PATH = database.DB_PATH
+    database.init_db_schema()
+
+    config = {'docs': docs, 'size': size, 'formats': list(formats), 'seed': seed,
+              'workers': workers or pipeline.PARSE_WORKERS, 'cache': use_cache,
+              'nlp_batch_size': pipeline.NLP_BATCH_SIZE, 'nlp_processes': pipeline.NLP_PROCESSES,
+              'confidence': pipeline.nlp_service.describe_mode(pipeline.NLP_CONFIDENCE_MODE)}
+    try:
+        files = cv_generator.write_corpus(input_dir, docs, size=size, formats=formats, seed=seed)
+        stages = []
+        metrics.start_run()
+        total_start = time.perf_counter()
+
+        # Same sequence as run_pipeline's batch mode
+        parsed = run_stage(stages, "parse", len(files), pipeline.parse_documents, input_dir, workers)
+        if use_cache:
+            # Second pass over the same files is served from the parse cache
+            parsed = run_stage(stages, "parse_warm", len(files), pipeline.parse_documents, input_dir, workers)
+        for doc in parsed:
+            pipeline.normalize_document(doc)
+        log = [doc.pop('t0_entry') for doc in parsed]
+        parsed, log = run_stage(stages, "tier1", len(parsed), pipeline.run_tier1, parsed, log)
+        parsed, log = run_stage(stages, "tier2", len(parsed), pipeline.run_tier2, parsed, log)
+        parsed, log = run_stage(stages, "tier3", len(parsed), pipeline.run_tier3, parsed, log)
+        run_stage(stages, "db_write", len(parsed), pipeline.write_to_db, parsed, log)
+
+        total = time.perf_counter() - total_start
+        stages.append({
+            'stage': 'total',
+            'docs': len(parsed),
+            'wall_s': round(total, 3),
+            'docs_per_sec': round(len(parsed) / total, 2) if total > 0 else None,
+            'peak_rss_mb': max(s['peak_rss_mb'] for s in stages),
+        })
+        metrics.finish_run(pipeline.DB_PATH)
+
+        results = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'converter_version': pipeline.CONVERTER_VERSION,
+            'config': config,
+            'chars': sum(len(doc['markdown']) for doc in parsed),
+            'findings': len(log),
+            'confidence_cache': pipeline.nlp_service.cache_stats(),
+            'stages': stages,
+            # Finer per-stage breakdown from pipeline_metrics
+            'stage_metrics': database.get_stage_metrics().to_dict('records'),
+        }
+        path = save_results(results)
+        previous = find_previous(config, exclude=path)
+        if previous:
+            print_comparison(results, previous)
+        return results
+    finally:
+        if keep:
+            print(f"[Bench] Workspace kept at {workspace}")
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Complyable pipeline on synthetic CVs.")
+    parser.add_argument("--docs", type=int, default=20, help="number of CVs per format")
+    parser.add_argument("--size", default="medium",
+                        help="small, medium, large or a character count")
+    parser.add_argument("--formats", default="txt", help="comma-separated: txt,pdf")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="Docling worker processes")
+    parser.add_argument("--cache", action="store_true", help="enable the parse cache and time a warm pass")
+    parser.add_argument("--keep", action="store_true", help="keep the generated corpus and vault")
+    args = parser.parse_args()
+
+    run_benchmark(
+        docs=args.docs, size=args.size,
+        formats=tuple(f.strip() for f in args.formats.split(",") if f.strip()),
+        seed=args.seed, workers=args.workers, use_cache=args.cache, keep=args.keep
+    )
+
+if __name__ == "__main__":
+    main()
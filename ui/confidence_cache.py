@@ -0,0 +1,158 @@
+"""
+confidence_cache.py — Cross-document cache of Tier 2 beam scores per entity.
+Company names, cities and common surnames recur across thousands of CVs.
+Every beam score is recorded under (pii_hash, label, model version); once an
+entity was seen CONFIDENCE_CACHE_MIN_SEEN times with scores no further apart
+than CONFIDENCE_CACHE_MAX_SPREAD it counts as stable, and its last score is
+reused instead of running the beam search again. Bounded in memory with
+least-recently-used eviction, optionally persisted to CONFIDENCE_CACHE_PATH.
+"""
+
+import os
+import sqlite3
+import hashlib
+import time
+import unicodedata
+from collections import OrderedDict
+
+# SQLite file for the on-disk cache. Unset keeps the cache in memory only.
+CACHE_PATH = os.getenv('CONFIDENCE_CACHE_PATH')
+# Entries kept in memory (and on disk). 0 disables the cache.
+MAX_ENTRIES = int(os.getenv('CONFIDENCE_CACHE_SIZE', '100000'))
+MIN_SEEN = int(os.getenv('CONFIDENCE_CACHE_MIN_SEEN', '5'))
+MAX_SPREAD = float(os.getenv('CONFIDENCE_CACHE_MAX_SPREAD', '0.05'))
+
+# (pii_hash, label, model_version) -> [seen, last_score, min_score, max_score]
+_entries = OrderedDict()
+_dirty = set()
+_loaded_versions = set()
+_stats = {'hits': 0, 'misses': 0, 'docs': 0, 'docs_skipped': 0, 'sentences': 0, 'sentences_skipped': 0}
+
+def is_enabled():
+    return MAX_ENTRIES > 0
+
+def entity_hash(text):
+    # Same as pipeline.make_pii_hash, so cache keys match pending_pii.pii_hash
+    clean_text = unicodedata.normalize('NFC', str(text)).strip()
+    return hashlib.sha256(clean_text.encode('utf-8')).hexdigest()
+
+# ─────────────────────────────────────────────
+# DISK
+# ─────────────────────────────────────────────
+
+def _connect():
+    os.makedirs(os.path.dirname(os.path.abspath(CACHE_PATH)), exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS entity_confidence (
+            pii_hash TEXT,
+            label TEXT,
+            model_version TEXT,
+            seen INTEGER,
+            last_score REAL,
+            min_score REAL,
+            max_score REAL,
+            last_used REAL,
+            PRIMARY KEY (pii_hash, label, model_version)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entity_confidence_last_used ON entity_confidence (last_used)")
+    return conn
+
+def _load(model_version):
+    """Pulls the most recently used disk entries of a model version into memory, once."""
+    if model_version in _loaded_versions:
+        return
+    _loaded_versions.add(model_version)
+    if not CACHE_PATH:
+        return
+    with _connect() as conn:
+        rows = conn.execute("""
+            SELECT pii_hash, label, seen, last_score, min_score, max_score
+            FROM entity_confidence WHERE model_version = ?
+            ORDER BY last_used DESC LIMIT ?
+        """, (model_version, MAX_ENTRIES)).fetchall()
+    for pii_hash, label, *entry in reversed(rows):
+        _entries.setdefault((pii_hash, label, model_version), list(entry))
+    _trim()
+    if rows:
+        print(f"[NLP] Loaded {len(rows)} cached entity confidences for {model_version}.")
+
+def save():
+    """Writes entries changed since the last save to disk. Returns the row count."""
+    if not CACHE_PATH or not _dirty:
+        return 0
+    now = time.time()
+    rows = [(*key, *_entries[key], now) for key in _dirty if key in _entries]
+    _dirty.clear()
+    with _connect() as conn:
+        conn.executemany("""
+            INSERT OR REPLACE INTO entity_confidence
+                (pii_hash, label, model_version, seen, last_score, min_score, max_score, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        # Same bound on disk as in memory
+        conn.execute("""
+            DELETE FROM entity_confidence WHERE rowid NOT IN (
+                SELECT rowid FROM entity_confidence ORDER BY last_used DESC LIMIT ?
+            )
+        """, (MAX_ENTRIES,))
+        conn.commit()
+    return len(rows)
+
+# ─────────────────────────────────────────────
+# LOOKUP
+# ─────────────────────────────────────────────
+
+def _trim():
+    while len(_entries) > MAX_ENTRIES:
+        key, _ = _entries.popitem(last=False)
+        _dirty.discard(key)
+
+def lookup(text, label, model_version):
+    """Last score of a stable entity, otherwise None. Counts hits and misses."""
+    if not is_enabled():
+        return None
+    _load(model_version)
+    key = (entity_hash(text), label, model_version)
+    entry = _entries.get(key)
+    if entry and entry[0] >= MIN_SEEN and entry[3] - entry[2] <= MAX_SPREAD:
+        _entries.move_to_end(key)
+        _stats['hits'] += 1
+        return entry[1]
+    _stats['misses'] += 1
+    return None
+
+def update(text, label, model_version, score):
+    """Records a freshly computed beam score."""
+    if not is_enabled():
+        return
+    key = (entity_hash(text), label, model_version)
+    entry = _entries.get(key)
+    if entry is None:
+        _entries[key] = [1, score, score, score]
+    else:
+        entry[0] += 1
+        entry[1] = score
+        entry[2] = min(entry[2], score)
+        entry[3] = max(entry[3], score)
+        _entries.move_to_end(key)
+    _dirty.add(key)
+    _trim()
+
+def count_skipped(docs, docs_skipped, sentences, sentences_skipped):
+    """Records how many documents and entity sentences went without a beam search."""
+    _stats['docs'] += docs
+    _stats['docs_skipped'] += docs_skipped
+    _stats['sentences'] += sentences
+    _stats['sentences_skipped'] += sentences_skipped
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else 0.0
+
+def stats():
+    """Hits, misses, hit rate and beam-search skip rates since the process started."""
+    return dict(_stats, entries=len(_entries),
+                hit_rate=_rate(_stats['hits'], _stats['hits'] + _stats['misses']),
+                doc_skip_rate=_rate(_stats['docs_skipped'], _stats['docs']),
+                sentence_skip_rate=_rate(_stats['sentences_skipped'], _stats['sentences']))
@@ -0,0 +1,150 @@
+"""
+cv_generator.py — Synthetic German CVs for benchmarking.
+Every CV is built from fake names, addresses, phone numbers, IBAN-like
+numbers, dates and gendered job titles from dict_seed.csv, padded with
+filler sections up to a target size. Output is deterministic per seed and
+written as .txt and/or .pdf. Nothing here touches real data.
+"""
+
+import csv
+import random
+from pathlib import Path
+from fpdf import FPDF
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CSV_PATH = BASE_DIR / "data" / "refs" / "dict_seed.csv"
+
+# Approximate characters per CV
+SIZES = {"small": 1500, "medium": 5000, "large": 20000}
+
+FIRST_NAMES = ["Anna", "Lukas", "Sophie", "Jonas", "Marie", "Felix", "Lea", "Maximilian",
+               "Hannah", "Paul", "Lena", "Elias", "Mia", "Leon", "Emilia", "Tobias",
+               "Katharina", "Jürgen", "Sabine", "Özlem", "Mehmet", "Agnieszka", "Björn"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner",
+              "Becker", "Schulz", "Hoffmann", "Schäfer", "Koch", "Bauer", "Richter",
+              "Klein", "Wolf", "Schröder", "Neumann", "Yildiz", "Kowalski", "Krüger"]
+STREETS = ["Hauptstraße", "Bahnhofstr.", "Lindenweg", "Schillerplatz", "Goethestraße",
+           "Kastanienallee", "Mühlengasse", "Am Deich", "Rheindamm", "Gartenweg"]
+CITIES = [("10115", "Berlin"), ("20095", "Hamburg"), ("80331", "München"),
+          ("50667", "Köln"), ("60311", "Frankfurt am Main"), ("70173", "Stuttgart"),
+          ("04109", "Leipzig"), ("01067", "Dresden"), ("28195", "Bremen"), ("90402", "Nürnberg")]
+COMPANIES = ["Nordlicht GmbH", "Rheinwerk AG", "Alpenblick Logistik GmbH", "Stadtwerke Süd",
+             "Hansa Consulting", "Kita Sonnenschein e.V.", "Klinikum Mitte", "Weber & Söhne KG"]
+MONTHS = ["Januar", "Februar", "März", "April", "Mai", "Juni", "Juli", "August",
+          "September", "Oktober", "November", "Dezember"]
+FILLER = [
+    "Verantwortlich für die Planung und Umsetzung von Projekten im Team.",
+    "Enge Zusammenarbeit mit internen und externen Ansprechpartnern.",
+    "Erstellung von Berichten, Auswertungen und Präsentationen für die Geschäftsleitung.",
+    "Einarbeitung neuer Kolleginnen und Kollegen sowie Pflege der Dokumentation.",
+    "Kundenberatung, Angebotserstellung und Nachverfolgung offener Vorgänge.",
+    "Mitarbeit an der Einführung eines neuen Warenwirtschaftssystems.",
+]
+SKILLS = ["MS Office", "SAP", "Python", "Projektmanagement", "Englisch (C1)",
+          "Französisch (B1)", "Führerschein Klasse B", "Erste-Hilfe-Kurs", "DATEV"]
+
+def load_job_titles(csv_path=CSV_PATH):
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        return [row['original'] for row in csv.DictReader(f) if row.get('original')]
+
+def _date(rng):
+    day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.randint(1965, 2024)
+    return rng.choice([
+        f"{day:02d}.{month:02d}.{year}",
+        f"{day}. {MONTHS[month - 1]} {year}",
+        f"{MONTHS[month - 1]} {year}",
+    ])
+
+def _phone(rng):
+    return rng.choice([
+        f"+49 {rng.randint(151, 179)} {rng.randint(1000000, 9999999)}",
+        f"0{rng.randint(30, 89)} {rng.randint(100000, 999999)}",
+        f"0{rng.randint(151, 179)}/{rng.randint(1000000, 9999999)}",
+    ])
+
+def _iban(rng):
+    # DE + two check digits + 18 digits, grouped like on a bank statement
+    digits = "".join(str(rng.randint(0, 9)) for _ in range(20))
+    iban = "DE" + digits
+    return " ".join(iban[i:i + 4] for i in range(0, len(iban), 4))
+
+def _address(rng):
+    plz, city = rng.choice(CITIES)
+    return f"{rng.choice(STREETS)} {rng.randint(1, 180)}", f"{plz} {city}", city
+
+def _station(rng, job_titles):
+    start_year = rng.randint(1995, 2020)
+    lines = [
+        f"{rng.randint(1, 12):02d}/{start_year} - {rng.randint(1, 12):02d}/{start_year + rng.randint(1, 4)}",
+        f"{rng.choice(job_titles)} bei {rng.choice(COMPANIES)}, {rng.choice(CITIES)[1]}",
+    ]
+    lines += [f"- {rng.choice(FILLER)}" for _ in range(rng.randint(2, 4))]
+    if rng.random() < 0.3:
+        lines.append(f"- Ansprechpartner: {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}, Tel. {_phone(rng)}")
+    return "\n".join(lines)
+
+def generate_cv(rng, job_titles, target_chars=SIZES["medium"]):
+    """Returns one CV as plain text of roughly target_chars characters."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    street, city_line, city = _address(rng)
+    header = [
+        "LEBENSLAUF",
+        "",
+        "Persönliche Daten",
+        f"Name: {first} {last}",
+        f"Anschrift: {street}, {city_line}",
+        f"Telefon: {_phone(rng)}",
+        f"E-Mail: {first.lower()}.{last.lower()}@example.de",
+        f"Geburtsdatum: {_date(rng)} in {rng.choice(CITIES)[1]}",
+        f"Bankverbindung: {_iban(rng)}",
+        "",
+        "Berufserfahrung",
+    ]
+    text = "\n".join(header)
+
+    sections = []
+    length = len(text)
+    while length < target_chars:
+        sections.append(_station(rng, job_titles))
+        length += len(sections[-1]) + 2
+    footer = [
+        "",
+        "Kenntnisse",
+        ", ".join(rng.sample(SKILLS, 4)),
+        "",
+        f"{city}, {_date(rng)}",
+        f"{first} {last}",
+    ]
+    return text + "\n" + "\n\n".join(sections) + "\n" + "\n".join(footer)
+
+def write_pdf(text, path):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    # Core font, so characters outside Latin-1 are replaced
+    pdf.set_font("Helvetica", size=10)
+    safe = text.encode('latin-1', errors='replace').decode('latin-1')
+    for line in safe.split("\n"):
+        pdf.multi_cell(0, 5, line or " ", new_x="LMARGIN", new_y="NEXT")
+    pdf.output(str(path))
+
+def write_corpus(out_dir, count, size="medium", formats=("txt",), seed=42):
+    """Writes count CVs per format into out_dir. Returns the file paths."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    target_chars = SIZES.get(size) or int(size)
+    job_titles = load_job_titles()
+    rng = random.Random(seed)
+
+    paths = []
+    for idx in range(count):
+        text = generate_cv(rng, job_titles, target_chars)
+        for fmt in formats:
+            path = out_dir / f"cv_{idx:04d}.{fmt}"
+            if fmt == "pdf":
+                write_pdf(text, path)
+            else:
+                path.write_text(text, encoding='utf-8')
+            paths.append(path)
+    print(f"[Bench] Generated {len(paths)} synthetic CVs ({size}) in {out_dir}")
+    return paths
@@ -0,0 +1,137 @@
+"""
+direct_readers.py — Fast paths that bypass Docling.
+Plain text needs no layout analysis and a DOCX body is already structured,
+so both are read directly into markdown; PDFs whose reading order can be
+reconstructed with confidence are read from their text layer (see
+layout_router.py). Anything these readers cannot handle faithfully (text
+boxes, nested tables, ambiguous layouts, scanned PDFs, legacy .doc) returns
+None and goes through Docling as before.
+"""
+
+import codecs
+import re
+from pathlib import Path
+from docx import Document
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+import layout_router
+
+DIRECT_SUFFIXES = {".txt", ".docx"} | ({".pdf"} if layout_router.is_enabled() else set())
+
+# ─────────────────────────────────────────────
+# PLAIN TEXT
+# ─────────────────────────────────────────────
+
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+def detect_encoding(raw):
+    """Best guess for CV text files: BOM, then UTF-8, then Windows-1252, then Latin-1."""
+    for bom, encoding in _BOMS:
+        if raw.startswith(bom):
+            return encoding
+    sample = raw[:4096]
+    # UTF-16 without BOM: every other byte of ASCII text is zero
+    if sample and sample.count(b"\x00") > len(sample) // 4:
+        return "utf-16-le" if sample[1:2] == b"\x00" else "utf-16-be"
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            raw.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    # Latin-1 decodes every byte
+    return "latin-1"
+
+def read_text(filepath):
+    raw = Path(filepath).read_bytes()
+    text = raw.decode(detect_encoding(raw))
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+# ─────────────────────────────────────────────
+# DOCX
+# ─────────────────────────────────────────────
+
+def is_simple_docx(document):
+    """
+    True when all text sits in body paragraphs and flat tables, also inside
+    block-level content controls (w:sdt). Content controls within a
+    paragraph or table are not read by python-docx.
+    """
+    body = document.element.body
+    return not (body.xpath(".//w:txbxContent") or body.xpath(".//w:tbl//w:tbl")
+                or body.xpath(".//w:p//w:sdt") or body.xpath(".//w:tbl//w:sdt"))
+
+def _paragraph_markdown(paragraph):
+    text = paragraph.text.strip()
+    if not text:
+        return None
+    style = paragraph.style.name if paragraph.style is not None else ""
+    if style == "Title":
+        return f"# {text}"
+    heading = re.match(r"Heading (\d)", style or "")
+    if heading:
+        return f"{'#' * (int(heading.group(1)) + 1)} {text}"
+    p_pr = paragraph._p.pPr
+    if (p_pr is not None and p_pr.numPr is not None) or (style or "").startswith("List"):
+        return f"- {text}"
+    return text
+
+def _cell_text(cell):
+    return " ".join(cell.text.split()).replace("|", "\\|")
+
+def _table_markdown(table):
+    rows = [[_cell_text(cell) for cell in row.cells] for row in table.rows]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return None
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = ["| " + " | ".join(rows[0]) + " |", "|" + "---|" * width]
+    lines += ["| " + " | ".join(row) + " |" for row in rows[1:]]
+    return "\n".join(lines)
+
+def _block_markdown(container, document):
+    """Markdown of the paragraphs and tables in container, descending into content controls."""
+    for child in container.iterchildren():
+        if child.tag == qn("w:p"):
+            yield _paragraph_markdown(Paragraph(child, document))
+        elif child.tag == qn("w:tbl"):
+            yield _table_markdown(Table(child, document))
+        elif child.tag == qn("w:sdt"):
+            content = child.find(qn("w:sdtContent"))
+            if content is not None:
+                yield from _block_markdown(content, document)
+
+def read_docx(filepath):
+    """Body paragraphs and tables in document order, or None when the file needs Docling."""
+    document = Document(str(filepath))
+    if not is_simple_docx(document):
+        return None
+    blocks = _block_markdown(document.element.body, document)
+    return "\n\n".join(block for block in blocks if block)
+
+# ─────────────────────────────────────────────
+# ENTRY POINT
+# ─────────────────────────────────────────────
+
+def read(filepath):
+    """Returns (markdown, page_count, reader) for files with a fast path, otherwise None."""
+    suffix = Path(filepath).suffix.lower()
+    if suffix == ".txt":
+        return read_text(filepath), 1, "text"
+    if suffix == ".docx":
+        markdown = read_docx(filepath)
+        # A DOCX has no fixed pages
+        return (markdown, 0, "docx") if markdown is not None else None
+    if suffix == ".pdf" and layout_router.is_enabled():
+        result = layout_router.read_simple_pdf(filepath)
+        if result is None:
+            return None
+        text, page_count, score = result
+        return text, page_count, f"pdf-text:{score}"
+    return None
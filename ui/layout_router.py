@@ -0,0 +1,92 @@
+"""
+layout_router.py — Cheap layout-complexity scoring for PDFs.
+Reads only pdfium's text layer and page object list (no rendering, no
+layout model). Text-layer presence, image coverage and the confidence of
+the reading-order reconstruction (reading_order.py) give a score per page.
+PDFs with a text layer whose columns, headers and sections are cleanly
+separated are extracted straight from the text layer in reading order;
+everything else goes to Docling.
+"""
+
+import os
+import numpy as np
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+import reading_order
+
+# PDFs scoring below this take the text-layer fast path. 0 sends every PDF to Docling.
+FAST_THRESHOLD = float(os.getenv('LAYOUT_FAST_THRESHOLD', '0.3'))
+# Pages with fewer characters have no usable text layer (scans, pure graphics)
+MIN_TEXT_CHARS = 20
+IMAGE_WEIGHT = 0.5
+
+def is_enabled():
+    return FAST_THRESHOLD > 0
+
+# ─────────────────────────────────────────────
+# SCORING
+# ─────────────────────────────────────────────
+
+def text_runs(textpage, page_height):
+    """Boxes (x0, top, x1, bottom), y growing downwards, and texts of the page's text runs."""
+    boxes, texts = [], []
+    for i in range(textpage.count_rects()):
+        left, bottom, right, top = textpage.get_rect(i)
+        text = textpage.get_text_bounded(left, bottom, right, top).strip()
+        if text:
+            boxes.append((left, page_height - top, right, page_height - bottom))
+            texts.append(text)
+    return np.array(boxes, dtype=float).reshape(-1, 4), texts
+
+def image_coverage(page, width, height):
+    """Share of the page area covered by images."""
+    if width <= 0 or height <= 0:
+        return 0.0
+    area = 0.0
+    for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]):
+        left, bottom, right, top = obj.get_pos()
+        area += max(0.0, min(right, width) - max(left, 0.0)) * max(0.0, min(top, height) - max(bottom, 0.0))
+    return min(1.0, area / (width * height))
+
+def score_page(page, textpage):
+    """
+    Returns (score, text): score 0.0 (plain text in a clear reading order)
+    … 1.0 (needs full layout analysis), text the page in reading order.
+    """
+    width, height = page.get_size()
+    images = image_coverage(page, width, height)
+    if textpage.count_chars() < MIN_TEXT_CHARS:
+        # Blank pages are simple, image-only pages are scans
+        return (1.0 if images > 0.01 else 0.0), textpage.get_text_range()
+    boxes, texts = text_runs(textpage, height)
+    text, confidence = reading_order.reconstruct(boxes, texts, width)
+    return min(1.0, IMAGE_WEIGHT * images + (1.0 - confidence)), text
+
+# ─────────────────────────────────────────────
+# FAST PATH
+# ─────────────────────────────────────────────
+
+def read_simple_pdf(filepath):
+    """
+    Scores the PDF page by page and, if it stays below FAST_THRESHOLD,
+    returns (text, page_count, score) from the text layer. Returns None as
+    soon as one page is too complex, so complex files cost only a few pages.
+    """
+    pdf = pdfium.PdfDocument(str(filepath))
+    try:
+        pages, score = [], 0.0
+        for page in pdf:
+            textpage = page.get_textpage()
+            try:
+                page_score, page_text = score_page(page, textpage)
+                score = max(score, page_score)
+                if score >= FAST_THRESHOLD:
+                    return None
+                pages.append(page_text.strip())
+            finally:
+                textpage.close()
+                page.close()
+        text = "\n\n".join(pages)
+        return text.replace("\r\n", "\n").replace("\r", "\n"), len(pdf), round(score, 3)
+    finally:
+        pdf.close()
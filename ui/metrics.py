@@ -0,0 +1,106 @@
+"""
+metrics.py — Per-stage, per-document timing for the pipeline.
+Stages are wrapped in measure(); rows collect in memory while a run is
+active and are written to the pipeline_metrics table on flush(). Outside
+a run (e.g. inside a parse worker or the model service) nothing is kept.
+"""
+
+import os
+import sqlite3
+import db_pool
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# Runs kept in pipeline_metrics; older ones are pruned when a run finishes. 0 keeps all.
+KEEP_RUNS = int(os.getenv('METRICS_KEEP_RUNS', '100'))
+
+_run_id = None
+_pending = []
+
+def start_run():
+    global _run_id
+    _run_id = uuid.uuid4().hex[:12]
+    _pending.clear()
+    return _run_id
+
+def current_run():
+    return _run_id
+
+def record(row):
+    if _run_id is not None and row is not None:
+        _pending.append(dict(row, run_id=_run_id))
+
+@contextmanager
+def measure(stage, filepath=None, char_count=0, doc_count=1, finding_count=0, keep=True):
+    """
+    Times the wrapped block. The yielded row can be updated inside the block,
+    e.g. row['finding_count'] = n. Batch stages pass doc_count > 1.
+    With keep=False the caller records the row itself (see record()).
+    """
+    row = {
+        'stage': stage,
+        'filepath': str(filepath) if filepath is not None else None,
+        'doc_count': doc_count,
+        'char_count': char_count,
+        'finding_count': finding_count,
+    }
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield row
+    finally:
+        row['wall_ms'] = round((time.perf_counter() - wall_start) * 1000, 3)
+        row['cpu_ms'] = round((time.process_time() - cpu_start) * 1000, 3)
+        row['recorded_at'] = datetime.now().isoformat(timespec='seconds')
+        if keep:
+            record(row)
+
+def flush(db_path):
+    """Writes all pending rows to pipeline_metrics. Returns the row count."""
+    if not _pending:
+        return 0
+    rows = list(_pending)
+    _pending.clear()
+    with db_pool.connect(db_path) as conn:
+        conn.executemany("""
+            INSERT INTO pipeline_metrics
+                (run_id, recorded_at, stage, filepath, doc_count,
+                 char_count, finding_count, wall_ms, cpu_ms)
+            VALUES (:run_id, :recorded_at, :stage, :filepath, :doc_count,
+                    :char_count, :finding_count, :wall_ms, :cpu_ms)
+        """, rows)
+        conn.commit()
+    return len(rows)
+
+def prune(db_path, keep_runs=None):
+    """Deletes the timings of all but the keep_runs most recent runs. Returns the row count."""
+    keep_runs = KEEP_RUNS if keep_runs is None else keep_runs
+    if keep_runs <= 0:
+        return 0
+    with db_pool.connect(db_path) as conn:
+        # Rows older than the first row of the oldest run kept
+        cur = conn.execute("""
+            DELETE FROM pipeline_metrics WHERE metric_id < (
+                SELECT MIN(first_id) FROM (
+                    SELECT MIN(metric_id) AS first_id FROM pipeline_metrics
+                    GROUP BY run_id ORDER BY first_id DESC LIMIT ?
+                )
+            )
+        """, (keep_runs,))
+        conn.commit()
+        return cur.rowcount
+
+def finish_run(db_path):
+    global _run_id
+    try:
+        written = flush(db_path)
+        if written:
+            print(f"[Metrics] Run {_run_id}: {written} stage timings recorded.")
+            pruned = prune(db_path)
+            if pruned:
+                print(f"[Metrics] Pruned {pruned} timings of runs beyond the last {KEEP_RUNS}.")
+    except sqlite3.Error as e:
+        print(f"[Metrics] Could not write stage timings: {e}")
+    finally:
+        _run_id = None
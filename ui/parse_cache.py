@@ -0,0 +1,105 @@
+"""
+parse_cache.py — Content-addressed cache for Docling output.
+Keyed by the SHA-256 of the file bytes plus a version key derived from the
+converter options, so a re-upload (or the same CV under another name)
+skips Docling entirely. Size-bounded with least-recently-used eviction.
+"""
+
+import sqlite3
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_PATH = os.getenv('PARSE_CACHE_PATH', str(BASE_DIR / "data" / "vault" / "parse_cache.db"))
+# Upper bound for stored markdown in MB. 0 disables the cache.
+CACHE_MAX_MB = float(os.getenv('PARSE_CACHE_MAX_MB', '512'))
+
+def is_enabled():
+    return CACHE_MAX_MB > 0
+
+def _connect():
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS parse_cache (
+            content_hash TEXT,
+            version_key TEXT,
+            markdown TEXT,
+            page_count INTEGER,
+            page_ranges TEXT,
+            size_bytes INTEGER,
+            last_used REAL,
+            PRIMARY KEY (content_hash, version_key)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_parse_cache_last_used ON parse_cache (last_used)")
+    # Caches created before chunked PDF parsing lack the page_ranges column
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(parse_cache)")}
+    if "page_ranges" not in columns:
+        conn.execute("ALTER TABLE parse_cache ADD COLUMN page_ranges TEXT")
+    return conn
+
+def file_hash(filepath, chunk_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def get(content_hash, version_key):
+    """Returns (markdown, page_count, page_ranges) on a hit, otherwise None."""
+    if not is_enabled():
+        return None
+    with _connect() as conn:
+        row = conn.execute("""
+            SELECT markdown, page_count, page_ranges FROM parse_cache
+            WHERE content_hash = ? AND version_key = ?
+        """, (content_hash, version_key)).fetchone()
+        if row:
+            conn.execute("""
+                UPDATE parse_cache SET last_used = ?
+                WHERE content_hash = ? AND version_key = ?
+            """, (time.time(), content_hash, version_key))
+            conn.commit()
+            markdown, page_count, page_ranges = row
+            return markdown, page_count, json.loads(page_ranges) if page_ranges else None
+        return None
+
+def put(content_hash, version_key, markdown, page_count, page_ranges=None):
+    if not is_enabled():
+        return
+    size_bytes = len(markdown.encode('utf-8'))
+    with _connect() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO parse_cache
+                (content_hash, version_key, markdown, page_count, page_ranges, size_bytes, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (content_hash, version_key, markdown, page_count,
+              json.dumps(page_ranges) if page_ranges else None, size_bytes, time.time()))
+        evict(conn)
+        conn.commit()
+
+def evict(conn, max_bytes=None):
+    """Drops least-recently-used entries until the cache fits into max_bytes."""
+    max_bytes = int(CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+    total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM parse_cache").fetchone()[0]
+    if total <= max_bytes:
+        return 0
+
+    evicted = 0
+    rows = conn.execute("""
+        SELECT content_hash, version_key, size_bytes FROM parse_cache
+        ORDER BY last_used ASC
+    """).fetchall()
+    for content_hash, version_key, size_bytes in rows:
+        if total <= max_bytes:
+            break
+        conn.execute("DELETE FROM parse_cache WHERE content_hash = ? AND version_key = ?",
+                     (content_hash, version_key))
+        total -= size_bytes
+        evicted += 1
+    print(f"[Cache] Evicted {evicted} parse cache entries.")
+    return evicted
@@ -4,19 +4,20 @@ Drop-in replacement for the KNIME workflow.
 Call run_pipeline(input_dir) from workflow.py instead of trigger_knime().
 """
 
-import sqlite3
 import pandas as pd
 import re
 import hashlib
 import unicodedata
 import os
-import spacy
 from pathlib import Path
-from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
 from dotenv import load_dotenv
 import time
-import fcntl
+import json
+from importlib import metadata
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+import pypdfium2 as pdfium
 
 # --- Docling imports ---
 from docling.document_converter import DocumentConverter
@@ -26,20 +27,29 @@ from docling.document_converter import PdfFormatOption
 
 load_dotenv()
 
+# Local modules read their config from the environment
+import parse_cache
+import direct_readers
+import nlp_service
+import tier1_engine
+import dict_matcher
+import span_builder
+import metrics
+import db_pool
+import database
+import job_queue
+
 # --- CONFIG ---
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = str(BASE_DIR / "data" / "vault" / "complyable_vault.db")
 CSV_PATH = str(BASE_DIR / "data" / "refs" / "dict_seed.csv")
 
-# Load spaCy once at module level — expensive, only do it once
-print("[Pipeline] Loading spaCy model...")
-nlp = spacy.load("de_core_news_lg")
-ruler = nlp.add_pipe("entity_ruler", before="ner")
-ruler.add_patterns([
-    {"label": "ADRESSE_1", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz|allee|gasse|damm)$"}}]},
-    {"label": "ADRESSE_2", "pattern": [{"TEXT": {"REGEX": r"(?i).+(straße|str\.|weg|platz)$"}}, {"IS_DIGIT": True}]}
-])
-print("[Pipeline] spaCy model loaded.")
+# Redaction span priorities — on overlap the lower value wins,
+# so earlier tiers are never overwritten by later ones
+SPAN_PRIORITY_T1 = 10
+SPAN_PRIORITY_T2 = 20
+SPAN_PRIORITY_T3_PATTERN = 30
+SPAN_PRIORITY_T3_DICT = 31
 
 # ─────────────────────────────────────────────
 # SHARED UTILITIES
@@ -61,62 +71,300 @@ def to_titlecase(text):
 # STEP 1: DOCLING PARSER (was: Tika + chunk loop)
 # ─────────────────────────────────────────────
 
-def parse_documents(input_dir):
-    print(f"[Pipeline] Initializing converter...")
+SUPPORTED_SUFFIXES = {".pdf", ".docx", ".doc", ".txt"}
+# A file changed more recently than this may still be being written
+INPUT_STABLE_SECONDS = float(os.getenv('WATCH_STABLE_SECONDS', '2'))
+
+# Number of Docling worker processes. 1 keeps the old in-process behaviour.
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', '1'))
+
+# Options that change Docling's output. Part of the parse cache key.
+CONVERTER_OPTIONS = {
+    "do_ocr": False,
+    "do_table_structure": False,
+}
+
+# PDFs with more pages than PDF_CHUNK_THRESHOLD are converted PDF_CHUNK_PAGES
+# pages at a time, so no worker ever holds a whole portfolio. 0 disables chunking.
+PDF_CHUNK_THRESHOLD = int(os.getenv('PDF_CHUNK_THRESHOLD', '40'))
+PDF_CHUNK_PAGES = max(1, int(os.getenv('PDF_CHUNK_PAGES', '10')))
+PAGE_RANGE_SEPARATOR = "\n\n"
+
+def _converter_version_key():
+    try:
+        docling_version = metadata.version("docling")
+    except metadata.PackageNotFoundError:
+        docling_version = "unknown"
+    payload = json.dumps({
+        "docling": docling_version, **CONVERTER_OPTIONS,
+        "chunk_threshold": PDF_CHUNK_THRESHOLD, "chunk_pages": PDF_CHUNK_PAGES,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+CONVERTER_VERSION = _converter_version_key()
+
+# Each pool worker builds its own converter once and reuses it for every file
+_worker_converter = None
+
+def build_converter():
     pipeline_options = PdfPipelineOptions()
-    pipeline_options.do_ocr = False
-    pipeline_options.do_table_structure = False
+    pipeline_options.do_ocr = CONVERTER_OPTIONS["do_ocr"]
+    pipeline_options.do_table_structure = CONVERTER_OPTIONS["do_table_structure"]
     print(f"[Pipeline] Converter options set...")
 
-    converter = DocumentConverter(
+    return DocumentConverter(
         format_options={
             InputFormat.PDF: PdfFormatOption(
                 pipeline_options=pipeline_options
             )
         }
     )
-    print(f"[Pipeline] Converter initialized...")
-    input_path = Path(input_dir)
-    supported = {".pdf", ".docx", ".doc", ".txt"}
-    files = [f for f in input_path.iterdir() if f.suffix.lower() in supported]
 
-    if not files:
-        print(f"[Pipeline] No supported files found in {input_dir}")
-        return []
+def make_document(filepath, markdown_text, page_count, page_ranges=None, reader=None):
+    filepath = Path(filepath)
+    t0_entry = {
+        'filepath': str(filepath),
+        'pii_text': filepath.suffix.lower(),
+        'pii_hash': make_pii_hash(str(filepath)),
+        # Files that bypassed Docling name their reader, e.g. pages:2;pdf-text:0.05
+        'label': f"pages:{page_count}" + (f";{reader}" if reader else ""),
+        'occurrence_index': 1,
+        'confidence_score': 1.0,
+        'event_code': 'T0-ANL',
+        'status': 'SYSTEM',
+        'is_manual': 0
+    }
+
+    return {
+        "filepath": str(filepath),
+        "original": markdown_text,
+        "markdown": markdown_text,
+        "page_count": page_count,
+        # [first_page, last_page, start offset in markdown] per converted page range
+        "page_ranges": page_ranges,
+        "t0_entry": t0_entry
+    }
+
+def parse_file(converter, filepath):
+    """Converts a single file. Returns the doc dict or None on failure."""
+    filepath = Path(filepath)
+    try:
+        print(f"[Pipeline] Attempting to parse: {filepath.name}")
+        result = converter.convert(str(filepath))
+        print(f"[Pipeline] Parsed successfully: {filepath.name}")
+        markdown_text = result.document.export_to_markdown()
 
-    results = []
-    for filepath in files:
-        print(f"[Pipeline] Parsing: {filepath.name}")
-        try:
-            print(f"[Pipeline] Attempting to parse: {filepath.name}")
-            result = converter.convert(str(filepath))
-            print(f"[Pipeline] Parsed successfully: {filepath.name}")
-            markdown_text = result.document.export_to_markdown()
-
-            page_count = len(result.document.pages) \
-                        if hasattr(result.document, 'pages') else 0
-            
-            t0_entry = {
-                'filepath': str(filepath),
-                'pii_text': filepath.suffix.lower(),
-                'pii_hash': make_pii_hash(str(filepath)),
-                'label': f"pages:{page_count}",
-                'occurrence_index': 1,
-                'confidence_score': 1.0,
-                'event_code': 'T0-ANL',
-                'status': 'SYSTEM',
-                'is_manual': 0
-            }
+        page_count = len(result.document.pages) \
+                    if hasattr(result.document, 'pages') else 0
 
-            results.append({
-                "filepath": str(filepath),
-                "original": markdown_text,
-                "markdown": markdown_text,
-                "t0_entry": t0_entry
-            })
+        return make_document(filepath, markdown_text, page_count)
+    except Exception as e:
+        print(f"[Pipeline] ERROR parsing {filepath.name}: {e}")
+        return None
+
+def pdf_page_count(filepath):
+    # pdfium only reads the page tree, not the page contents
+    pdf = pdfium.PdfDocument(str(filepath))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+def plan_page_ranges(filepath):
+    """Page ranges (1-based, inclusive) to convert one by one, or [None] for the whole file."""
+    filepath = Path(filepath)
+    if PDF_CHUNK_THRESHOLD <= 0 or filepath.suffix.lower() != ".pdf":
+        return [None]
+    try:
+        page_count = pdf_page_count(filepath)
+    except Exception as e:
+        print(f"[Pipeline] Could not count pages of {filepath.name}: {e}")
+        return [None]
+    if page_count <= PDF_CHUNK_THRESHOLD:
+        return [None]
+    print(f"[Pipeline] {filepath.name}: {page_count} pages, converting {PDF_CHUNK_PAGES} at a time.")
+    return [(first, min(first + PDF_CHUNK_PAGES - 1, page_count))
+            for first in range(1, page_count + 1, PDF_CHUNK_PAGES)]
+
+def parse_page_range(converter, filepath, page_range):
+    """Converts one page range of a PDF. Returns its markdown or None on failure."""
+    filepath = Path(filepath)
+    first, last = page_range
+    try:
+        result = converter.convert(str(filepath), page_range=page_range)
+        print(f"[Pipeline] Parsed {filepath.name} pages {first}-{last}")
+        return result.document.export_to_markdown()
+    except Exception as e:
+        print(f"[Pipeline] ERROR parsing {filepath.name} pages {first}-{last}: {e}")
+        return None
+
+def stitch_page_ranges(filepath, page_ranges, chunks):
+    """Joins converted page ranges in page order, recording where each starts.
+    Returns None when one of the ranges failed."""
+    if any(chunk is None for chunk in chunks):
+        return None
+    boundaries, offset = [], 0
+    for (first, last), chunk in zip(page_ranges, chunks):
+        boundaries.append([first, last, offset])
+        offset += len(chunk) + len(PAGE_RANGE_SEPARATOR)
+    markdown_text = PAGE_RANGE_SEPARATOR.join(chunks)
+    return make_document(filepath, markdown_text, page_ranges[-1][1], boundaries)
+
+def convert_timed(converter, filepath, page_range=None):
+    """parse_file (or parse_page_range) plus its timing row; pool workers hand
+    the row back to the parent."""
+    stage = "parse" if page_range is None else "parse_range"
+    with metrics.measure(stage, filepath, keep=False) as row:
+        if page_range is None:
+            out = parse_file(converter, filepath)
+            text = out['markdown'] if out is not None else None
+        else:
+            out = text = parse_page_range(converter, filepath, page_range)
+        if text is not None:
+            row['char_count'] = len(text)
+    return out, row
+
+def _init_parse_worker():
+    global _worker_converter
+    print(f"[Pipeline] Worker {os.getpid()} initializing converter...")
+    _worker_converter = build_converter()
+
+def _parse_in_worker(task):
+    filepath, page_range = task
+    return convert_timed(_worker_converter, filepath, page_range)
+
+def list_input_files(input_dir):
+    input_path = Path(input_dir)
+    return sorted(f for f in input_path.iterdir() if f.suffix.lower() in SUPPORTED_SUFFIXES)
+
+def is_settled(filepath, now=None):
+    """Whether a file is non-empty and has not changed for INPUT_STABLE_SECONDS."""
+    now = time.time() if now is None else now
+    try:
+        stat = Path(filepath).stat()
+    except FileNotFoundError:
+        return False
+    return stat.st_size > 0 and now - stat.st_mtime >= INPUT_STABLE_SECONDS
+
+def _lookup_cached(filepath):
+    """Returns (content_hash, cached doc or None)."""
+    if not parse_cache.is_enabled():
+        return None, None
+    with metrics.measure("parse_cache", filepath) as row:
+        content_hash = parse_cache.file_hash(filepath)
+        hit = parse_cache.get(content_hash, CONVERTER_VERSION)
+        if hit is None:
+            return content_hash, None
+        print(f"[Pipeline] Cache hit: {filepath.name}")
+        markdown_text, page_count, page_ranges = hit
+        row['char_count'] = len(markdown_text)
+        return content_hash, make_document(filepath, markdown_text, page_count, page_ranges)
+
+def _read_direct(filepath):
+    """Fast path for plain text, simple DOCX and simple PDFs.
+    Returns (None, doc), or None when Docling is needed."""
+    if filepath.suffix.lower() not in direct_readers.DIRECT_SUFFIXES:
+        return None
+    with metrics.measure("parse_direct", filepath) as row:
+        try:
+            result = direct_readers.read(filepath)
         except Exception as e:
-            print(f"[Pipeline] ERROR parsing {filepath.name}: {e}")
+            print(f"[Pipeline] Direct read failed for {filepath.name}, using Docling: {e}")
+            return None
+        if result is None:
+            return None
+        markdown_text, page_count, reader = result
+        row['char_count'] = len(markdown_text)
+    print(f"[Pipeline] Read directly ({reader}): {filepath.name}")
+    return None, make_document(filepath, markdown_text, page_count, reader=reader)
+
+def _finish_conversion(filepath, content_hash, page_ranges, results):
+    """Document from the converted page ranges of one file; cached on success."""
+    for _, row in results:
+        metrics.record(row)
+    if page_ranges == [None]:
+        doc = results[0][0]
+    else:
+        doc = stitch_page_ranges(filepath, page_ranges, [chunk for chunk, _ in results])
+    if doc is not None and content_hash is not None:
+        parse_cache.put(content_hash, CONVERTER_VERSION, doc['markdown'],
+                        doc['page_count'], doc['page_ranges'])
+    return doc
+
+def iter_documents(input_dir, workers=None, files=None):
+    """Yields parsed documents one at a time, in input order.
+    files limits the run to those paths instead of everything in input_dir."""
+    workers = PARSE_WORKERS if workers is None else workers
+    files = list_input_files(input_dir) if files is None else [Path(f) for f in files]
 
+    if not files:
+        print(f"[Pipeline] No supported files found in {input_dir}")
+        return
+
+    # Files are resolved as the loop reaches them: plain text, simple DOCX,
+    # simple PDFs and cache hits go out at once, only the rest reach a
+    # converter. With a worker pool, conversions are submitted up to
+    # `workers` files ahead, so only that many documents wait in memory.
+    converter = None
+    pool = None
+    pending = deque()
+    counts = {'direct': 0, 'converted': 0}
+
+    def finish(entry):
+        filepath, content_hash, doc, page_ranges, futures = entry
+        if doc is None:
+            doc = convert(filepath, content_hash, page_ranges, futures)
+        if doc is not None:
+            doc['content_hash'] = content_hash
+        return doc
+
+    def convert(filepath, content_hash, page_ranges, futures):
+        nonlocal converter
+        if futures is not None:
+            results = [future.result() for future in futures]
+        else:
+            if converter is None:
+                print(f"[Pipeline] Initializing converter...")
+                converter = build_converter()
+                print(f"[Pipeline] Converter initialized...")
+            results = [convert_timed(converter, str(filepath), page_range) for page_range in page_ranges]
+        counts['converted'] += 1
+        return _finish_conversion(filepath, content_hash, page_ranges, results)
+
+    with ExitStack() as stack:
+        for filepath in files:
+            content_hash, doc = _read_direct(filepath) or _lookup_cached(filepath)
+            page_ranges = futures = None
+            if doc is None:
+                # One task per file, or per page range for large PDFs
+                page_ranges = plan_page_ranges(filepath)
+                if workers > 1:
+                    if pool is None:
+                        print(f"[Pipeline] Parsing with {workers} workers...")
+                        pool = stack.enter_context(
+                            ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker)
+                        )
+                    futures = [pool.submit(_parse_in_worker, (str(filepath), page_range))
+                               for page_range in page_ranges]
+            else:
+                counts['direct'] += 1
+            pending.append((filepath, content_hash, doc, page_ranges, futures))
+
+            # A conversion at the head is only waited for once the pool has enough queued work
+            while pending and (pending[0][2] is not None or pool is None or len(pending) > workers):
+                doc = finish(pending.popleft())
+                if doc is not None:
+                    yield doc
+
+        while pending:
+            doc = finish(pending.popleft())
+            if doc is not None:
+                yield doc
+
+    print(f"[Pipeline] {counts['direct']} read directly or cached, {counts['converted']} converted.")
+
+def parse_documents(input_dir, workers=None, files=None):
+    results = list(iter_documents(input_dir, workers, files))
     print(f"[Pipeline] Parsed {len(results)} documents.")
     return results
 
@@ -125,48 +373,56 @@ def parse_documents(input_dir):
 # STEP 2: TIER 1 — REGEX (was: Tier 1 node)
 # ─────────────────────────────────────────────
 
+# 'requires' is a cheap prefilter: the rule is skipped when the text lacks it
 TIER1_REGEX = [
-    {"label": "E-MAIL",       "pattern": r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"},
-    {"label": "TELEFON",      "pattern": r"(?:(?:\+?49[ \-\.\(\)]?)?(?:(?:\(?0\d{1,5}\)?)|(?:\d{1,5}))[ \-\.\(\)]?(?:\d[ \-\.\(\)]?){5,10}\d)"},
-    {"label": "WEB_LINK",     "pattern": r"\b(?<!mailto:)(?<!@)(?:https?:\/\/)?(?:www\.)?(?!\d)([a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}(?::\d+)?(?:\/[^\s<>\"'@]*|(?!\S))?\b(?![\w@./])"},
-    {"label": "SOCIAL_MEDIA", "pattern": r"@[A-Za-z0-9](?:[A-Za-z0-9._-]{1,28}[A-Za-z0-9])?"},
-    {"label": "PLZ",          "pattern": r"\b\d{5}\b"},
-    {"label": "DATUM",        "pattern": r"\b\d{1,2}\.\d{1,2}\.(\d{4}|\d{2})\b"},
-    {"label": "DATUM",        "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"},
-    {"label": "DATUM",        "pattern": r"(?i)\b\d{2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"},
-    {"label": "DATUM",        "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s'\d{2}\b"},
+    {"label": "E-MAIL",       "requires": "@",                 "pattern": r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"},
+    {"label": "TELEFON",      "requires": tier1_engine.DIGIT,  "pattern": r"(?:(?:\+?49[ \-\.\(\)]?)?(?:(?:\(?0\d{1,5}\)?)|(?:\d{1,5}))[ \-\.\(\)]?(?:\d[ \-\.\(\)]?){5,10}\d)"},
+    {"label": "WEB_LINK",     "requires": ".",                 "pattern": r"\b(?<!mailto:)(?<!@)(?:https?:\/\/)?(?:www\.)?(?!\d)([a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}(?::\d+)?(?:\/[^\s<>\"'@]*|(?!\S))?\b(?![\w@./])"},
+    {"label": "SOCIAL_MEDIA", "requires": "@",                 "pattern": r"@[A-Za-z0-9](?:[A-Za-z0-9._-]{1,28}[A-Za-z0-9])?"},
+    {"label": "PLZ",          "requires": tier1_engine.DIGIT,  "pattern": r"\b\d{5}\b"},
+    {"label": "DATUM",        "requires": tier1_engine.DIGIT,  "pattern": r"\b\d{1,2}\.\d{1,2}\.(\d{4}|\d{2})\b"},
+    {"label": "DATUM",        "requires": tier1_engine.DIGIT,  "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"},
+    {"label": "DATUM",        "requires": tier1_engine.DIGIT,  "pattern": r"(?i)\b\d{2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s\d{4}\b"},
+    {"label": "DATUM",        "requires": tier1_engine.DIGIT,  "pattern": r"(?i)\b\d{1,2}\.\s(?:Januar|Februar|März|April|Mai|Juni|Juli|August|September|Oktober|November|Dezember)\s'\d{2}\b"},
 ]
 
-def run_tier1(docs):
-    """Runs regex matching on all documents. Returns enriched docs + cumulative log."""
-    cumulative_log = []
+# Compiled once; on overlap the rule listed first wins
+TIER1_RULESET = tier1_engine.compile_rules(TIER1_REGEX, ignore_case=True)
+
+def run_tier1(docs, prior_log):
+    """Runs regex matching on normalized documents (see normalize_document).
+    Returns enriched docs + cumulative log, starting from the T0 entries."""
+    cumulative_log = list(prior_log)
 
     for doc in docs:
-        text = to_titlecase(unicodedata.normalize('NFC', doc['markdown']))
+        # Spans index doc['markdown'], so scan exactly that text
+        text = doc['markdown']
         filepath = doc['filepath']
         occ_counter = defaultdict(int)
+        spans = doc.setdefault('spans', [])
+
+        with metrics.measure("tier1", filepath, char_count=len(text)) as row:
+            # Hits come back in text order and never overlap
+            hits = tier1_engine.scan(TIER1_RULESET, text)
+            row['finding_count'] = len(hits)
+
+        for hit in hits:
+            match_text = hit['text']
+            occ_counter[match_text] += 1
+            cumulative_log.append({
+                'filepath': filepath,
+                'pii_text': match_text,
+                'pii_hash': make_pii_hash(match_text),
+                'label': hit['label'],
+                'occurrence_index': occ_counter[match_text],
+                'confidence_score': 1.0,
+                'event_code': 'T1-RGX',
+                'status': 'REDACT',
+                'is_manual': 0
+            })
+            spans.append((hit['start'], hit['end'], f"[{hit['label']}]", SPAN_PRIORITY_T1))
 
-        for rule in TIER1_REGEX:
-            for match in re.finditer(rule['pattern'], text, flags=re.IGNORECASE):
-                match_text = match.group()
-                occ_counter[match_text] += 1
-                cumulative_log.append({
-                    'filepath': filepath,
-                    'pii_text': match_text,
-                    'pii_hash': make_pii_hash(match_text),
-                    'label': rule['label'],
-                    'occurrence_index': occ_counter[match_text],
-                    'confidence_score': 1.0,
-                    'event_code': 'T1-RGX',
-                    'status': 'REDACT',
-                    'is_manual': 0
-                })
-                text = text.replace(match_text, f"[{rule['label']}]")
-
-       # doc['output'] = text
-        #doc['markdown'] = doc['markdown']  # preserve original markdown
-
-    print(f"[Pipeline]🔍 Tier 1 complete. {len(cumulative_log)} findings.")
+    print(f"[Pipeline]🔍 Tier 1 complete. {len(cumulative_log)} total findings so far.")
     return docs, cumulative_log
 
 
@@ -183,51 +439,97 @@ ENT_LABELS = {
     "ADRESSE_2": "ADRESSE"
 }
 
-def get_beam_confidence(doc, beam_width=16, beam_density=0.0001):
-    ner = nlp.get_pipe("ner")
-    beams = ner.beam_parse([doc], beam_width=beam_width, beam_density=beam_density)
-    entity_scores = defaultdict(float)
-    for beam in beams:
-        for score, ents in ner.moves.get_beam_parses(beam):
-            for start, end, label in ents:
-                entity_scores[(start, end, label)] += score
-    return entity_scores
+# Batched NER: documents per nlp.pipe batch and worker processes.
+# NLP_PROCESSES=1 keeps everything in-process.
+NLP_BATCH_SIZE = int(os.getenv('NLP_BATCH_SIZE', '16'))
+NLP_PROCESSES = int(os.getenv('NLP_PROCESSES', '1'))
+# Tier 2 confidence scoring: off, greedy, beam or adaptive (see nlp_service.py)
+NLP_CONFIDENCE_MODE = nlp_service.CONFIDENCE_MODE
+
+def parse_spacy_docs(docs, batch_size=None, n_process=None, confidence=None):
+    """Parses every document that has no parse yet, in batches.
+    Goes through the resident model service when NLP_SERVICE_URL is set.
+    confidence="off" parses without scoring."""
+    batch_size = NLP_BATCH_SIZE if batch_size is None else batch_size
+    n_process = NLP_PROCESSES if n_process is None else n_process
+    confidence = NLP_CONFIDENCE_MODE if confidence is None else confidence
+    scored = confidence != "off"
+
+    todo = [doc for doc in docs
+            if doc.get('spacy_doc') is None
+            or doc['spacy_doc'].text != doc['markdown']
+            or (scored and 'beam_scores' not in doc)]
+    if not todo:
+        return docs
+
+    texts = [doc['markdown'] for doc in todo]
+    with metrics.measure("spacy_parse", doc_count=len(texts),
+                         char_count=sum(len(text) for text in texts)):
+        results = nlp_service.parse_texts(
+            texts, batch_size=batch_size, n_process=n_process, confidence=confidence
+        )
+    for doc, (spacy_doc, beam_scores, scoring_method) in zip(todo, results):
+        doc['spacy_doc'] = spacy_doc
+        if scored:
+            doc['beam_scores'] = beam_scores
+            doc['scoring_method'] = scoring_method
+    return docs
+
+def get_spacy_doc(doc):
+    """Parses doc['markdown'] once; Tier 2 and Tier 3 share the result."""
+    parse_spacy_docs([doc], confidence="off")
+    return doc['spacy_doc']
 
 def run_tier2(docs, prior_log):
     cumulative_log = list(prior_log)
+    parse_spacy_docs(docs)
 
     for doc in docs:
-        text = doc['markdown']
         filepath = doc['filepath']
-        spacy_doc = nlp(text)
-        beam_scores = get_beam_confidence(spacy_doc)
+        spacy_doc = get_spacy_doc(doc)
+        beam_scores = doc.pop('beam_scores', {})
+        scoring_method = doc.pop('scoring_method', "off")
         occ_counter = defaultdict(int)
-
-        for ent in spacy_doc.ents:
-            if ent.label_ in ENT_LABELS or ent.label_.startswith("ADRESSE_"):
-                found_text = ent.text
-                label = ENT_LABELS.get(ent.label_, ent.label_)
-                occ_counter[found_text] += 1
-                score_key = (ent.start, ent.end, ent.label_)
-                conf = 1.0 if (ent.ent_id_ or ent.label_ in ['ADRESSE_1', 'ADRESSE_2']) \
-                       else round(float(beam_scores.get(score_key, 0.0)), 4)
-
-                cumulative_log.append({
-                    'filepath': filepath,
-                    'pii_text': found_text,
-                    'pii_hash': make_pii_hash(found_text),
-                    'label': label,
-                    'occurrence_index': occ_counter[found_text],
-                    'confidence_score': conf,
-                    'event_code': 'T2-NER',
-                    'status': 'REDACT',
-                    'is_manual': 0
-                })
-                text = re.sub(rf'\b{re.escape(found_text)}\b', f"[{label}]", text)
-
-       # doc['output'] = text
+        spans = doc.setdefault('spans', [])
+
+        found_before = len(cumulative_log)
+
+        with metrics.measure("tier2", filepath, char_count=len(doc['markdown'])) as row:
+            for ent in spacy_doc.ents:
+                if ent.label_ in ENT_LABELS or ent.label_.startswith("ADRESSE_"):
+                    found_text = ent.text
+                    label = ENT_LABELS.get(ent.label_, ent.label_)
+                    occ_counter[found_text] += 1
+                    score_key = (ent.start, ent.end, ent.label_)
+                    if ent.ent_id_ or ent.label_ in ['ADRESSE_1', 'ADRESSE_2']:
+                        conf, method = 1.0, "rule"
+                    elif scoring_method == "off":
+                        conf, method = None, scoring_method
+                    else:
+                        conf, method = round(float(beam_scores.get(score_key, 0.0)), 4), scoring_method
+
+                    cumulative_log.append({
+                        'filepath': filepath,
+                        'pii_text': found_text,
+                        'pii_hash': make_pii_hash(found_text),
+                        'label': label,
+                        'occurrence_index': occ_counter[found_text],
+                        'confidence_score': conf,
+                        'scoring_method': method,
+                        'event_code': 'T2-NER',
+                        'status': 'REDACT',
+                        'is_manual': 0
+                    })
+                    spans.append((ent.start_char, ent.end_char, f"[{label}]", SPAN_PRIORITY_T2))
+            row['finding_count'] = len(cumulative_log) - found_before
 
     print(f"[Pipeline]🔍 Tier 2 complete. {len(cumulative_log)} total findings so far.")
+    if NLP_CONFIDENCE_MODE in ("beam", "adaptive"):
+        cache = nlp_service.cache_stats()
+        if cache:
+            print(f"[Pipeline] Confidence cache hit rate {cache['hit_rate']:.1%} ({cache['hits']} hits). "
+                  f"Beam search skipped for {cache['doc_skip_rate']:.1%} of documents "
+                  f"and {cache['sentence_skip_rate']:.1%} of entity sentences.")
     return docs, cumulative_log
 
 
@@ -243,13 +545,22 @@ def is_person_related(token):
     person_suffixes = ("er", "in", "ent", "ant", "ist", "kraft", "experte", "leiter")
     return text.endswith(person_suffixes) or token.ent_type_ == "PER"
 
-def run_tier3(docs, prior_log):
+def load_job_table():
+    with db_pool.connect(DB_PATH) as conn:
+        job_table = pd.read_sql_query("SELECT original, neutral FROM job_dict", conn)
+    return job_table.iloc[job_table['original'].str.len().argsort()[::-1]].reset_index(drop=True)
+
+def run_tier3(docs, prior_log, job_table=None):
     cumulative_log = list(prior_log)
 
-    # Load job_dict from DB
-    with sqlite3.connect(DB_PATH) as conn:
-        job_table = pd.read_sql_query("SELECT original, neutral FROM job_dict", conn)
-    job_table = job_table.iloc[job_table['original'].str.len().argsort()[::-1]].reset_index(drop=True)
+    # Load job_dict from DB unless the caller already holds it
+    if job_table is None:
+        job_table = load_job_table()
+    # Rebuilt only when job_dict changed since the last run
+    automaton = dict_matcher.get_automaton(job_table)
+
+    # No-op after Tier 2; batches the parse when Tier 3 runs on its own
+    parse_spacy_docs(docs, confidence="off")
 
     kauf_patterns = [
         (r"\b(\w+)(kaufmann|kauffrau)\b", r"\1fachkraft", "GEN-RE"),
@@ -258,76 +569,75 @@ def run_tier3(docs, prior_log):
     ]
 
     for doc in docs:
-        current = doc['markdown']
+        text = doc['markdown']
         filepath = doc['filepath']
         occ_counter = defaultdict(int)
         handle_indices = set()
 
-        # 1. Kauf patterns
-        for pattern, replacement, label in kauf_patterns:
-            for match in re.finditer(pattern, current, flags=re.IGNORECASE):
-                match_text = match.group()
-                actual_replacement = re.sub(pattern, replacement, match_text, flags=re.IGNORECASE)
+        with metrics.measure("tier3_dict", filepath, char_count=len(text)) as row:
+            # 1. Kauf patterns and 2. dictionary lookup — both collect spans on the
+            # original text; the patterns win where a job title overlaps them
+            candidates = []
+            for pattern, replacement, label in kauf_patterns:
+                for match in re.finditer(pattern, text, flags=re.IGNORECASE):
+                    candidates.append((match.start(), match.end(), match.expand(replacement),
+                                       SPAN_PRIORITY_T3_PATTERN))
+            # One pass over the text for all job titles
+            for start, end, original, neutral in dict_matcher.find_matches(automaton, text):
+                candidates.append((start, end, str(neutral), SPAN_PRIORITY_T3_DICT))
+
+            spans = span_builder.resolve(candidates)
+            for start, end, replacement, priority in spans:
+                match_text = text[start:end]
                 occ_counter[match_text] += 1
+                is_pattern = priority == SPAN_PRIORITY_T3_PATTERN
                 cumulative_log.append({
                     'filepath': filepath,
                     'pii_text': match_text,
                     'pii_hash': make_pii_hash(match_text),
-                    'label': actual_replacement,
+                    'label': replacement if is_pattern else "GEN-RE",
                     'occurrence_index': occ_counter[match_text],
-                    'confidence_score': 1.0,
+                    'confidence_score': 1.0 if is_pattern else 0.9,
                     'event_code': 'T3-GIP',
                     'status': 'REDACT',
                     'is_manual': 0
                 })
-            current = re.sub(pattern, replacement, current, flags=re.IGNORECASE)
-
-        # 2. Dictionary lookup
-        for _, d_row in job_table.iterrows():
-            original = str(d_row['original'])
-            target = rf'\b{re.escape(original)}\b'
-            for match in re.finditer(target, current, flags=re.IGNORECASE):
-                actual_text = match.group()
-                occ_counter[actual_text] += 1
-                cumulative_log.append({
-                    'filepath': filepath,
-                    'pii_text': actual_text,
-                    'pii_hash': make_pii_hash(actual_text),
-                    'label': "GEN-RE",
-                    'occurrence_index': occ_counter[actual_text],
-                    'confidence_score': 0.9,
-                    'event_code': 'T3-GIP',
-                    'status': 'REDACT',
-                    'is_manual': 0
-                })
-                for i in range(match.start(), match.end()):
-                    handle_indices.add(i)
-            current = re.sub(target, d_row["neutral"], current, flags=re.IGNORECASE)
-
-        # 3. Linguistic flagging
-        spacy_doc = nlp(doc['markdown'])
-        for token in spacy_doc:
-            if token.idx in handle_indices:
-                continue
-            if token.pos_ in ["NOUN", "PROPN"]:
-                morph = token.morph.to_dict()
-                gender = morph.get("Gender")
-                if is_person_related(token) and gender in ['Fem', 'Masc']:
-                    if any(token.text.lower().endswith(s) for s in ['in', 'innen', 'er', 'erin']):
-                        occ_counter[token.text] += 1
-                        cumulative_log.append({
-                            'filepath': filepath,
-                            'pii_text': token.text,
-                            'pii_hash': make_pii_hash(token.text),
-                            'label': "GEN-FL",
-                            'occurrence_index': occ_counter[token.text],
-                            'confidence_score': 0.75,
-                            'event_code': 'T3-FLG',
-                            'status': 'FLAGGED',
-                            'is_manual': 0
-                        })
-
-       # doc['output'] = current
+                if not is_pattern:
+                    handle_indices.update(range(start, end))
+            doc.setdefault('spans', []).extend(spans)
+            row['finding_count'] = len(spans)
+
+        found_before = len(cumulative_log)
+        with metrics.measure("tier3_flag", filepath, char_count=len(text)) as row:
+            # 3. Linguistic flagging — reuses the Tier 2 parse
+            spacy_doc = get_spacy_doc(doc)
+            for token in spacy_doc:
+                if token.idx in handle_indices:
+                    continue
+                if token.pos_ in ["NOUN", "PROPN"]:
+                    morph = token.morph.to_dict()
+                    gender = morph.get("Gender")
+                    if is_person_related(token) and gender in ['Fem', 'Masc']:
+                        if any(token.text.lower().endswith(s) for s in ['in', 'innen', 'er', 'erin']):
+                            occ_counter[token.text] += 1
+                            cumulative_log.append({
+                                'filepath': filepath,
+                                'pii_text': token.text,
+                                'pii_hash': make_pii_hash(token.text),
+                                'label': "GEN-FL",
+                                'occurrence_index': occ_counter[token.text],
+                                'confidence_score': 0.75,
+                                'event_code': 'T3-FLG',
+                                'status': 'FLAGGED',
+                                'is_manual': 0
+                            })
+            row['finding_count'] = len(cumulative_log) - found_before
+
+        # Last tier — build the redacted output once from every tier's spans
+        with metrics.measure("redaction", filepath, char_count=len(text)):
+            doc['output'] = span_builder.apply(text, doc.pop('spans'))
+        # Last tier that needs the parse — release it
+        doc.pop('spacy_doc', None)
 
     print(f"[Pipeline]🔍 Tier 3 complete. {len(cumulative_log)} total findings.")
     return docs, cumulative_log
@@ -338,95 +648,224 @@ def run_tier3(docs, prior_log):
 # ─────────────────────────────────────────────
 
 def write_to_db(docs, cumulative_log):
-    with sqlite3.connect(DB_PATH) as conn:
-        # Write documents to pending_review
-        for doc in docs:
-            conn.execute("""
-                INSERT OR REPLACE INTO pending_review 
-                    (filepath, original, markdown, output, status, integrity_hash)
-                VALUES (?, ?, ?, ?, 'PENDING', ?)
-            """, (
-                doc['filepath'],
-                doc['original'],
-                doc['markdown'],
-                doc.get('output', doc['markdown']),
-                make_pii_hash(doc['original'])
-            ))
-
-        # Write PII findings to pending_pii
-        if cumulative_log:
-            log_df = pd.DataFrame(cumulative_log)
-            log_df.to_sql('pending_pii', conn, if_exists='append', index=False)
-
-        conn.commit()
+    with metrics.measure("db_write", doc_count=len(docs), finding_count=len(cumulative_log)):
+        with db_pool.connect(DB_PATH) as conn:
+            # Write documents to pending_review
+            for doc in docs:
+                # Re-ingesting a file replaces its review row, so drop its old findings too
+                conn.execute("DELETE FROM pending_pii WHERE filepath = ?", (doc['filepath'],))
+                # Hashed before finish_job removes the file, for find_duplicate
+                content_hash = doc.get('content_hash')
+                if content_hash is None and os.path.exists(doc['filepath']):
+                    content_hash = parse_cache.file_hash(doc['filepath'])
+                conn.execute("""
+                    INSERT OR REPLACE INTO pending_review 
+                        (filepath, original, markdown, output, status, integrity_hash, page_ranges,
+                         filename_hash, content_hash)
+                    VALUES (?, ?, ?, ?, 'PENDING', ?, ?, ?, ?)
+                """, (
+                    doc['filepath'],
+                    doc['original'],
+                    doc['markdown'],
+                    doc.get('output', doc['markdown']),
+                    make_pii_hash(doc['original']),
+                    json.dumps(doc['page_ranges']) if doc.get('page_ranges') else None,
+                    database.make_filename_hash(doc['filepath']),
+                    content_hash
+                ))
+
+            # Write PII findings to pending_pii
+            if cumulative_log:
+                log_df = pd.DataFrame(cumulative_log)
+                log_df.to_sql('pending_pii', conn, if_exists='append', index=False)
+
+            conn.commit()
     print(f"[Pipeline] Written {len(docs)} docs and {len(cumulative_log)} PII findings to DB.")
 
 
+# ─────────────────────────────────────────────
+# STREAMING MODE — one document at a time, T0→T3→DB
+# ─────────────────────────────────────────────
+
+# Streaming commits each document as soon as it is done instead of
+# holding the whole batch (and its log) in memory until the end.
+PIPELINE_STREAMING = os.getenv('PIPELINE_STREAMING', '0') == '1'
+
+def normalize_document(doc):
+    page_ranges = doc.get('page_ranges')
+    if page_ranges:
+        # Range by range, so the recorded page boundaries stay valid
+        text = doc['markdown']
+        ends = [start for _, _, start in page_ranges[1:]] + [len(text)]
+        pieces, offset = [], 0
+        for page_range, end in zip(page_ranges, ends):
+            piece = to_titlecase(unicodedata.normalize('NFC', text[page_range[2]:end]))
+            page_range[2] = offset
+            offset += len(piece)
+            pieces.append(piece)
+        normalized = "".join(pieces)
+    else:
+        normalized = to_titlecase(unicodedata.normalize('NFC', doc['markdown']))
+    doc['markdown'] = normalized
+    doc['original'] = normalized
+    return doc
+
+def process_document(doc, job_table=None):
+    """Runs Tier 1–3 on one parsed document and commits it. Returns the finding count."""
+    docs = [normalize_document(doc)]
+    docs, log = run_tier1(docs, [doc.pop('t0_entry')])
+    docs, log = run_tier2(docs, log)
+    docs, log = run_tier3(docs, log, job_table=job_table)
+    write_to_db(docs, log)
+    # Commit this document's stage timings along with it
+    metrics.flush(DB_PATH)
+    return len(log)
+
+def stream_documents(input_dir, files=None, job_table=None, on_done=None):
+    """Processes and commits documents one by one. Returns the document count.
+    on_done(doc) is called after each commit."""
+    job_table = load_job_table() if job_table is None else job_table
+    processed = 0
+    for doc in iter_documents(input_dir, files=files):
+        process_document(doc, job_table=job_table)
+        processed += 1
+        print(f"[Pipeline]📥 Committed {Path(doc['filepath']).name} ({processed} so far).")
+        if on_done:
+            on_done(doc)
+    return processed
+
+def process_batch(docs, job_table=None):
+    """Runs Tier 1–3 on parsed documents and commits them together."""
+    for doc in docs:
+        normalize_document(doc)
+
+    log = [doc.pop('t0_entry') for doc in docs]
+    # Step 2: Tier 1 — Regex
+    docs, log = run_tier1(docs, log)
+
+    # Step 3: Tier 2 — spaCy NER
+    docs, log = run_tier2(docs, log)
+
+    # Step 4: Tier 3 — Gender neutralization
+    docs, log = run_tier3(docs, log, job_table=job_table)
+
+    # Step 5: Write everything to SQLite
+    write_to_db(docs, log)
+    return docs
+
+
+# ─────────────────────────────────────────────
+# JOB QUEUE — per-file jobs in pipeline_jobs
+# ─────────────────────────────────────────────
+
+# Jobs claimed per round. Each round runs as one batch, or doc by doc when streaming.
+JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', '16'))
+
+def finish_job(job, worker_id):
+    # Only files that were actually processed leave the input folder. When the
+    # lease was lost, the job belongs to another worker, so the file stays.
+    if job_queue.complete(job['job_id'], worker_id):
+        Path(job['filepath']).unlink(missing_ok=True)
+    else:
+        print(f"[Pipeline] Lost the lease on job {job['job_id']} — keeping {Path(job['filepath']).name}.")
+
+def process_jobs(jobs, worker_id, streaming=False, job_table=None):
+    """Runs claimed jobs through the pipeline. Returns (done, failed, error or None)."""
+    by_path = {str(Path(job['filepath'])): job for job in jobs}
+    finished = set()
+
+    def on_done(doc):
+        finish_job(by_path[doc['filepath']], worker_id)
+        finished.add(doc['filepath'])
+
+    error = None
+    try:
+        if streaming:
+            stream_documents(None, files=list(by_path), job_table=job_table, on_done=on_done)
+        else:
+            docs = parse_documents(None, files=list(by_path))
+            if docs:
+                for doc in process_batch(docs, job_table=job_table):
+                    on_done(doc)
+    except Exception as e:
+        import traceback
+        error = f"{str(e)}\n{traceback.format_exc()}"
+
+    # Whatever did not finish failed — Docling could not read it, or a tier raised
+    for path, job in by_path.items():
+        if path not in finished:
+            job_queue.fail(job['job_id'], worker_id, error or "Parsing failed")
+    return len(finished), len(by_path) - len(finished), error
+
+def drain_queue(worker_id=None, streaming=None):
+    """Claims and processes queued jobs until none are left. Returns (done, failed, errors)."""
+    worker_id = worker_id or job_queue.make_worker_id()
+    streaming = PIPELINE_STREAMING if streaming is None else streaming
+    job_table = None
+    done = failed = 0
+    errors = []
+
+    while True:
+        jobs = job_queue.claim(worker_id, limit=JOB_BATCH_SIZE)
+        if not jobs:
+            break
+        if job_table is None:
+            job_table = load_job_table()
+        print(f"[Pipeline] {worker_id} claimed {len(jobs)} jobs.")
+        with job_queue.keep_alive([job['job_id'] for job in jobs], worker_id):
+            round_done, round_failed, error = process_jobs(jobs, worker_id, streaming, job_table)
+        done += round_done
+        failed += round_failed
+        if error:
+            errors.append(error)
+    return done, failed, errors
+
+
 # ─────────────────────────────────────────────
 # MAIN ENTRY POINT
 # ─────────────────────────────────────────────
 
-def run_pipeline(input_dir):
+def run_pipeline(input_dir, streaming=None):
     #Main entry point. Call this from workflow.py instead of trigger_knime().
     #Returns (success: bool, message: str)
-
-    lock_path = Path(input_dir).parent / ".pipeline.lock"
-    if lock_path.exists():
-        # If lock is older than 10 minutes assume stale and remove it
-        age = time.time() - lock_path.stat().st_mtime
-        if age < 600:
-            print("[Pipeline] Already running — skipping duplicate call.")
-            return False, "Pipeline already running."
-        else:
-            print("[Pipeline] Stale lock found — removing.")
-            lock_path.unlink()
+    #Queues every file in input_dir and works the queue until it is empty.
+    #A second call while one is running just helps drain the same queue.
 
     try:
-        lock_path.touch()
+        metrics.start_run()
         start_time = time.perf_counter()
         print(f"[Pipeline]🚀 Starting. Input dir: {input_dir}")
-        print(f"[Pipeline] Found files: {[f.name for f in Path(input_dir).iterdir() if f.suffix.lower() in {'.pdf', '.docx', '.txt'}]}")
-        # Step 0: Ensure DB schema exists
-
-        # Step 1: Parse documents with Docling
-        docs = parse_documents(input_dir)
-        if not docs:
-            return False, "No documents found in input directory."
-        
-        # Normalize all documents
-        for doc in docs:
-            normalized = to_titlecase(unicodedata.normalize('NFC', doc['markdown']))
-            doc['markdown'] = normalized
-            doc['original'] = normalized
+        files = list_input_files(input_dir) if Path(input_dir).exists() else []
+        print(f"[Pipeline] Found files: {[f.name for f in files]}")
+        # Files still being written are left to the watcher or the next run.
+        # Uploads from the UI were queued when they were staged.
+        settled = [f for f in files if is_settled(f)]
+        if len(settled) < len(files):
+            print(f"[Pipeline] Skipping {len(files) - len(settled)} files that are still being written.")
 
-        log = [doc.pop('t0_entry') for doc in docs]
-        # Step 2: Tier 1 — Regex
-        docs, log = run_tier1(docs)
+        queued = job_queue.enqueue_files(settled)
+        print(f"[Pipeline] Queued {queued} new jobs.")
 
-        # Step 3: Tier 2 — spaCy NER
-        docs, log = run_tier2(docs, log)
-
-        # Step 4: Tier 3 — Gender neutralization
-        docs, log = run_tier3(docs, log)
-
-        # Step 5: Write everything to SQLite
-        write_to_db(docs, log)
+        # Steps 1–5 per claimed round of jobs
+        doc_count, failed, errors = drain_queue(streaming=streaming)
 
         end_time = time.perf_counter()
         duration = end_time - start_time
 
-        # Purge input folder after successful processing
-        for f in Path(input_dir).iterdir():
-            if f.is_file():
-                f.unlink()
-        print(f"[Pipeline]🚮 Input folder purged.")
+        if not doc_count and not failed:
+            running = job_queue.get_counts()[job_queue.RUNNING]
+            if running:
+                return True, f"{running} documents are being processed by another worker."
+            return False, "No documents found in input directory."
 
-        print(f"[Pipeline]✅ Complete. {len(docs)} documents processed. Took {duration:.2f} seconds")
-        return True, f"{len(docs)} documents processed successfully."
+        print(f"[Pipeline]✅ Complete. {doc_count} documents processed, {failed} failed. Took {duration:.2f} seconds")
+        if failed:
+            return False, f"‼️ {doc_count} documents processed, {failed} failed.\n" + "\n".join(errors)
+        return True, f"{doc_count} documents processed successfully."
 
     except Exception as e:
         import traceback
         return False, f"‼️ Pipeline error: {str(e)}\n{traceback.format_exc()}"
     finally:
-        if lock_path.exists():
-            lock_path.unlink()
\ No newline at end of file
+        if metrics.current_run():
+            metrics.finish_run(DB_PATH)
@@ -0,0 +1,194 @@
+"""
+reading_order.py — Reading-order reconstruction for multi-column pages.
+Successor of archived_dev_steps/layout-analyzer_v2.py and index.py: the
+page is cut recursively along empty bands of NumPy projection profiles over
+the word boxes (XY-cut). Vertical gutters split columns, horizontal gaps
+split headers, sections and footers, so any number of each is handled.
+Neighbouring columns whose lines share baselines, like label/value rows
+("Geburtsdatum:" next to the date), are not cut apart but read row by row.
+Works on plain box arrays, independent of the PDF library that produced them.
+"""
+
+import numpy as np
+
+# Minimum gutter width between columns, as a share of the page width
+GUTTER_WIDTH = 0.015
+# Minimum vertical gap between blocks, in median line heights
+ROW_GAP = 1.0
+# Words closer than this (in line heights) are parts of one word, e.g. a font change
+WORD_GAP = 0.15
+# A band crossed by no more than this share of a block's boxes looks like a bridged gutter
+NEAR_GUTTER_SHARE = 0.1
+# Blocks with fewer lines are too small to judge
+MIN_LINES = 3
+# Baselines closer than this (in line heights) are on one row
+BASELINE_TOLERANCE = 0.25
+# Neighbouring columns with at least this share of lines on shared rows are read row by row
+ROW_ALIGNED_SHARE = 0.6
+# Row-aligned columns could also be two text columns with the same leading
+ROW_PAIR_AMBIGUITY = 0.5
+
+# ─────────────────────────────────────────────
+# PROJECTION PROFILES
+# ─────────────────────────────────────────────
+
+def _profile(lo, hi, origin, size):
+    """Number of boxes covering each 1-pt bin of [origin, origin + size)."""
+    first = np.clip(np.floor(lo - origin).astype(int), 0, size - 1)
+    last = np.clip(np.ceil(hi - origin).astype(int), first + 1, size)
+    delta = np.zeros(size + 1, dtype=np.int32)
+    np.add.at(delta, first, 1)
+    np.add.at(delta, last, -1)
+    return np.cumsum(delta)[:size]
+
+def _empty_runs(profile, min_len):
+    """(starts, ends) of interior runs of empty bins at least min_len long."""
+    empty = np.concatenate(([0], (profile == 0).astype(np.int8), [0]))
+    steps = np.diff(empty)
+    starts, ends = np.flatnonzero(steps == 1), np.flatnonzero(steps == -1)
+    keep = (ends - starts >= min_len) & (starts > 0) & (ends < len(profile))
+    return starts[keep], ends[keep]
+
+def _split(boxes, idx, axis, min_gap):
+    """Splits the boxes idx at empty bands along axis (0: x, 1: y). Returns the groups in order."""
+    lo, hi = boxes[idx, axis], boxes[idx, axis + 2]
+    origin = lo.min()
+    size = int(np.ceil(hi.max() - origin)) + 1
+    starts, ends = _empty_runs(_profile(lo, hi, origin, size), max(1, int(min_gap)))
+    if len(starts) == 0:
+        return [idx]
+    # A band is empty, so every box lies wholly on one side of it
+    cuts = origin + (starts + ends) / 2
+    group = np.searchsorted(cuts, (lo + hi) / 2)
+    return [idx[group == g] for g in range(len(cuts) + 1) if np.any(group == g)]
+
+def _baselines(boxes, idx, tolerance):
+    """One baseline per text line of the boxes idx, ascending."""
+    bottoms = np.sort(boxes[idx, 3])
+    return bottoms[np.concatenate(([True], np.diff(bottoms) > tolerance))]
+
+def _shared_rows(boxes, left, right, tolerance):
+    """
+    Number of rows two neighbouring columns share, or 0 when less than
+    ROW_ALIGNED_SHARE of their lines sit on shared baselines.
+    """
+    a, b = _baselines(boxes, left, tolerance), _baselines(boxes, right, tolerance)
+    pos = np.clip(np.searchsorted(b, a), 1, len(b))
+    nearest = np.minimum(np.abs(a - b[pos - 1]), np.abs(a - b[np.minimum(pos, len(b) - 1)]))
+    shared = np.count_nonzero(nearest <= tolerance)
+    return shared if shared >= ROW_ALIGNED_SHARE * max(len(a), len(b)) else 0
+
+def _join_aligned(boxes, columns, tolerance):
+    """
+    Merges runs of row-aligned neighbouring columns. Returns the groups and,
+    per group, whether it joined at least MIN_LINES shared rows.
+    """
+    groups, paired = [columns[0]], [False]
+    for column in columns[1:]:
+        shared = _shared_rows(boxes, groups[-1], column, tolerance)
+        if shared:
+            groups[-1] = np.concatenate((groups[-1], column))
+            paired[-1] = paired[-1] or shared >= MIN_LINES
+        else:
+            groups.append(column)
+            paired.append(False)
+    return groups, paired
+
+def _cut(boxes, idx, min_gutter, min_row_gap, tolerance, blocks, paired=False):
+    """
+    Recursive XY-cut: columns first, then rows. Collects the leaf blocks in
+    reading order as (idx, paired), paired when row-aligned columns were kept together.
+    """
+    columns = _split(boxes, idx, 0, min_gutter)
+    if len(columns) > 1:
+        columns, joined = _join_aligned(boxes, columns, tolerance)
+        if len(columns) > 1:
+            for column, column_paired in zip(columns, joined):
+                _cut(boxes, column, min_gutter, min_row_gap, tolerance, blocks, paired or column_paired)
+            return
+        paired = paired or joined[0]
+    rows = _split(boxes, idx, 1, min_row_gap)
+    if len(rows) > 1:
+        for row in rows:
+            _cut(boxes, row, min_gutter, min_row_gap, tolerance, blocks, paired)
+        return
+    blocks.append((idx, paired))
+
+# ─────────────────────────────────────────────
+# BLOCKS
+# ─────────────────────────────────────────────
+
+def _lines(boxes, idx, line_height):
+    """Line number of every box in the block, and the boxes sorted by line, then x."""
+    centers = (boxes[idx, 1] + boxes[idx, 3]) / 2
+    order = np.argsort(centers, kind='stable')
+    line = np.empty(len(idx), dtype=int)
+    line[order] = np.concatenate(([0], np.cumsum(np.diff(centers[order]) > 0.5 * line_height)))
+    order = np.lexsort((boxes[idx, 0], line))
+    return line[order], idx[order]
+
+def _block_text(boxes, texts, idx, line_height):
+    line, idx = _lines(boxes, idx, line_height)
+    # Gap to the previous box on the same line decides between " " and a glued word part
+    gaps = boxes[idx[1:], 0] - boxes[idx[:-1], 2]
+    same_line = line[1:] == line[:-1]
+    parts = [texts[idx[0]]]
+    for i, box in enumerate(idx[1:]):
+        if not same_line[i]:
+            parts.append("\n")
+        elif gaps[i] > WORD_GAP * line_height:
+            parts.append(" ")
+        parts.append(texts[box])
+    return "".join(parts), int(line[-1]) + 1
+
+def _ambiguity(boxes, idx, line_count, min_gutter):
+    """
+    0.0 for a clean block, up to 1.0 when a column gutter is bridged by a
+    few boxes — then the columns may have been read as one.
+    """
+    if line_count < MIN_LINES or len(idx) < 2:
+        return 0.0
+    lo, hi = boxes[idx, 0], boxes[idx, 2]
+    origin = lo.min()
+    size = int(np.ceil(hi.max() - origin)) + 1
+    window = max(1, int(min_gutter))
+    # Only the middle 60 %, margins and indents are no gutters
+    middle = _profile(lo, hi, origin, size)[int(size * 0.2):int(size * 0.8)]
+    if len(middle) < window:
+        return 0.0
+    crossings = np.lib.stride_tricks.sliding_window_view(middle, window).max(axis=1).min()
+    limit = NEAR_GUTTER_SHARE * len(idx)
+    if crossings == 0 or crossings > limit:
+        return 0.0
+    return 1.0 - crossings / (limit + 1)
+
+# ─────────────────────────────────────────────
+# ENTRY POINT
+# ─────────────────────────────────────────────
+
+def reconstruct(boxes, texts, page_width):
+    """
+    Reading-order text and layout confidence (0.0–1.0) for one page.
+    boxes is an (N, 4) array of (x0, top, x1, bottom) with y growing
+    downwards, texts the N strings. Blocks are separated by blank lines.
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    if len(boxes) == 0:
+        return "", 1.0
+    line_height = max(float(np.median(boxes[:, 3] - boxes[:, 1])), 1.0)
+    min_gutter = GUTTER_WIDTH * page_width
+    min_row_gap = ROW_GAP * line_height
+
+    blocks = []
+    _cut(boxes, np.arange(len(boxes)), min_gutter, min_row_gap,
+         BASELINE_TOLERANCE * line_height, blocks)
+
+    parts, penalty = [], 0.0
+    for idx, paired in blocks:
+        text, line_count = _block_text(boxes, texts, idx, line_height)
+        parts.append(text)
+        ambiguity = _ambiguity(boxes, idx, line_count, min_gutter)
+        if paired:
+            ambiguity = max(ambiguity, ROW_PAIR_AMBIGUITY)
+        penalty += len(idx) * ambiguity
+    return "\n\n".join(parts), round(1.0 - penalty / len(boxes), 3)
@@ -0,0 +1,214 @@
+"""
+watcher.py — Watch-folder ingestion daemon for data/input.
+Scanner and mail-ingest tools can drop CVs into the folder at any time.
+A file is queued once it is completely written: right after its inotify
+close-write (or rename) event, or once its size and mtime have been stable
+for WATCH_STABLE_SECONDS. The worker (worker.py) processes the queue and
+removes only the files it finished. For every file the watcher queued and
+the worker finished, a marker named after its content hash is kept in
+.processed/, so a copy dropped again is not processed twice. A marker only
+counts while the vault still holds that content; once the document is
+discarded or purged it is removed and the file is processed again.
+
+    python -m ui.watcher              (from /app)
+    python watcher.py --process       (also drain the queue in this process)
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# Flat imports like the rest of ui/, also when started as `python -m ui.watcher`
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+import database as db
+import job_queue
+import metrics
+import parse_cache
+import pipeline
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+INPUT_DIR = Path(os.getenv('WATCH_DIR', str(BASE_DIR / "data" / "input"))).resolve()
+MARKER_DIR = INPUT_DIR / ".processed"
+# Without a close-write event a file counts as written once it stopped changing this long
+STABLE_SECONDS = pipeline.INPUT_STABLE_SECONDS
+# Fallback scan interval; inotify events wake the loop earlier
+POLL_SECONDS = float(os.getenv('WATCH_POLL_SECONDS', '1'))
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_closed = set()     # paths closed after writing and not modified since
+_seen = {}          # path -> (size, mtime, unchanged since)
+_handled = {}       # path -> (size, mtime) already handed to the queue or refused
+_jobs = {}          # job_id -> (path, content_hash) waiting for the worker
+
+_stop_requested = False
+
+def _request_stop(signum, frame):
+    global _stop_requested
+    _stop_requested = True
+    _wake.set()
+    print(f"[Watch] Signal {signum} received — stopping.")
+
+# ─────────────────────────────────────────────
+# EVENTS
+# ─────────────────────────────────────────────
+
+class _InputHandler(FileSystemEventHandler):
+    def on_created(self, event):
+        self._changed(event.src_path)
+
+    def on_modified(self, event):
+        self._changed(event.src_path)
+
+    def on_closed(self, event):
+        # inotify IN_CLOSE_WRITE — the writer is done with the file
+        if not event.is_directory:
+            with _lock:
+                _closed.add(event.src_path)
+            _wake.set()
+
+    def on_moved(self, event):
+        # Tools that write to a temp name and rename when done
+        if not event.is_directory:
+            with _lock:
+                _closed.add(event.dest_path)
+            _wake.set()
+
+    def _changed(self, path):
+        with _lock:
+            _closed.discard(path)
+        _wake.set()
+
+# ─────────────────────────────────────────────
+# INGESTION
+# ─────────────────────────────────────────────
+
+def ready_files(now=None):
+    """Supported files in the input folder that are completely written and not handled yet."""
+    now = time.time() if now is None else now
+    current = {}
+    ready = []
+    for path in pipeline.list_input_files(INPUT_DIR):
+        key = str(path)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        signature = (stat.st_size, stat.st_mtime)
+        previous = _seen.get(key)
+        since = previous[2] if previous and previous[:2] == signature else now
+        current[key] = (*signature, since)
+
+        if _handled.get(key) == signature:
+            continue
+        with _lock:
+            closed = key in _closed
+        if stat.st_size > 0 and (closed or now - since >= STABLE_SECONDS):
+            ready.append((path, signature))
+
+    _seen.clear()
+    _seen.update(current)
+    # Forget files that are gone, so a new file under the same name is picked up
+    for key in list(_handled):
+        if key not in current:
+            del _handled[key]
+    return ready
+
+def _marker_path(content_hash):
+    return MARKER_DIR / f"{content_hash}.json"
+
+def ingest(path, signature):
+    """Queues a ready file, unless the same content was processed before."""
+    key = str(path)
+    _handled[key] = signature
+    with _lock:
+        _closed.discard(key)
+
+    # Queued by the UI or an earlier run — never touch a file with an open job
+    if job_queue.has_open_job(path):
+        return None
+
+    content_hash = parse_cache.file_hash(path)
+    marker = _marker_path(content_hash)
+    if marker.exists():
+        if db.is_content_in_vault(content_hash):
+            print(f"[Watch] {path.name} was already processed — removing the copy.")
+            path.unlink(missing_ok=True)
+            return None
+        # Discarded or purged since, so the copy is wanted again
+        marker.unlink(missing_ok=True)
+
+    job_id = job_queue.enqueue(path)
+    if job_id is not None:
+        _jobs[job_id] = (key, content_hash)
+        print(f"[Watch]📥 Queued {path.name} (job {job_id}).")
+    return job_id
+
+def record_finished():
+    """Writes a marker for every watched job the worker finished."""
+    for job_id, state in job_queue.get_states(list(_jobs)).items():
+        if state == job_queue.DONE:
+            key, content_hash = _jobs.pop(job_id)
+            _marker_path(content_hash).write_text(json.dumps({
+                'filename': Path(key).name,
+                'job_id': job_id,
+                'processed_at': datetime.now().isoformat(timespec='seconds'),
+            }), encoding='utf-8')
+        elif state == job_queue.FAILED:
+            key, _ = _jobs.pop(job_id)
+            print(f"[Watch]‼️ {Path(key).name} failed — kept in the input folder.")
+
+# ─────────────────────────────────────────────
+# ENTRY POINT
+# ─────────────────────────────────────────────
+
+def main(process=False):
+    db.init_db_schema()
+    INPUT_DIR.mkdir(parents=True, exist_ok=True)
+    MARKER_DIR.mkdir(exist_ok=True)
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    observer = Observer()
+    observer.schedule(_InputHandler(), str(INPUT_DIR), recursive=False)
+    observer.start()
+    worker_id = job_queue.make_worker_id()
+    print(f"[Watch]🚀 Watching {INPUT_DIR} (stable after {STABLE_SECONDS}s"
+          f"{', processing in-process' if process else ''}).")
+
+    try:
+        while not _stop_requested:
+            try:
+                for path, signature in ready_files():
+                    ingest(path, signature)
+                if process and _jobs:
+                    metrics.start_run()
+                    try:
+                        pipeline.drain_queue(worker_id)
+                    finally:
+                        metrics.finish_run(pipeline.DB_PATH)
+                record_finished()
+            except Exception as e:
+                import traceback
+                print(f"[Watch]‼️ {str(e)}\n{traceback.format_exc()}")
+            _wake.wait(POLL_SECONDS)
+            _wake.clear()
+    finally:
+        observer.stop()
+        observer.join()
+    print("[Watch] Stopped.")
+
+if __name__ == "__main__":
+    main(process="--process" in sys.argv[1:])
@@ -0,0 +1,73 @@
+"""
+worker.py — Background pipeline worker, independent of any Streamlit session.
+Polls pipeline_jobs, claims queued files and runs them through the pipeline.
+The UI enqueues uploads, watcher.py enqueues files dropped into data/input.
+Several workers can run side by side; leases keep them from colliding.
+
+    python -m ui.worker     (from /app)
+    python worker.py        (from ui/)
+"""
+
+import os
+import sys
+import time
+import signal
+from pathlib import Path
+
+# Flat imports like the rest of ui/, also when started as `python -m ui.worker`
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import database as db
+import db_pool
+import job_queue
+import metrics
+import pipeline
+
+# Seconds between polls when the queue is empty
+POLL_SECONDS = float(os.getenv('WORKER_POLL_SECONDS', '2'))
+
+_stop_requested = False
+
+def _request_stop(signum, frame):
+    global _stop_requested
+    _stop_requested = True
+    print(f"[Worker] Signal {signum} received — stopping after the current round.")
+
+def run_once(worker_id):
+    """Drains the queue. Returns the number of finished jobs."""
+    metrics.start_run()
+    try:
+        done, failed, errors = pipeline.drain_queue(worker_id)
+    finally:
+        metrics.finish_run(pipeline.DB_PATH)
+
+    if done or failed:
+        print(f"[Worker]✅ {done} documents processed, {failed} failed.")
+    for error in errors:
+        print(f"[Worker]‼️ {error}")
+    return done + failed
+
+def main():
+    db.init_db_schema()
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    worker_id = job_queue.make_worker_id()
+    print(f"[Worker]🚀 {worker_id} watching the job queue (poll every {POLL_SECONDS}s).")
+    while not _stop_requested:
+        try:
+            finished = run_once(worker_id)
+        except Exception as e:
+            import traceback
+            print(f"[Worker]‼️ {str(e)}\n{traceback.format_exc()}")
+            finished = 0
+        if not finished:
+            time.sleep(POLL_SECONDS)
+    db_pool.close()
+    print(f"[Worker] {worker_id} stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 import streamlit as st
 import database as db
 import logic
+import job_queue
 import os
 from pathlib import Path
 from datetime import datetime
@@ -47,6 +48,14 @@ def mark_document_ready(filepath, status):
 def get_clipboard_stack():
     return db.get_ready_for_clipboard()
 
+def get_queue_status():
+    """Job counts per state; the background worker (worker.py) does the processing."""
+    return job_queue.get_counts()
+
+def get_recent_failures(limit=10):
+    """Latest failed jobs with their error, newest first."""
+    return job_queue.get_recent_failures(limit)
+
 def archive_ready_batch(user_id="Admin"):
     ready_docs = db.get_ready_for_clipboard()
     if not ready_docs: